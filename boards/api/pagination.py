@@ -5,6 +5,8 @@ from rest_framework.pagination import (
     PageNumberPagination,
 )
 
+from mysite.pagination import CursorAPIPagination
+
 
 class BoardLimitOffsetPagination(LimitOffsetPagination):
     default_limit = 20
@@ -13,3 +15,8 @@ class BoardLimitOffsetPagination(LimitOffsetPagination):
 
 class BoardPageNumberPagination(PageNumberPagination):
     page_size = 20
+
+
+class BoardCursorPagination(CursorAPIPagination):
+    page_size = 20
+    ordering = ('-created', '-id')
@@ -45,6 +45,8 @@ class BoardSerializer(serializers.ModelSerializer):
 
     def get_total_posts(self, obj):
         """Calculates number of total posts in a board."""
+        if hasattr(obj, 'total_posts'):
+            return obj.total_posts
         return obj.submitted_subjects.count()
 
     def get_cover_url(self, obj):
@@ -55,16 +57,17 @@ class BoardSerializer(serializers.ModelSerializer):
 
     def get_subscribers_count(self, obj):
         """Calculates number of subscribers."""
-        return obj.subscribers.all().count()
+        if hasattr(obj, 'subscribers_count'):
+            return obj.subscribers_count
+        return obj.subscribers.count()
 
     def get_is_subscribed(self, obj):
         """Checks if user is subscribed to the board."""
-        user = None
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            user = request.user
-        if user in obj.subscribers.all():
-            return True
+        if request and hasattr(request, 'user') and request.user.is_authenticated:
+            return obj.subscribers.filter(pk=request.user.pk).exists()
         return False
 
     def get_created_naturaltime(self, obj):
@@ -73,12 +76,11 @@ class BoardSerializer(serializers.ModelSerializer):
 
     def get_is_admin(self, obj):
         """Checks if user is admin."""
-        user = None
+        if hasattr(obj, 'is_admin'):
+            return obj.is_admin
         request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            user = request.user
-        if user in obj.admins.all():
-            return True
+        if request and hasattr(request, 'user') and request.user.is_authenticated:
+            return obj.admins.filter(pk=request.user.pk).exists()
         return False
 
     def create(self, validated_data):
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import SearchFilter
 from rest_framework.generics import (
     ListCreateAPIView,
     RetrieveUpdateDestroyAPIView,
@@ -10,8 +10,9 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from boards.models import Board
+from boards.trending import get_trending_boards
 
-from .pagination import BoardPageNumberPagination
+from .pagination import BoardCursorPagination
 from .permissions import IsAdminOrReadOnly
 from .serializers import BoardSerializer
 
@@ -21,24 +22,28 @@ class BoardListCreateAPIView(ListCreateAPIView):
     View that returns a list of boards & handles the creation of
     boards & returns data back.
     """
-    queryset = Board.objects.all()
     serializer_class = BoardSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    pagination_class = BoardPageNumberPagination
-    filter_backends = [SearchFilter, OrderingFilter]
+    pagination_class = BoardCursorPagination
+    filter_backends = [SearchFilter]
     search_fields = ['title']
 
+    def get_queryset(self, *args, **kwargs):
+        return Board.objects.for_listing(self.request.user)
+
 
 class BoardRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
     """
     View that retrieve, update or delete (if user is the admin of) the board.
     """
-    queryset = Board.objects.all()
     serializer_class = BoardSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsAdminOrReadOnly]
     lookup_field = 'slug'
     lookup_url_kwarg = 'slug'
 
+    def get_queryset(self, *args, **kwargs):
+        return Board.objects.for_listing(self.request.user)
+
 
 class SubscribeBoardView(APIView):
     def get(self, request, format=None):
@@ -72,7 +77,5 @@ class GetSubscribedBoards(APIView):
 class TrendingBoardsList(APIView):
     def get(self, request, format=None):
         """Return a list of trending boards."""
-        boards = Board.objects.all()
-        trending_boards = sorted(boards, key=lambda instance: instance.recent_posts(), reverse=True)[:5]
-        trending_boards_list = [{'title': board.title, 'slug': board.slug} for board in trending_boards]
+        trending_boards_list = [{'title': board.title, 'slug': board.slug} for board in get_trending_boards()]
         return Response(trending_boards_list)
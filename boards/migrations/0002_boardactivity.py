@@ -0,0 +1,45 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:19
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def backfill_board_activity(apps, schema_editor):
+    BoardActivity = apps.get_model('boards', 'BoardActivity')
+    Subject = apps.get_model('subjects', 'Subject')
+    since = (timezone.now() - timedelta(days=3)).replace(minute=0, second=0, microsecond=0)
+    posts = Counter(
+        (board_id, created.replace(minute=0, second=0, microsecond=0))
+        for board_id, created in Subject.objects.filter(active=True, created__gte=since).values_list(
+            'board_id', 'created').iterator())
+    BoardActivity.objects.bulk_create(
+        [BoardActivity(board_id=board_id, hour=hour, posts=total) for (board_id, hour), total in posts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0001_initial'),
+        ('subjects', '0004_feed_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(db_index=True)),
+                ('posts', models.IntegerField(default=0)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='boards.Board')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='boardactivity',
+            unique_together={('board', 'hour')},
+        ),
+        migrations.RunPython(backfill_board_activity, migrations.RunPython.noop),
+    ]
@@ -4,15 +4,56 @@ from datetime import timedelta
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models.signals import m2m_changed
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
 
 from slugify import UniqueSlugify
 
 
+def _count_per_board(queryset):
+    """Returns an expression counting the rows of `queryset` that belong to the outer board."""
+    rows = queryset.filter(board=OuterRef('pk')).order_by().values('board').annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+class BoardQuerySet(models.QuerySet):
+    def for_listing(self, user=None):
+        """
+        Returns boards with everything `BoardSerializer` needs annotated or
+        prefetched, including whether `user` subscribes to or admins each of them.
+        """
+        subscriptions = Board.subscribers.through.objects.all()
+        administrations = Board.admins.through.objects.all()
+        if user is not None and user.is_authenticated:
+            is_subscribed = Exists(subscriptions.filter(board=OuterRef('pk'), user=user))
+            is_admin = Exists(administrations.filter(board=OuterRef('pk'), user=user))
+        else:
+            is_subscribed = is_admin = Value(False, output_field=BooleanField())
+        return self.annotate(
+            total_posts=_count_per_board(Board.submitted_subjects.rel.related_model.objects.all()),
+            subscribers_count=_count_per_board(subscriptions),
+            is_subscribed=is_subscribed,
+            is_admin=is_admin,
+        ).prefetch_related(Prefetch('admins', queryset=User.objects.select_related('profile')))
+
+
 class Board(models.Model):
     """
     Model that represents a board.
@@ -27,6 +68,8 @@ class Board(models.Model):
     created = models.DateTimeField(default=timezone.now)
     updated = models.DateTimeField(auto_now=True)
 
+    objects = BoardQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created', )
 
@@ -63,6 +106,68 @@ class Board(models.Model):
         return self.submitted_subjects.filter(created__gte=timezone.now() - timedelta(days=3)).count()
 
 
+class BoardActivity(models.Model):
+    """
+    Model that counts the active subjects posted in a board within an hour.
+    """
+    board = models.ForeignKey(Board, related_name='activity', on_delete=models.CASCADE)
+    hour = models.DateTimeField(db_index=True)
+    posts = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('board', 'hour')
+
+    def __str__(self):
+        """Unicode representation for a board activity model."""
+        return '{} @ {}'.format(self.board_id, self.hour)
+
+    @staticmethod
+    def get_hour(moment):
+        """Returns the start of the hour bucket holding `moment`."""
+        return moment.replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def record_posts(board_id, created, posts=1):
+        """Adds `posts` to the bucket of `board_id` holding `created`."""
+        hour = BoardActivity.get_hour(created)
+        bucket = BoardActivity.objects.filter(board_id=board_id, hour=hour)
+        if not bucket.update(posts=F('posts') + posts):
+            try:
+                with transaction.atomic():
+                    BoardActivity.objects.create(board_id=board_id, hour=hour, posts=posts)
+            except IntegrityError:
+                bucket.update(posts=F('posts') + posts)
+        invalidate_trending_boards()
+
+
+TRENDING_BOARDS_CACHE_KEY = 'boards:trending'
+TRENDING_WINDOW = timedelta(days=3)
+
+
+def invalidate_trending_boards():
+    """Drops the cached trending boards so they get recomputed on the next read."""
+    cache.delete(TRENDING_BOARDS_CACHE_KEY)
+
+
+@receiver(post_save, sender=BoardActivity)
+def board_activity_saved(sender, instance, created, raw, **kwargs):
+    """
+    Prunes the buckets left out of the trending window whenever a new hour
+    bucket starts, so reading the trending boards never writes.
+    """
+    if created and not raw:
+        BoardActivity.objects.filter(hour__lt=BoardActivity.get_hour(timezone.now() - TRENDING_WINDOW)).delete()
+
+
+@receiver(post_save, sender=Board)
+@receiver(post_delete, sender=Board)
+def board_changed(sender, **kwargs):
+    """
+    Signals the trending boards cache about Board changes.
+    """
+    invalidate_trending_boards()
+
+
 def admins_changed(sender, **kwargs):
     """
     Signals the Board to not assign more than 3 admins to a board.
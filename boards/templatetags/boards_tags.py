@@ -8,7 +8,7 @@ from django.utils.safestring import mark_safe
 
 import markdown
 
-from ..models import Board
+from ..trending import get_trending_boards
 
 register = template.Library()
 
@@ -23,9 +23,7 @@ def boards_container_items(user):
 @register.inclusion_tag('includes/top_five.html')
 def top_five_boards():
     """Returns a dict containing top five boards list."""
-    boardslist = Board.objects.all()
-    boardslist = sorted(boardslist, key=lambda instance: instance.recent_posts(), reverse=True)[:5]
-    return {'boards_list': boardslist, 'top_boards': True}
+    return {'boards_list': get_trending_boards(), 'top_boards': True}
 
 
 @register.filter(name='markdown')
@@ -38,5 +36,5 @@ def markdown_format(text):
 def show_active_threads(user):
     """Returns a dict containing user active threads."""
     current_user = User.objects.get(id=user.id)
-    threads = current_user.posted_subjects.all()[:5]
+    threads = current_user.posted_subjects.select_related('board')[:5]
     return {'threads': threads}
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from subjects.models import Subject
+
+from ..models import Board
+
+
+class TestBoardsAPI(TestCase):
+    """
+    TestCase class to test the boards API.
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='test_user',
+                                                         email='test@gmail.com',
+                                                         password='top_secret')
+        self.client.login(username='test_user', password='top_secret')
+        self.board = Board.objects.create(title='test title', description='some random words')
+        self.board.admins.add(self.user)
+        self.board.subscribers.add(self.user)
+        Subject.objects.create(title='test title', author=self.user, board=self.board)
+
+    def create_boards(self, number):
+        start = Board.objects.count()
+        for i in range(start, start + number):
+            board = Board.objects.create(title='board {}'.format(i), description='some random words')
+            subscriber = get_user_model().objects.create_user(username='subscriber_{}'.format(i))
+            board.admins.add(subscriber)
+            board.subscribers.add(subscriber, self.user)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('list_or_create_boards'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_list_runs_constant_queries(self):
+        self.create_boards(2)
+        queries = self.count_list_queries()
+        self.create_boards(10)
+        self.assertEqual(self.count_list_queries(), queries)
+
+    def test_board_details(self):
+        self.create_boards(1)
+        response = self.client.get(reverse('retrieve_or_update_or_destroy_boards', args=[self.board.slug]))
+        self.assertEqual(response.data['total_posts'], 1)
+        self.assertEqual(response.data['subscribers_count'], 1)
+        self.assertTrue(response.data['is_subscribed'])
+        self.assertTrue(response.data['is_admin'])
+        self.assertEqual(response.data['admins'][0]['username'], 'test_user')
+
+        response = self.client.get(reverse('list_or_create_boards'))
+        self.assertEqual([board['is_admin'] for board in response.data['results']], [False, True])
+        self.assertEqual([board['subscribers_count'] for board in response.data['results']], [2, 1])
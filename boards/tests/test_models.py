@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from subjects.models import Subject
 
-from ..models import Board
+from ..models import Board, BoardActivity
+from ..trending import get_trending_boards
 
 
 class TestBoardsModels(TestCase):
@@ -36,3 +43,65 @@ class TestBoardsModels(TestCase):
     def test_get_admins_method(self):
         """Test get admins method."""
         self.assertEqual(len(self.board.get_admins()), 1)
+
+
+class TestTrendingBoards(TestCase):
+    """
+    TestCase class to test the trending boards ranking.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='test_user', password='top_secret')
+        self.boards = [Board.objects.create(title='board {}'.format(i), description='some random words')
+                       for i in range(3)]
+
+    def post(self, board, **kwargs):
+        return Subject.objects.create(title='test title', author=self.user, board=board, **kwargs)
+
+    def test_buckets_follow_subjects(self):
+        subject = self.post(self.boards[0])
+        self.post(self.boards[0])
+        bucket = BoardActivity.objects.get(board=self.boards[0])
+        self.assertEqual(bucket.hour, BoardActivity.get_hour(subject.created))
+        self.assertEqual(bucket.posts, 2)
+
+        subject.active = False
+        subject.save()
+        self.assertEqual(BoardActivity.objects.get(board=self.boards[0]).posts, 1)
+        subject.active = True
+        subject.save()
+        self.assertEqual(BoardActivity.objects.get(board=self.boards[0]).posts, 2)
+        subject.delete()
+        self.assertEqual(BoardActivity.objects.get(board=self.boards[0]).posts, 1)
+
+        self.post(self.boards[1], created=timezone.now() - timedelta(days=4))
+        self.assertFalse(BoardActivity.objects.filter(board=self.boards[1]).exists())
+
+    def test_trending_boards(self):
+        self.post(self.boards[1])
+        self.post(self.boards[1])
+        self.post(self.boards[0])
+        with self.assertNumQueries(3):
+            self.assertEqual(get_trending_boards(), [self.boards[1], self.boards[0], self.boards[2]])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_trending_boards(2), [self.boards[1], self.boards[0]])
+
+        self.post(self.boards[0])
+        self.post(self.boards[0])
+        self.assertEqual(get_trending_boards()[0], self.boards[0])
+
+    def test_more_trending_boards_than_cached(self):
+        self.boards += [Board.objects.create(title='board {}'.format(i), description='some random words')
+                        for i in range(3, 7)]
+        self.assertEqual(len(get_trending_boards()), 5)
+        self.assertEqual(len(get_trending_boards(7)), 7)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_trending_boards(6)), 6)
+
+    def test_expired_buckets_are_pruned_on_write(self):
+        hour = BoardActivity.get_hour(timezone.now() - timedelta(days=4))
+        BoardActivity.objects.bulk_create([BoardActivity(board=self.boards[1], hour=hour, posts=3)])
+        get_trending_boards()
+        self.assertTrue(BoardActivity.objects.filter(hour=hour).exists())
+        self.post(self.boards[0])
+        self.assertFalse(BoardActivity.objects.filter(hour=hour).exists())
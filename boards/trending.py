@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trending boards.
+
+Boards are ranked by the number of active subjects posted within a sliding
+`TRENDING_WINDOW`, summed from the hourly `BoardActivity` buckets kept up to
+date by the `Subject` signals, which also prune the buckets out of the
+window. The ranking is cached until the window slides to the next hour or a
+bucket changes.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import TRENDING_BOARDS_CACHE_KEY, TRENDING_WINDOW, Board, BoardActivity
+
+TRENDING_BOARDS_COUNT = 5
+
+
+def compute_trending_boards(count=TRENDING_BOARDS_COUNT, now=None):
+    """
+    Returns the `count` boards with the most recent posts, padded with the
+    newest boards when fewer boards have been active.
+    """
+    since = BoardActivity.get_hour((now or timezone.now()) - TRENDING_WINDOW)
+    totals = BoardActivity.objects.filter(hour__gte=since).values('board').annotate(total=Sum('posts'))
+    ranking = list(totals.filter(total__gt=0).order_by('-total', 'board').values_list('board', flat=True)[:count])
+    boards = Board.objects.in_bulk(ranking)
+    trending_boards = [boards[board_id] for board_id in ranking if board_id in boards]
+    if len(trending_boards) < count:
+        trending_boards += list(Board.objects.exclude(id__in=ranking)[:count - len(trending_boards)])
+    return trending_boards
+
+
+def get_trending_boards(count=TRENDING_BOARDS_COUNT):
+    """Returns the cached trending boards."""
+    cached = cache.get(TRENDING_BOARDS_CACHE_KEY)
+    if cached is None or cached[0] < count:
+        now = timezone.now()
+        size = max(count, TRENDING_BOARDS_COUNT)
+        cached = (size, compute_trending_boards(size, now))
+        next_hour = BoardActivity.get_hour(now) + timedelta(hours=1)
+        cache.set(TRENDING_BOARDS_CACHE_KEY, cached, max((next_hour - now).total_seconds(), 1))
+    return cached[1][:count]
@@ -14,6 +14,7 @@ import requests
 from PIL import Image
 
 from mysite.decorators import ajax_required
+from mysite.pagination import CursorPaginationMixin
 from subjects.models import Subject
 from utils import check_image_extension
 
@@ -33,7 +34,7 @@ class BoardsPageView(ListView):
     context_object_name = 'boards'
 
 
-class BoardPageView(ListView):
+class BoardPageView(CursorPaginationMixin, ListView):
     """
     Basic ListView implementation to call the subjects list per board.
     """
@@ -44,7 +45,7 @@ class BoardPageView(ListView):
 
     def get_queryset(self, **kwargs):
         self.board = get_object_or_404(Board, slug=self.kwargs['board'])
-        return self.board.submitted_subjects.filter(active=True)
+        return self.board.submitted_subjects.filter(active=True).for_feed(self.request.user)
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
@@ -1,8 +1,22 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Count,
+    DateTimeField,
+    F,
+    IntegerField,
+    Max,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
+from events.bus import publish
+from events.domain import CommentPosted
 from subjects.models import Subject
 
 
@@ -29,6 +43,16 @@ class Comment(models.Model):
         """Unicode representation for a comment model."""
         return self.body
 
+    def save(self, *args, **kwargs):
+        # Subject comment stats are updated by `comment_saved` & `CommentPosted` is
+        # published by `comment_created` in the same transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
     @staticmethod
     def get_comments(subject_slug=None):
         """Returns comments."""
@@ -37,3 +61,58 @@ class Comment(models.Model):
         else:
             comments = Comment.objects.filter(active=True)
         return comments
+
+
+def _active_subject_comments():
+    return Comment.objects.filter(subject=OuterRef('pk'), active=True).order_by().values('subject')
+
+
+def subject_comments_count():
+    """Returns an expression counting the active comments of the outer subject."""
+    comments = _active_subject_comments().annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(comments, output_field=IntegerField()), 0)
+
+
+def subject_last_comment_at():
+    """Returns an expression for the creation time of the outer subject's latest active comment."""
+    comments = _active_subject_comments().annotate(last=Max('created')).values('last')
+    return Subquery(comments, output_field=DateTimeField())
+
+
+def update_subject_comment_stats(subject_id):
+    """
+    Recomputes `comments_count` & `last_comment_at` of a subject.
+    """
+    Subject.objects.filter(pk=subject_id).update(comments_count=subject_comments_count(),
+                                                 last_comment_at=subject_last_comment_at())
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw, **kwargs):
+    """
+    Signals the Subject about comment creation & (de)activation.
+    """
+    if created and instance.active and not raw:
+        Subject.objects.filter(pk=instance.subject_id).update(comments_count=F('comments_count') + 1,
+                                                              last_comment_at=instance.created)
+    else:
+        update_subject_comment_stats(instance.subject_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw, **kwargs):
+    """
+    Publishes the comments being posted.
+    """
+    if created and not raw:
+        publish(CommentPosted(comment_id=instance.pk, subject_id=instance.subject_id,
+                              commenter_id=instance.commenter_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """
+    Signals the Subject about comment deletion.
+    """
+    if instance.active:
+        update_subject_comment_stats(instance.subject_id)
@@ -36,3 +36,27 @@ class TestCommentsModels(TestCase):
     def test_comment_list_count(self):
         """Test to count comments."""
         self.assertEqual(Comment.objects.count(), 1)
+
+    def test_subject_comment_stats(self):
+        """Test the subject comment counter & last activity time."""
+        self.subject.refresh_from_db()
+        self.assertEqual(self.subject.comments_count, 1)
+        self.assertEqual(self.subject.last_comment_at, self.comment.created)
+
+        other_comment = Comment.objects.create(body='more random words',
+                                               commenter=self.other_user,
+                                               subject=self.subject)
+        self.subject.refresh_from_db()
+        self.assertEqual(self.subject.comments_count, 2)
+        self.assertEqual(self.subject.last_comment_at, other_comment.created)
+
+        other_comment.active = False
+        other_comment.save()
+        self.subject.refresh_from_db()
+        self.assertEqual(self.subject.comments_count, 1)
+        self.assertEqual(self.subject.last_comment_at, self.comment.created)
+
+        self.comment.delete()
+        self.subject.refresh_from_db()
+        self.assertEqual(self.subject.comments_count, 0)
+        self.assertIsNone(self.subject.last_comment_at)
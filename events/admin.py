@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.contrib import admin
+
+from .models import OutboxEvent
+
+
+class OutboxEventAdmin(admin.ModelAdmin):
+    """
+    Admin settings for outbox events.
+    """
+    list_display = ('name', 'payload', 'created', 'claimed_by', 'attempts', 'failed')
+    list_filter = ('name', 'failed')
+    date_hierarchy = 'created'
+
+
+admin.site.register(OutboxEvent, OutboxEventAdmin)  # noqa: E305
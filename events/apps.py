@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class EventsConfig(AppConfig):
+    name = 'events'
+
+    def ready(self):
+        # Subscribes the handlers declared in the `handlers` module of every app.
+        autodiscover_modules('handlers')
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-process domain event bus with a transactional outbox.
+
+`publish()` stores the event in the `OutboxEvent` table, in the same
+transaction as the write it describes, & queues a `dispatch_outbox` task
+once that transaction commits. A worker then hands the pending events to
+the handlers subscribed with `subscribe`. Handlers registered with
+`batch=True` get all the pending events of a type at once, so they can
+coalesce them, e.g. invalidate a cache once for many events.
+
+A failing handler is logged & doesn't prevent the other handlers from
+running. Handlers of the same event type run in subscription order. Events
+whose handlers failed stay in the outbox & are retried, by the failed
+handlers only, with an exponential backoff until they run out of attempts.
+"""
+import json
+import logging
+import traceback
+from collections import OrderedDict
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from tasks.queue import enqueue, task
+
+from .domain import EVENT_TYPES
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_BATCH_SIZE = 500
+DISPATCH_MAX_ATTEMPTS = 5
+DISPATCH_RETRY_DELAY = 30
+# Events claimed for longer than this are considered abandoned by a dead worker.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+handlers = {}
+
+
+def subscribe(event_type, batch=False):
+    """
+    Subscribes the decorated function to an event type. It's called with
+    each event, or with the list of pending events when `batch` is set.
+    """
+    def register(func):
+        name = '{}.{}'.format(func.__module__, func.__name__)
+        handlers.setdefault(event_type.__name__, []).append((func, batch, name))
+        return func
+
+    return register
+
+
+def publish(event):
+    """Stores an event in the outbox & queues its dispatch once committed."""
+    with transaction.atomic():
+        OutboxEvent.objects.create(name=type(event).__name__, payload=json.dumps(event.as_dict(), sort_keys=True))
+        transaction.on_commit(dispatch_outbox.delay)
+
+
+def claim_events(limit=DISPATCH_BATCH_SIZE):
+    """Claims up to `limit` due events & returns them, oldest first."""
+    token = uuid4().hex
+    now = timezone.now()
+    pending = OutboxEvent.objects.filter(failed=False, claimed_by='', run_at__lte=now) | OutboxEvent.objects.filter(
+        failed=False, claimed_at__lt=now - CLAIM_TIMEOUT)
+    ids = list(pending.values_list('pk', flat=True)[:limit])
+    (OutboxEvent.objects.filter(pk__in=ids) & pending).update(claimed_by=token, claimed_at=now)
+    return list(OutboxEvent.objects.filter(claimed_by=token))
+
+
+def dispatch(events, pending=None):
+    """
+    Hands events to their handlers & returns, for each event, the errors of
+    the handlers that failed by handler name. `pending` restricts each event
+    to a set of handler names (`None` for all of them).
+    """
+    pending = pending or [None] * len(events)
+    failed = [{} for _ in events]
+    by_name = OrderedDict()
+    for position, event in enumerate(events):
+        by_name.setdefault(type(event).__name__, []).append(position)
+    for name, positions in by_name.items():
+        for handler, batch, handler_name in handlers.get(name, []):
+            positions_due = [position for position in positions
+                             if pending[position] is None or handler_name in pending[position]]
+            if not positions_due:
+                continue
+            for group in ([positions_due] if batch else [[position] for position in positions_due]):
+                try:
+                    handler([events[position] for position in group] if batch else events[group[0]])
+                except Exception:
+                    logger.exception('Event handler %s failed for %s.', handler_name, name)
+                    for position in group:
+                        failed[position][handler_name] = traceback.format_exc()
+    return failed
+
+
+def _retry(row, errors):
+    """Schedules a retry of the failed handlers of an event, or gives it up."""
+    attempts = row.attempts + 1
+    changes = {'handlers': ','.join(sorted(errors)), 'attempts': attempts, 'last_error': '\n'.join(errors.values()),
+               'claimed_by': '', 'claimed_at': None}
+    if attempts < DISPATCH_MAX_ATTEMPTS:
+        delay = DISPATCH_RETRY_DELAY * 2 ** (attempts - 1)
+        changes['run_at'] = timezone.now() + timedelta(seconds=delay)
+    else:
+        logger.error('Giving up event %s (%s) after %s attempts.', row.name, row.pk, attempts)
+        changes['failed'] = True
+    OutboxEvent.objects.filter(pk=row.pk, claimed_by=row.claimed_by).update(**changes)
+
+
+@task(unique=True)
+def dispatch_outbox():
+    """Dispatches the due outbox events & queues the dispatch of the next retry."""
+    while True:
+        rows = claim_events()
+        if not rows:
+            break
+        events = [EVENT_TYPES[row.name](**json.loads(row.payload)) for row in rows]
+        failed = dispatch(events, [row.get_handlers() for row in rows])
+        done = [row.pk for row, errors in zip(rows, failed) if not errors]
+        OutboxEvent.objects.filter(pk__in=done, claimed_by=rows[0].claimed_by).delete()
+        for row, errors in zip(rows, failed):
+            if errors:
+                _retry(row, errors)
+    next_run_at = OutboxEvent.objects.filter(failed=False, claimed_by='').aggregate(next=Min('run_at'))['next']
+    # Eager tasks can't wait; the next dispatch picks the retries up.
+    if next_run_at is not None and not settings.TASKS_EAGER:
+        enqueue(dispatch_outbox, run_at=next_run_at)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Domain events published by the apps & their payloads.
+
+Events only carry ids, so they stay small & handlers read the current
+state of the rows they need.
+"""
+
+EVENT_TYPES = {}
+
+
+class Event:
+    """
+    Base class of the domain events; subclasses declare their `fields`.
+    """
+    fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        EVENT_TYPES[cls.__name__] = cls
+
+    def __init__(self, **data):
+        if set(data) != set(self.fields):
+            raise TypeError('{} expects the fields {}.'.format(type(self).__name__, ', '.join(self.fields)))
+        self.__dict__.update(data)
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__, self.as_dict())
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.as_dict() == other.as_dict()
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.fields}
+
+
+class SubjectCreated(Event):
+    fields = ('subject_id', 'author_id')
+
+
+class SubjectEdited(Event):
+    fields = ('subject_id', )
+
+
+class CommentPosted(Event):
+    fields = ('comment_id', 'subject_id', 'commenter_id')
+
+
+class UserFollowed(Event):
+    fields = ('follower_id', 'followed_id')
+
+
+class MessageRequestSent(Event):
+    fields = ('sender_id', 'receiver_id')
+
+
+class MessageRequestAccepted(Event):
+    fields = ('acceptor_id', 'sender_id')
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEvent(models.Model):
+    """
+    Model that represents a published domain event waiting to be dispatched.
+    """
+    name = models.CharField(max_length=100)
+    payload = models.TextField(default='{}')
+    created = models.DateTimeField(auto_now_add=True)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    # Handlers still to run after a failed dispatch, comma separated; all when empty.
+    handlers = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ('id', )
+        indexes = [
+            models.Index(fields=['failed', 'run_at']),
+        ]
+
+    def __str__(self):
+        """Unicode representation for an outbox event model."""
+        return '{} {}'.format(self.name, self.payload)
+
+    def get_handlers(self):
+        """Returns the names of the handlers still to run, or `None` for all of them."""
+        return set(self.handlers.split(',')) if self.handlers else None
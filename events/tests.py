@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.models import Notification
+from tasks.models import Task
+from tasks.queue import Worker
+from utils.testing import OnCommitTestCase
+
+from .bus import DISPATCH_MAX_ATTEMPTS, claim_events, dispatch_outbox, handlers, publish, subscribe
+from .domain import Event
+from .models import OutboxEvent
+
+received = []
+broken_ids = set()
+
+
+class SomethingHappened(Event):
+    fields = ('thing_id', )
+
+
+@subscribe(SomethingHappened)
+def flaky_handler(event):
+    if event.thing_id in broken_ids:
+        raise ValueError('Boom.')
+    received.append(('flaky', event.thing_id))
+
+
+@subscribe(SomethingHappened)
+def single_handler(event):
+    received.append(('single', event.thing_id))
+
+
+@subscribe(SomethingHappened, batch=True)
+def batch_handler(events):
+    received.append(('batch', [event.thing_id for event in events]))
+
+
+class TestEventBus(OnCommitTestCase):
+    """
+    TestCase class to test the domain event bus
+    """
+    def setUp(self):
+        received.clear()
+        broken_ids.clear()
+
+    def test_event_fields(self):
+        self.assertEqual(SomethingHappened(thing_id=1), SomethingHappened(thing_id=1))
+        with self.assertRaises(TypeError):
+            SomethingHappened(other_id=1)
+
+    @override_settings(TASKS_EAGER=False)
+    def test_events_are_dispatched_in_the_background(self):
+        publish(SomethingHappened(thing_id=1))
+        publish(SomethingHappened(thing_id=2))
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(received, [])
+
+        Worker().run_pending()
+        self.assertEqual(received, [('flaky', 1), ('flaky', 2), ('single', 1), ('single', 2), ('batch', [1, 2])])
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_EAGER=False)
+    def test_failed_handlers_are_retried(self):
+        broken_ids.add(1)
+        publish(SomethingHappened(thing_id=1))
+        publish(SomethingHappened(thing_id=2))
+        with self.assertLogs('events.bus', 'ERROR'):
+            Worker().run_pending()
+        self.assertEqual(received, [('flaky', 2), ('single', 1), ('single', 2), ('batch', [1, 2])])
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.handlers, event.attempts), ('events.tests.flaky_handler', 1))
+        self.assertIn('ValueError: Boom.', event.last_error)
+        retry = Task.objects.get()
+        self.assertEqual(retry.run_at, event.run_at)
+        self.assertGreater(retry.run_at, timezone.now())
+
+        # Only the failed handler runs again.
+        received.clear()
+        broken_ids.clear()
+        Task.objects.update(run_at=timezone.now())
+        OutboxEvent.objects.update(run_at=timezone.now())
+        Worker().run_pending()
+        self.assertEqual(received, [('flaky', 1)])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    @override_settings(TASKS_EAGER=False)
+    def test_events_are_dispatched_while_retries_wait(self):
+        broken_ids.add(1)
+        publish(SomethingHappened(thing_id=1))
+        with self.assertLogs('events.bus', 'ERROR'):
+            Worker().run_pending()
+        received.clear()
+        publish(SomethingHappened(thing_id=2))
+        self.assertEqual(Worker().run_pending(), 1)
+        self.assertEqual(received, [('flaky', 2), ('single', 2), ('batch', [2])])
+        self.assertEqual(OutboxEvent.objects.get().handlers, 'events.tests.flaky_handler')
+
+    @override_settings(TASKS_EAGER=False)
+    def test_failing_events_are_given_up(self):
+        broken_ids.add(1)
+        publish(SomethingHappened(thing_id=1))
+        with self.assertLogs('events.bus', 'ERROR'):
+            for _ in range(DISPATCH_MAX_ATTEMPTS):
+                OutboxEvent.objects.update(run_at=timezone.now())
+                dispatch_outbox()
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.attempts, event.failed), (DISPATCH_MAX_ATTEMPTS, True))
+        self.assertEqual(claim_events(), [])
+
+    def test_eager_dispatch(self):
+        publish(SomethingHappened(thing_id=1))
+        self.assertEqual(received, [('flaky', 1), ('single', 1), ('batch', [1])])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_handlers_are_discovered(self):
+        self.assertIn('SubjectCreated', handlers)
+        self.assertIn('UserFollowed', handlers)
+
+
+class TestUserEvents(OnCommitTestCase):
+    """
+    TestCase class to test the notifications sent by the user events
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='test_user', email='test@gmail.com')
+        self.other_user = get_user_model().objects.create(username='other_user', email='other@gmail.com')
+        self.client.force_login(self.user)
+
+    def test_follow_notification(self):
+        self.client.get(reverse('follow_user', args=[self.other_user.pk]), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        notification = Notification.objects.get()
+        self.assertEqual((notification.Actor, notification.Target, notification.notif_type),
+                         (self.user, self.other_user, 'follow'))
+
+    def test_message_request_notifications(self):
+        self.client.get(reverse('send_message_request', args=[self.other_user.pk]),
+                        HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_login(self.other_user)
+        self.client.get(reverse('accept_message_request', args=[self.user.pk]),
+                        HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(list(Notification.objects.order_by('id').values_list('Actor', 'Target', 'notif_type')),
+                         [(self.user.pk, self.other_user.pk, 'sent_msg_request'),
+                          (self.other_user.pk, self.user.pk, 'confirmed_msg_request')])
@@ -10,7 +10,7 @@ class MessageAdmin(admin.ModelAdmin):
     Admin settings for messages.
     """
     list_display = (
-        'user',
+        'from_user',
         'conversation',
         'message',
         'date',
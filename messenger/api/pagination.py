@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from mysite.pagination import CursorAPIPagination
+
+
+class MessageCursorPagination(CursorAPIPagination):
+    page_size = 50
+    ordering = ('-id', )
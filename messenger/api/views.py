@@ -7,8 +7,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from messenger.models import Message
+from messenger.models import Conversation, Message
 
+from .pagination import MessageCursorPagination
 from .serializers import ContactsListSerializer, MessageListSerializer
 
 
@@ -30,12 +31,17 @@ class MessageListAPIView(ListAPIView):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = MessageListSerializer
+    pagination_class = MessageCursorPagination
 
     def get_queryset(self, *args, **kwargs):
         username = self.request.GET.get('username', '')
-        queryset_list = Message.objects.filter(user=self.request.user, conversation__username=username)
-        queryset_list.update(is_read=True)
-        return queryset_list
+        other_user = User.objects.filter(username=username).first()
+        if other_user is None:
+            return Message.objects.none()
+        conversation = Conversation.get_between(self.request.user, other_user)
+        if conversation is not None:
+            conversation.mark_read(self.request.user)
+        return Message.get_thread(self.request.user, other_user).select_related('from_user__profile')
 
 
 class MessageCreateAPIView(APIView):
@@ -50,10 +56,10 @@ class MessageCreateAPIView(APIView):
         message = data.get('message')
 
         from_user = self.request.user
-        to_user = User.objects.filter(username=to_user_username)
-        if to_user.count() == 1:
+        to_user = User.objects.filter(username=to_user_username).first()
+        if to_user is not None:
             if from_user != to_user:
-                chat_msg = Message.send_message(from_user, to_user, message)
+                Message.send_message(from_user, to_user, message)
             # Return data serialized using new MessageSerializer
-            return Response({"to": to_user, "message": message})
+            return Response({"to": to_user.username, "message": message})
         return Response({"detail": "User does not exists."}, status=401)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Wake-ups for long-polling chat clients.
+
+Every conversation has a version that `notify()` bumps once a message is
+committed. A poll reads the version, checks the database once & then
+parks in `wait()` until the version moves or the poll times out, so an
+idle chat costs one request per timeout instead of one every few seconds.
+
+`LocalHub` only wakes polls served by the same process, so it only suits
+single process deployments; with several worker processes, polls would
+only notice messages sent through other processes when they time out.
+`CacheHub` also shares versions through the cache & requires a cache
+shared by the processes (memcached, redis...).
+"""
+import itertools
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+class LocalHub:
+    """
+    In-process hub; polls park on a condition variable.
+
+    Versions are drawn from a single sequence, so a conversation whose
+    version was evicted never gets one of its former versions back.
+    Conversations without polls that weren't notified for `evict_after`
+    seconds are evicted.
+    """
+    evict_after = 60
+
+    def __init__(self):
+        self._versions = {}  # conversation key -> (version, notified at)
+        self._waiters = Counter()
+        self._sequence = itertools.count(1)
+        self._condition = threading.Condition()
+        self._evicted_at = time.monotonic()
+
+    def _version(self, key):
+        return self._versions.get(key, (0, ))[0]
+
+    def version(self, key):
+        """Returns the current version of a conversation."""
+        with self._condition:
+            return self._version(key)
+
+    def notify(self, key):
+        """Bumps the version of a conversation & wakes its polls."""
+        with self._condition:
+            now = time.monotonic()
+            self._versions[key] = (next(self._sequence), now)
+            if now - self._evicted_at > self.evict_after:
+                self._evict(now)
+            self._condition.notify_all()
+
+    def _evict(self, now):
+        self._versions = {
+            key: (version, notified_at) for key, (version, notified_at) in self._versions.items()
+            if self._waiters[key] or now - notified_at <= self.evict_after
+        }
+        self._evicted_at = now
+
+    def wait(self, key, version, timeout):
+        """
+        Blocks until the version of a conversation moves past `version` or
+        `timeout` seconds elapse. Returns whether it moved.
+        """
+        with self._condition:
+            self._waiters[key] += 1
+            try:
+                return self._condition.wait_for(lambda: self._version(key) != version, timeout)
+            finally:
+                self._waiters[key] -= 1
+                if not self._waiters[key]:
+                    del self._waiters[key]
+
+
+class CacheHub(LocalHub):
+    """
+    Hub shared by the processes using the same cache. Polls are woken at
+    once by messages sent through their own process & within
+    `poll_interval` seconds by the others.
+    """
+    poll_interval = 0.5
+
+    def __init__(self):
+        if isinstance(caches['default'], (LocMemCache, DummyCache)):
+            raise ImproperlyConfigured('CacheHub requires a cache shared by the processes, not {}.'.format(
+                type(caches['default']).__name__))
+        super().__init__()
+
+    def _cache_key(self, key):
+        return 'messenger:hub:{}'.format(key)
+
+    def version(self, key):
+        return (cache.get(self._cache_key(key)) or 0, super().version(key))
+
+    def notify(self, key):
+        cache_key = self._cache_key(key)
+        cache.add(cache_key, 0, None)
+        cache.incr(cache_key)
+        super().notify(key)
+
+    def wait(self, key, version, timeout):
+        shared_version, local_version = version
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if super().wait(key, local_version, min(self.poll_interval, max(remaining, 0))):
+                return True
+            if (cache.get(self._cache_key(key)) or 0) != shared_version:
+                return True
+            if remaining <= 0:
+                return False
+
+
+def get_hub():
+    """Returns the hub configured by `settings.MESSENGER_HUB`."""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = import_string(settings.MESSENGER_HUB)()
+    return _hub
+
+
+@receiver(setting_changed)
+def reset_hub(setting, **kwargs):
+    global _hub
+    if setting == 'MESSENGER_HUB':
+        with _hub_lock:
+            _hub = None
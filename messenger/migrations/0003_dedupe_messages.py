@@ -0,0 +1,86 @@
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Q
+
+# The two copies of a message were saved one after the other.
+COPY_DELAY = timedelta(seconds=5)
+BATCH_SIZE = 500
+
+
+def dedupe_messages(apps, schema_editor):
+    """
+    Moves every message into the conversation of its two users, keeping a
+    single row of the two copies `send_message` used to store, & turns the
+    `is_read` flags of each user into a read watermark.
+
+    Messages are read in a single pass, in date order. The sender copies of
+    each conversation are queued by author & text, so the copy matching a
+    message of the other inbox is found without scanning the conversation.
+    """
+    Message = apps.get_model('messenger', 'Message')
+    Conversation = apps.get_model('messenger', 'Conversation')
+    Participant = apps.get_model('messenger', 'Participant')
+
+    rows_by_pair = defaultdict(list)
+    rows = Message.objects.order_by('date', 'id').values_list(
+        'id', 'user', 'conversation', 'from_user', 'message', 'date', 'is_read')
+    for row in rows.iterator():
+        rows_by_pair[tuple(sorted(row[1:3]))].append(row)
+
+    Conversation.objects.bulk_create([Conversation(key='{}:{}'.format(*pair)) for pair in sorted(rows_by_pair)])
+    conversation_ids = dict(Conversation.objects.values_list('key', 'id'))
+
+    duplicate_ids, participants = [], []
+    for pair, pair_rows in sorted(rows_by_pair.items()):
+        # The sender's copy is kept; a copy in the other user's inbox is only
+        # kept when no matching sender copy exists.
+        sender_copies = defaultdict(deque)
+        for pk, owner_id, _, from_user_id, message, date, _ in pair_rows:
+            if owner_id == from_user_id:
+                sender_copies[from_user_id, message].append((date, pk))
+
+        unread_ids = {user_id: [] for user_id in pair}
+        kept_ids = []
+        for pk, owner_id, _, from_user_id, message, date, is_read in pair_rows:
+            if owner_id == from_user_id:
+                kept_ids.append(pk)
+                continue
+            copies = sender_copies.get((from_user_id, message), ())
+            # Copies too old for this message are too old for the later ones.
+            while copies and copies[0][0] < date - COPY_DELAY:
+                copies.popleft()
+            original_id = None
+            if copies and copies[0][0] <= date + COPY_DELAY:
+                original_id = copies.popleft()[1]
+                duplicate_ids.append(pk)
+            else:
+                kept_ids.append(pk)
+            if not is_read:
+                unread_ids[owner_id].append(original_id or pk)
+
+        conversation_id = conversation_ids['{}:{}'.format(*pair)]
+        Message.objects.filter(Q(user=pair[0], conversation=pair[1]) | Q(user=pair[1], conversation=pair[0])).update(
+            thread=conversation_id)
+        last_id = max(kept_ids, default=0)
+        participants.extend(
+            Participant(conversation_id=conversation_id,
+                        user_id=user_id,
+                        last_read_message_id=min(unread_ids[user_id]) - 1 if unread_ids[user_id] else last_id)
+            for user_id in set(pair))
+
+    for start in range(0, len(duplicate_ids), BATCH_SIZE):
+        Message.objects.filter(pk__in=duplicate_ids[start:start + BATCH_SIZE]).delete()
+    Participant.objects.bulk_create(participants, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0002_conversations'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_messages, migrations.RunPython.noop),
+    ]
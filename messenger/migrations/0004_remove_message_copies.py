@@ -0,0 +1,38 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0003_dedupe_messages'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='message',
+            name='conversation',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='user',
+        ),
+        migrations.RenameField(
+            model_name='message',
+            old_name='thread',
+            new_name='conversation',
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='messenger.Conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='messages_me_convers_d4cab4_idx'),
+        ),
+    ]
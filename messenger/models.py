@@ -1,24 +1,110 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models import Max
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from users.counters import update_unread_counts
+
+from .hub import get_hub
+
+
+class Conversation(models.Model):
+    """
+    Model that represents a conversation between two users.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    created = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        """Unicode representation for a conversation model."""
+        return self.key
+
+    @staticmethod
+    def get_key(user_id, other_user_id):
+        """Returns the key of the conversation between two users, whatever their order."""
+        return '{}:{}'.format(*sorted((user_id, other_user_id)))
+
+    @staticmethod
+    def get_between(user, other_user):
+        """Returns the conversation between two users, if any."""
+        return Conversation.objects.filter(key=Conversation.get_key(user.pk, other_user.pk)).first()
+
+    @staticmethod
+    def get_or_create_between(user, other_user):
+        """Returns the conversation between two users, starting it if needed."""
+        key = Conversation.get_key(user.pk, other_user.pk)
+        conversation = Conversation.objects.filter(key=key).first()
+        if conversation is not None:
+            return conversation
+        try:
+            with transaction.atomic():
+                conversation = Conversation.objects.create(key=key)
+                Participant.objects.bulk_create([
+                    Participant(conversation=conversation, user_id=user_id)
+                    for user_id in {user.pk, other_user.pk}
+                ])
+        except IntegrityError:
+            # Started concurrently by the other user.
+            conversation = Conversation.objects.get(key=key)
+        return conversation
+
+    def mark_read(self, user, message_id=None):
+        """
+        Moves the read watermark of `user` up to `message_id`, the latest
+        message by default, & takes the messages read off their unread count.
+        """
+        if message_id is None:
+            message_id = self.messages.aggregate(last=Max('id'))['last']
+        if not message_id:
+            return
+        while True:
+            read_id = Participant.objects.filter(conversation=self, user=user).values_list(
+                'last_read_message_id', flat=True).first()
+            if read_id is None or read_id >= message_id:
+                return
+            # Only the request moving the watermark from `read_id` counts the messages in between.
+            if Participant.objects.filter(conversation=self, user=user,
+                                          last_read_message_id=read_id).update(last_read_message_id=message_id):
+                break
+        read = self.messages.filter(id__gt=read_id, id__lte=message_id).exclude(from_user=user).count()
+        update_unread_counts('unread_messages', {user.pk: -read})
+
+
+class Participant(models.Model):
+    """
+    Model that represents a user taking part in a conversation. Messages
+    with an id up to `last_read_message_id` have been read by the user.
+    """
+    conversation = models.ForeignKey(Conversation, related_name='participants', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='conversation_participants', on_delete=models.CASCADE)
+    last_read_message_id = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('conversation', 'user')
+
+    def __str__(self):
+        """Unicode representation for a participant model."""
+        return '{} in {}'.format(self.user, self.conversation)
 
 
 class Message(models.Model):
     """
     Model that represents a message.
     """
-    user = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    conversation = models.ForeignKey(Conversation, related_name='messages', on_delete=models.CASCADE)
+    from_user = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
     message = models.TextField(max_length=1000, blank=True)
     date = models.DateTimeField(auto_now_add=True)
-    conversation = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
-    from_user = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
-    is_read = models.BooleanField(default=False)
 
     class Meta:
         ordering = ('date', )
         db_table = 'messages_message'
+        indexes = [
+            models.Index(fields=['conversation', 'id']),
+        ]
 
     def __str__(self):
         """Unicode representation for a message model."""
@@ -28,39 +114,49 @@ class Message(models.Model):
     def send_message(from_user, to_user, message):
         """
         Handles the creation of message.
-        It creates two message instances differing with only three fields.
-            :user
-            :conversation
-            :is_read
+        A single row is stored for both users.
         """
         message = message[:1000]
-        current_user_message = Message(from_user=from_user,
-                                       message=message,
-                                       user=from_user,
-                                       conversation=to_user,
-                                       is_read=True)
-        current_user_message.save()
-        Message(from_user=from_user, message=message, user=to_user, conversation=from_user).save()
+        with transaction.atomic():
+            conversation = Conversation.get_or_create_between(from_user, to_user)
+            chat_msg = Message.objects.create(conversation=conversation, from_user=from_user, message=message)
+            if to_user.pk != from_user.pk:
+                update_unread_counts('unread_messages', {to_user.pk: 1})
+            transaction.on_commit(lambda: get_hub().notify(conversation.key))
+        return chat_msg
 
-        return current_user_message
+    @staticmethod
+    def get_thread(user, other_user):
+        """Returns the messages between two users."""
+        return Message.objects.filter(conversation__key=Conversation.get_key(user.pk, other_user.pk))
+
+    @staticmethod
+    def get_unread(user):
+        """Returns the messages sent to `user` that they haven't read yet."""
+        return Message.objects.filter(
+            conversation__participants__user=user,
+            id__gt=F('conversation__participants__last_read_message_id'),
+        ).exclude(from_user=user)
 
     @staticmethod
     def get_conversations(user):
         """
-        Returns a list of users having conversation with the `user` passed in.
+        Returns the conversations of `user`, latest first, as the other
+        participant of each one, with its `user` & profile, the `last_id`,
+        `last` date & `preview` of the last message & the `unread` count of
+        `user`. Everything is fetched in a single query, which can be paged
+        on `-last_id`.
         """
-        conversations = Message.objects.filter(user=user).values('conversation').annotate(
-            last=Max('date')).order_by('-last')
-        users = []
-        for conversation in conversations:
-            users.append({
-                'user':
-                User.objects.get(pk=conversation['conversation']),
-                'last':
-                conversation['last'],
-                'unread':
-                Message.objects.filter(user=user, conversation__pk=conversation['conversation'],
-                                       is_read=False).count(),
-            })
-
-        return users
+        messages = Message.objects.filter(conversation=OuterRef('conversation')).order_by('-id')
+        unread = Message.objects.filter(
+            conversation=OuterRef('conversation'),
+            from_user=OuterRef('user'),
+            id__gt=OuterRef('read_id'),
+        ).order_by().values('conversation').annotate(count=Count('id')).values('count')
+        return Participant.objects.filter(conversation__participants__user=user).exclude(user=user).annotate(
+            read_id=F('conversation__participants__last_read_message_id'),
+            last_id=Subquery(messages.values('id')[:1]),
+            last=Subquery(messages.values('date')[:1]),
+            preview=Subquery(messages.values('message')[:1]),
+            unread=Coalesce(Subquery(unread, output_field=models.IntegerField()), 0),
+        ).filter(last_id__isnull=False).select_related('user__profile').order_by('-last_id')
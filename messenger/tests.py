@@ -1,9 +1,22 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import tempfile
+import threading
+import time
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from mysite.pagination import CursorPaginator, encode_cursor
 
-from .models import Message
+from .hub import CacheHub, LocalHub
+from .models import Conversation, Message, Participant
 
 
 class TestMessageModel(TestCase):
@@ -17,24 +30,9 @@ class TestMessageModel(TestCase):
         self.other_user = get_user_model().objects.create(username='other_test_user',
                                                           email='other_test@gmail.com',
                                                           password='top_secret')
-        self.message_one = Message.objects.create(
-            user=self.user,
-            message="A not that long message",
-            conversation=self.user,
-            from_user=self.other_user,
-        )
-        self.message_two = Message.objects.create(
-            user=self.user,
-            message="A not that long message",
-            conversation=self.user,
-            from_user=self.other_user,
-        )
-        self.message_three = Message.objects.create(
-            user=self.other_user,
-            message="A shorter message",
-            conversation=self.other_user,
-            from_user=self.user,
-        )
+        self.message_one = Message.send_message(self.other_user, self.user, "A not that long message")
+        self.message_two = Message.send_message(self.other_user, self.user, "A not that long message")
+        self.message_three = Message.send_message(self.user, self.other_user, "A shorter message")
 
     def test_object_instance(self):
         self.assertTrue(isinstance(self.message_one, Message))
@@ -43,11 +41,193 @@ class TestMessageModel(TestCase):
         self.assertEqual(str(self.message_one), "A not that long message")
         self.assertEqual(self.message_one.message, "A not that long message")
         self.assertEqual(self.message_three.message, "A shorter message")
-        self.assertEqual(Message.get_conversations(self.user)[0]['last'], self.message_two.date)
-        self.assertEqual(Message.get_conversations(self.other_user)[0]['last'], self.message_three.date)
+        self.assertEqual(Message.get_conversations(self.user)[0].last, self.message_three.date)
+        self.assertEqual(Message.get_conversations(self.other_user)[0].user, self.user)
 
     def test_sending_new_message(self):
         new_message = Message.send_message(self.other_user, self.user, "A short message")
         self.assertTrue(isinstance(new_message, Message))
-        self.assertEqual(Message.get_conversations(self.other_user)[0]['last'], new_message.date)
+        self.assertEqual(Message.get_conversations(self.other_user)[0].last, new_message.date)
         self.assertEqual(new_message.message, "A short message")
+
+    def test_single_row_per_message(self):
+        conversation = Conversation.get_between(self.user, self.other_user)
+        self.assertEqual(conversation, Conversation.get_between(self.other_user, self.user))
+        self.assertEqual(Conversation.objects.count(), 1)
+        self.assertEqual(list(Message.get_thread(self.user, self.other_user)),
+                         [self.message_one, self.message_two, self.message_three])
+        self.assertEqual(list(Message.get_thread(self.other_user, self.user)),
+                         list(Message.get_thread(self.user, self.other_user)))
+
+    def test_unread_watermark(self):
+        # Replying doesn't mark the messages received before as read.
+        self.assertEqual(list(Message.get_unread(self.user)), [self.message_one, self.message_two])
+        self.assertEqual(list(Message.get_unread(self.other_user)), [self.message_three])
+
+        conversation = Conversation.get_between(self.user, self.other_user)
+        conversation.mark_read(self.user, self.message_one.pk)
+        self.assertEqual(list(Message.get_unread(self.user)), [self.message_two])
+
+        # The watermark never moves back.
+        conversation.mark_read(self.user)
+        conversation.mark_read(self.user, self.message_one.pk)
+        self.assertEqual(Message.get_unread(self.user).count(), 0)
+        self.assertEqual(Participant.objects.get(conversation=conversation, user=self.user).last_read_message_id,
+                         self.message_three.pk)
+        self.assertEqual(Message.get_conversations(self.user)[0].unread, 0)
+        self.assertEqual(Message.get_conversations(self.other_user)[0].unread, 1)
+
+    def test_conversations_single_query(self):
+        for index in range(3):
+            partner = get_user_model().objects.create(username='partner_{}'.format(index))
+            Message.send_message(partner, self.user, 'Hello {}'.format(index))
+        Message.send_message(self.user, self.other_user, 'Latest')
+
+        with self.assertNumQueries(1):
+            conversations = [(conversation.user.username, conversation.user.profile.screen_name(),
+                              conversation.preview, conversation.unread)
+                             for conversation in Message.get_conversations(self.user)]
+        self.assertEqual(conversations, [
+            ('other_test_user', 'other_test_user', 'Latest', 2),
+            ('partner_2', 'partner_2', 'Hello 2', 1),
+            ('partner_1', 'partner_1', 'Hello 1', 1),
+            ('partner_0', 'partner_0', 'Hello 0', 1),
+        ])
+
+        paginator = CursorPaginator(Message.get_conversations(self.user), 3, ('-last_id', ))
+        first_page = paginator.page()
+        second_page = paginator.page(first_page.next_cursor)
+        self.assertEqual([conversation.user.username for conversation in second_page], ['partner_0'])
+        self.assertFalse(second_page.has_next())
+
+    def test_inbox_view(self):
+        self.user.set_password('top_secret')
+        self.user.save()
+        self.client.login(username='test_user', password='top_secret')
+        self.user.profile.contact_list.add(self.other_user)
+        self.other_user.profile.contact_list.add(self.user)
+
+        response = self.client.get(reverse('messages', args=['other_test_user']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['conversations'][0].unread, 0)
+        self.assertEqual(self.client.get(reverse('inbox'), {'cursor': 'nope'}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('inbox'), {'cursor': encode_cursor(['x'])}).status_code, 404)
+
+    def test_messages_api(self):
+        self.client.force_login(self.user)
+        url = reverse('list_messages')
+        with CaptureQueriesContext(connection) as few_messages:
+            self.client.get(url, {'username': 'other_test_user'})
+        for _ in range(3):
+            Message.send_message(self.other_user, self.user, 'Again')
+        # The authors' profiles are joined, not read per message.
+        with self.assertNumQueries(len(few_messages)):
+            response = self.client.get(url, {'username': 'other_test_user'})
+        self.assertEqual(len(response.data['results']), 6)
+
+
+class TestHub(TestCase):
+    """
+    TestCase class to test the long-polling of new messages
+    """
+    def setUp(self):
+        self.hub = LocalHub()
+
+    def test_wait(self):
+        version = self.hub.version('1:2')
+        self.assertFalse(self.hub.wait('1:2', version, 0.01))
+
+        waiter = threading.Thread(target=lambda: results.append(self.hub.wait('1:2', version, 5)))
+        results = []
+        waiter.start()
+        self.hub.notify('1:3')
+        self.hub.notify('1:2')
+        waiter.join()
+        self.assertEqual(results, [True])
+        # A notification sent before waiting isn't missed.
+        self.assertTrue(self.hub.wait('1:2', version, 0))
+
+    def test_idle_conversations_are_evicted(self):
+        self.hub.notify('1:2')
+        self.hub.notify('1:3')
+        version, stale_version = self.hub.version('1:2'), self.hub.version('1:3')
+        waiter = threading.Thread(target=lambda: self.hub.wait('1:2', version, 5))
+        waiter.start()
+        while not self.hub._waiters['1:2']:
+            time.sleep(0.01)
+        later = time.monotonic() + self.hub.evict_after + 1
+        with mock.patch('messenger.hub.time.monotonic', return_value=later):
+            self.hub.notify('1:4')
+        self.assertEqual(set(self.hub._versions), {'1:2', '1:4'})
+        self.hub.notify('1:2')
+        waiter.join()
+        # An evicted conversation doesn't get its former version back.
+        self.hub.notify('1:3')
+        self.assertTrue(self.hub.wait('1:3', stale_version, 0))
+
+    def test_cache_hub(self):
+        with self.assertRaises(ImproperlyConfigured):
+            CacheHub()
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}):
+            hub, other_process_hub = CacheHub(), CacheHub()
+            version = hub.version('1:2')
+            other_process_hub.notify('1:2')
+            self.assertTrue(hub.wait('1:2', version, 1))
+            self.assertFalse(hub.wait('1:2', hub.version('1:2'), 0.01))
+
+    @override_settings(MESSENGER_WAIT_TIMEOUT=0)
+    def test_wait_view(self):
+        user = get_user_model().objects.create_user(username='test_user', password='top_secret')
+        other_user = get_user_model().objects.create_user(username='other_test_user', password='top_secret')
+        other_user.profile.contact_list.add(user)
+        self.client.login(username='test_user', password='top_secret')
+        url = reverse('wait_new_messages')
+
+        message = Message.send_message(other_user, user, 'Hello')
+        response = self.client.get(url, {'username': 'other_test_user', 'last_message_id': 0},
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertContains(response, 'message-id="{}"'.format(message.pk))
+        self.assertEqual(Message.get_unread(user).count(), 0)
+
+        response = self.client.get(url, {'username': 'other_test_user', 'last_message_id': message.pk},
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.content, b'')
+
+
+class TestDedupeMigration(TransactionTestCase):
+    """
+    TestCase class to test the migration merging the two copies of the messages
+    """
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_copies_are_merged(self):
+        apps = self.migrate([('messenger', '0002_conversations')])
+        OldUser = apps.get_model('auth', 'User')
+        OldMessage = apps.get_model('messenger', 'Message')
+        user = OldUser.objects.create(username='test_user')
+        other_user = OldUser.objects.create(username='other_test_user')
+
+        def send(from_user, to_user, message, is_read=True):
+            sent = OldMessage.objects.create(user=from_user, conversation=to_user, from_user=from_user,
+                                             message=message, is_read=True)
+            OldMessage.objects.create(user=to_user, conversation=from_user, from_user=from_user,
+                                      message=message, is_read=is_read)
+            return sent.pk
+
+        first_id = send(user, other_user, 'hi')
+        second_id = send(user, other_user, 'hi', is_read=False)
+        reply_id = send(other_user, user, 'yo')
+        lost = OldMessage.objects.create(user=other_user, conversation=user, from_user=user, message='lost')
+
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+        self.assertEqual(list(Message.objects.order_by('id').values_list('id', 'message')),
+                         [(first_id, 'hi'), (second_id, 'hi'), (reply_id, 'yo'), (lost.pk, 'lost')])
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation.key, '{}:{}'.format(user.pk, other_user.pk))
+        self.assertEqual(dict(Participant.objects.values_list('user', 'last_read_message_id')),
+                         {user.pk: lost.pk, other_user.pk: second_id - 1})
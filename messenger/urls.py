@@ -10,6 +10,7 @@ urlpatterns = [
     url(r'^delete/$', views.delete, name='delete_message'),
     url(r'^check/$', views.check, name='check_message'),
     url(r'^load_new_messages/$', views.load_new_messages, name='load_new_messages'),
+    url(r'^wait_new_messages/$', views.wait_new_messages, name='wait_new_messages'),
     url(r'^load_last_twenty_messages/$', views.load_last_twenty_messages, name='load_last_twenty_messages'),
     url(r'^(?P<username>[^/]+)/$', views.messages, name='messages'),
 ]
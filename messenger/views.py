@@ -2,14 +2,34 @@
 # -*- coding: utf-8 -*-
 import json
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import HttpResponse, HttpResponseBadRequest
-from django.shortcuts import render
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.shortcuts import get_object_or_404, render
 
 from mysite.decorators import ajax_required
+from mysite.pagination import CursorPaginator, InvalidCursor
+from users.counters import get_unread_counts
 
-from .models import Message
+from .hub import get_hub
+from .models import Conversation, Message
+
+CONVERSATIONS_PER_PAGE = 20
+
+
+def is_contact(user, other_user):
+    """Returns whether `other_user` is in the contact list of `user`."""
+    return user.profile.contact_list.filter(pk=other_user.pk).exists()
+
+
+def get_conversations_page(request):
+    """Returns the page of the user's conversations asked for by the `cursor` parameter."""
+    paginator = CursorPaginator(Message.get_conversations(request.user), CONVERSATIONS_PER_PAGE, ('-last_id', ))
+    try:
+        return paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404('Invalid cursor.')
 
 
 @login_required
@@ -17,7 +37,7 @@ def inbox(request):
     """
     Displays an inbox page of user.
     """
-    conversations = Message.get_conversations(user=request.user)
+    conversations = get_conversations_page(request)
     users_list = request.user.profile.contact_list.all().filter(is_active=True)
 
     never_send_msg = True
@@ -36,16 +56,14 @@ def messages(request, username):
     """
     user = User.objects.get(username=username)
 
-    if request.user in user.profile.contact_list.all():
-        conversations = Message.get_conversations(user=request.user)
+    if is_contact(user, request.user):
+        conversation = Conversation.get_between(request.user, user)
+        if conversation is not None:
+            conversation.mark_read(request.user)
+        conversations = get_conversations_page(request)
         users_list = request.user.profile.contact_list.all().filter(is_active=True)
         active_conversation = username
-        chat_msgs = Message.objects.filter(user=request.user, conversation__username=username)
-        chat_msgs.update(is_read=True)
-
-        for conversation in conversations:
-            if conversation['user'].username == username:
-                conversation['unread'] = 0
+        chat_msgs = Message.get_thread(request.user, user)
 
         return render(
             request, 'messenger/inbox.html', {
@@ -68,26 +86,53 @@ def load_new_messages(request):
     username = request.GET.get('username')
     user = User.objects.get(username=username)
 
-    if request.user in user.profile.contact_list.all():
-        chat_msgs = Message.objects.filter(user=request.user, conversation__username=username,
-                                           id__gt=last_message_id).exclude(from_user=request.user)
+    if is_contact(user, request.user):
+        chat_msgs = Message.get_thread(request.user, user).filter(id__gt=last_message_id)
+        chat_msgs = chat_msgs.exclude(from_user=request.user)
         if chat_msgs:
-            chat_msgs.update(is_read=True)
+            chat_msgs[0].conversation.mark_read(request.user, max(chat_msg.pk for chat_msg in chat_msgs))
             return render(request, 'messenger/includes/partial_load_more_messages.html', {'chat_msgs': chat_msgs})
         else:
             return HttpResponse('')
 
 
+@login_required
+@ajax_required
+def wait_new_messages(request):
+    """
+    Long-polls new messages: answers as soon as a message newer than
+    `last_message_id` is sent by the other user, or with an empty response
+    after `MESSENGER_WAIT_TIMEOUT` seconds.
+    """
+    user = get_object_or_404(User, username=request.GET.get('username'))
+    try:
+        last_message_id = int(request.GET.get('last_message_id', 0))
+    except ValueError:
+        return HttpResponseBadRequest()
+
+    if is_contact(user, request.user):
+        hub = get_hub()
+        key = Conversation.get_key(request.user.pk, user.pk)
+        version = hub.version(key)
+        chat_msgs = Message.get_thread(request.user, user).filter(id__gt=last_message_id)
+        chat_msgs = chat_msgs.exclude(from_user=request.user)
+        if not chat_msgs and hub.wait(key, version, settings.MESSENGER_WAIT_TIMEOUT):
+            chat_msgs = chat_msgs.all()
+        if chat_msgs:
+            chat_msgs[0].conversation.mark_read(request.user, max(chat_msg.pk for chat_msg in chat_msgs))
+            return render(request, 'messenger/includes/partial_load_more_messages.html', {'chat_msgs': chat_msgs})
+    return HttpResponse('')
+
+
 @login_required
 @ajax_required
 def load_last_twenty_messages(request):
     load_from_msg_id = request.GET.get('load_from_msg_id')
     username = request.GET.get('username')
     user = User.objects.get(username=username)
-    if request.user in user.profile.contact_list.all():
-        chat_msgs = Message.objects.filter(user=request.user, conversation__username=username, id__lt=load_from_msg_id)
+    if is_contact(user, request.user):
+        chat_msgs = Message.get_thread(request.user, user).filter(id__lt=load_from_msg_id)
         if chat_msgs:
-            chat_msgs.update(is_read=True)
             return render(request, 'messenger/includes/partial_load_more_messages.html', {'chat_msgs': chat_msgs})
         else:
             return HttpResponse('')
@@ -127,5 +172,4 @@ def check(request):
     """
     Checks for new messages.
     """
-    count = Message.objects.filter(user=request.user, is_read=False).count()
-    return HttpResponse(count)
+    return HttpResponse(get_unread_counts(request.user.pk)['unread_messages'])
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keyset (cursor) pagination.
+
+Instead of `OFFSET`, pages are fetched with a `WHERE` clause on the position
+of the last item seen, e.g. `(created, id) < (last_created, last_id)`, so deep
+pages cost the same as the first one & no `COUNT(*)` is needed. Positions are
+handed out as opaque url-safe tokens.
+"""
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(position, reverse=False):
+    """Returns an opaque token for a position (list of ordering values)."""
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in position]
+    payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """Returns the `(position, reverse)` pair stored in a token."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(payload.decode())
+        position, reverse = list(data['p']), bool(data['r'])
+    except (TypeError, ValueError, KeyError, binascii.Error):
+        raise InvalidCursor(cursor)
+    if len(position) != len(ordering):
+        raise InvalidCursor(cursor)
+    return position, reverse
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+
+def keyset_filter(ordering, position):
+    """
+    Returns a filter matching the rows that come after `position` in `ordering`.
+    """
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = '{}__{}'.format(name, 'lt' if field.startswith('-') else 'gt')
+        step = Q(**{lookup: position[index]})
+        for previous_field, previous_value in zip(ordering[:index], position[:index]):
+            step &= Q(**{previous_field.lstrip('-'): previous_value})
+        condition |= step
+    return condition
+
+
+class CursorPage:
+    """
+    A page of results with opaque tokens for its neighbouring pages.
+    """
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of {} items>'.format(len(self.object_list))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Paginates a queryset on a unique `ordering`, e.g. `('-created', '-id')`.
+    """
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    def get_position(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def page(self, cursor=None):
+        """Returns the page starting after (or, going back, before) `cursor`."""
+        position, reverse = decode_cursor(cursor, self.ordering) if cursor else (None, False)
+        return self._page(position, reverse)
+
+    def since(self, cursor):
+        """Returns the page of items that come right before `cursor`, i.e. the newer ones."""
+        position, _ = decode_cursor(cursor, self.ordering)
+        return self._page(position, reverse=True)
+
+    def _page(self, position, reverse):
+        ordering = reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = self.queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(keyset_filter(ordering, position))
+            except (TypeError, ValueError, ValidationError):
+                # A hand-edited token holding values of the wrong type.
+                raise InvalidCursor(position)
+
+        object_list = list(queryset[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if reverse:
+            object_list.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        next_cursor = previous_cursor = None
+        if object_list and has_next:
+            next_cursor = encode_cursor(self.get_position(object_list[-1]))
+        if object_list and has_previous:
+            previous_cursor = encode_cursor(self.get_position(object_list[0]), reverse=True)
+        return CursorPage(object_list, next_cursor, previous_cursor)
+
+
+class CursorPaginationMixin:
+    """
+    ListView mixin that paginates with `CursorPaginator` instead of OFFSET.
+    """
+    cursor_ordering = ('-created', '-id')
+    cursor_kwarg = 'cursor'
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size, self.get_cursor_ordering())
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class CursorAPIPagination(BasePagination):
+    """
+    REST framework pagination class built on `CursorPaginator`.
+
+    Every response carries a `since` token for its newest item. Requesting
+    `?since=<token>` later returns only the items added in the meantime; when
+    there are more than a page of them, the `previous` link continues
+    towards the newest ones.
+    """
+    page_size = 20
+    ordering = ('-created', '-id')
+    cursor_query_param = 'cursor'
+    since_query_param = 'since'
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.paginator = CursorPaginator(queryset, self.page_size, self.get_ordering(request, queryset, view))
+        self.since = request.query_params.get(self.since_query_param)
+        try:
+            if self.since:
+                self.page = self.paginator.since(self.since)
+            else:
+                self.page = self.paginator.page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound('Invalid cursor.')
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.since_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_since_token(self):
+        if self.page.object_list:
+            return encode_cursor(self.paginator.get_position(self.page.object_list[0]))
+        return self.since
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([
+                ('next', self.get_link(self.page.next_cursor)),
+                ('previous', self.get_link(self.page.previous_cursor)),
+                ('since', self.get_since_token()),
+                ('results', data),
+            ]))
@@ -24,6 +24,8 @@ INSTALLED_APPS = [
     'notifications',
     'reports',
     'search',
+    'tasks',
+    'events',
     'messenger',
     'users',
     'crispy_forms',
@@ -129,6 +131,24 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media_root')
 # google recaptcha settings
 GOOGLE_RECAPTCHA_SECRET_KEY = config('GOOGLE_RECAPTCHA_SECRET_KEY')
 
+# subjects rank settings (seconds between background rank updates, 0 disables the scheduler)
+RANK_UPDATE_INTERVAL = config('RANK_UPDATE_INTERVAL', default=0, cast=int)
+
+# task queue settings (run tasks inline instead of queueing them for `manage.py run_tasks`)
+TASKS_EAGER = config('TASKS_EAGER', default=False, cast=bool)
+
+# search settings (backend class & directory of the pure-Python backend's index)
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='search.backends.python.PythonSearchBackend')
+SEARCH_INDEX_DIR = config('SEARCH_INDEX_DIR', default=os.path.join(BASE_DIR, 'search_index'))
+
+# messenger settings (hub waking long-polling chat clients & seconds a poll waits for new messages).
+# `LocalHub` only wakes polls served by the process storing the message, so it only suits a single
+# process. Deployments with several worker processes must use `messenger.hub.CacheHub` along with a
+# `CACHES` backend shared by the processes (memcached, redis...); it refuses the local memory cache.
+# The unread counters & username index in `users` are cached as well and need the same shared cache.
+MESSENGER_HUB = config('MESSENGER_HUB', default='messenger.hub.LocalHub')
+MESSENGER_WAIT_TIMEOUT = config('MESSENGER_WAIT_TIMEOUT', default=25, cast=int)
+
 # djangorestframework settings
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticatedOrReadOnly', ),
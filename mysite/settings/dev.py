@@ -10,6 +10,12 @@ DATABASES = {
     }
 }
 
+# search settings
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='search.backends.fts5.FTS5SearchBackend')
+
+# task queue settings
+TASKS_EAGER = config('TASKS_EAGER', default=True, cast=bool)
+
 # email settings
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
@@ -67,6 +67,7 @@ urlpatterns = [
     re_path(r'^u/friends/requests/$', users_views.all_message_requests, name='all_message_requests'),
     re_path(r'^activities/$', notifications_views.ActivitiesPageView.as_view(), name='activities'),
     re_path(r'^activities/check/$', notifications_views.check_activities, name='check_activities'),
+    re_path(r'^badges/$', users_views.badges, name='badges'),
 
     # login / logout urls
     re_path(r'^login/$', auth_views.LoginView.as_view(extra_context={'form_filling': True}), name='login'),
@@ -122,6 +123,7 @@ urlpatterns = [
     re_path(r'^api/users/', include('users.api.urls')),
     re_path(r'^api/users/', include('notifications.api.urls')),
     re_path(r'^api/messages/', include('messenger.api.urls')),
+    re_path(r'^api/search/', include('search.api.urls')),
 ]
 
 if True:
@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from mysite.pagination import CursorAPIPagination
+
+
+class NotificationCursorPagination(CursorAPIPagination):
+    page_size = 20
+    ordering = ('-created', '-id')
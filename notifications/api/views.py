@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 
 from notifications.models import Notification
 
+from .pagination import NotificationCursorPagination
 from .serializers import NotificationSerializer
 
 
@@ -14,13 +15,9 @@ class NotificationListAPIView(ListAPIView):
     """
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificationCursorPagination
 
     def get_queryset(self, *args, **kwargs):
         queryset_list = Notification.get_user_notification(self.request.user)
-        unread_notifications = queryset_list.filter(is_read=False)
-        # Add celery or something to alter the is_read flag in background
-        # So this flag could be used in front end for styling purposes
-        for notification in unread_notifications:
-            notification.is_read = True
-            notification.save()
+        Notification.mark_all_read(self.request.user)
         return queryset_list
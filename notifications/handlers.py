@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from comments.models import Comment
+from events.bus import subscribe
+from events.domain import CommentPosted, MessageRequestAccepted, MessageRequestSent, SubjectCreated, UserFollowed
+from subjects.models import Subject
+
+from .mentions import mention_in_comment, mention_in_subject
+from .models import Notification
+
+
+@subscribe(SubjectCreated)
+def notify_subject_mentions(event):
+    """Records & notifies the users mentioned in a subject."""
+    subject = Subject.objects.select_related('author').filter(pk=event.subject_id).first()
+    if subject is not None:
+        mention_in_subject(subject, subject.author)
+
+
+@subscribe(CommentPosted)
+def notify_comment(event):
+    """Notifies the author of the commented subject & the users mentioned in a comment."""
+    comment = Comment.objects.select_related('subject', 'commenter').filter(pk=event.comment_id).first()
+    if comment is None:
+        return
+    if comment.commenter_id != comment.subject.author_id:
+        Notification.objects.create(Actor=comment.commenter,
+                                    Object=comment.subject,
+                                    Target_id=comment.subject.author_id,
+                                    notif_type='comment')
+    mention_in_comment(comment, comment.commenter)
+
+
+def _notify_users(pairs, notif_type):
+    Notification.bulk_notify([
+        Notification(Actor_id=actor_id, Target_id=target_id, notif_type=notif_type) for actor_id, target_id in pairs
+    ])
+
+
+@subscribe(UserFollowed, batch=True)
+def notify_follows(events):
+    _notify_users([(event.follower_id, event.followed_id) for event in events], 'follow')
+
+
+@subscribe(MessageRequestSent, batch=True)
+def notify_message_requests(events):
+    _notify_users([(event.sender_id, event.receiver_id) for event in events], 'sent_msg_request')
+
+
+@subscribe(MessageRequestAccepted, batch=True)
+def notify_accepted_message_requests(events):
+    _notify_users([(event.acceptor_id, event.sender_id) for event in events], 'confirmed_msg_request')
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mentions of members (`u/username`) in subjects & comments.
+
+Every `u/` token of a text is resolved with a single `username__in` query,
+the mentioned users are added to `Subject.mentioned` in one go & their
+notifications are created with one `bulk_create`.
+"""
+import re
+
+from django.contrib.auth.models import User
+
+from .models import Notification
+
+# Mentions end in a word character, so punctuation closing a sentence isn't part of them.
+MENTION_RE = re.compile(r'(?<!\S)u/([\w.@+-]*\w)')
+
+
+def extract_usernames(*texts):
+    """Returns the distinct usernames mentioned in the texts, in order of appearance."""
+    usernames = []
+    for text in texts:
+        for username in MENTION_RE.findall(text or ''):
+            if username not in usernames:
+                usernames.append(username)
+    return usernames
+
+
+def resolve_mentions(*texts):
+    """Returns the users mentioned in the texts."""
+    usernames = extract_usernames(*texts)
+    if not usernames:
+        return []
+    return list(User.objects.filter(username__in=usernames))
+
+
+def notify_mentioned(actor, subject, users, notif_type):
+    """Notifies the mentioned users, except the actor mentioning themselves."""
+    notifications = [
+        Notification(Actor=actor, Object=subject, Target=user, notif_type=notif_type)
+        for user in users if user.pk != actor.pk
+    ]
+    if notifications:
+        Notification.bulk_notify(notifications)
+    return notifications
+
+
+def mention_in_subject(subject, actor):
+    """Records & notifies the users mentioned in the title & body of a subject."""
+    users = resolve_mentions(subject.title, subject.body)
+    if users:
+        subject.mentioned.add(*users)
+        notify_mentioned(actor, subject, users, 'subject_mentioned')
+    return users
+
+
+def mention_in_comment(comment, actor):
+    """Notifies the users mentioned in the body of a comment."""
+    users = resolve_mentions(comment.body)
+    if users:
+        notify_mentioned(actor, comment.subject, users, 'comment_mentioned')
+    return users
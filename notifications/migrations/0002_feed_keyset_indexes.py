@@ -0,0 +1,17 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['Target', 'created', 'id'], name='notificatio_Target__06d883_idx'),
+        ),
+    ]
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+from collections import Counter
+
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from subjects.models import Subject
+from users.counters import update_unread_counts
 
 
 class Notification(models.Model):
@@ -28,6 +33,9 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ('-created', )
+        indexes = [
+            models.Index(fields=['Target', 'created', 'id']),
+        ]
 
     def __str__(self):
         """
@@ -54,3 +62,39 @@ class Notification(models.Model):
             notifications = Notification.objects.filter(Target=user).exclude(Actor=user)
             return notifications
         return []
+
+    def is_unread(self):
+        """Returns whether the notification counts as unread for its target."""
+        return not self.is_read and self.Actor_id != self.Target_id
+
+    @staticmethod
+    def bulk_notify(notifications):
+        """Creates notifications in one go & counts them as unread for their targets."""
+        notifications = Notification.objects.bulk_create(notifications)
+        update_unread_counts('unread_notifications',
+                             Counter(notification.Target_id for notification in notifications
+                                     if notification.is_unread()))
+        return notifications
+
+    @staticmethod
+    def mark_all_read(user):
+        """Marks the notifications of `user` as read with a single UPDATE."""
+        read = Notification.objects.filter(Target=user, is_read=False).exclude(Actor=user).update(is_read=True)
+        update_unread_counts('unread_notifications', {user.pk: -read})
+        return read
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, raw, **kwargs):
+    """
+    Signals the Profile to count notifications created one at a time (see
+    `Notification.bulk_notify` for the others).
+    """
+    if created and not raw and instance.is_unread():
+        update_unread_counts('unread_notifications', {instance.Target_id: 1})
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if instance.is_unread():
+        update_unread_counts('unread_notifications', {instance.Target_id: -1})
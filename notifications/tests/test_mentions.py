@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from boards.models import Board
+from comments.models import Comment
+from subjects.models import Subject
+from utils.testing import OnCommitTestCase
+
+from ..mentions import extract_usernames, mention_in_comment, mention_in_subject
+from ..models import Notification
+
+
+class TestMentions(OnCommitTestCase):
+    """
+    TestCase class to test the mentions of members.
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='test_user',
+                                                    email='test@gmail.com',
+                                                    password='top_secret')
+        self.members = [
+            get_user_model().objects.create(username='member_{}'.format(i), email='member_{}@gmail.com'.format(i))
+            for i in range(30)
+        ]
+        self.board = Board.objects.create(title='test title', description='some random words')
+
+    def test_extract_usernames(self):
+        text = 'Hi u/bob,\nu/alice & u/bob! Not mentioned: you/carol au/dave u/'
+        self.assertEqual(extract_usernames(text, 'u/erin'), ['bob', 'alice', 'erin'])
+        self.assertEqual(extract_usernames('Ask u/bob. Or u/j.doe... Or u/erin-.'), ['bob', 'j.doe', 'erin'])
+
+    def test_mention_in_subject(self):
+        subject = Subject.objects.create(title='Hello', body='World', author=self.user, board=self.board)
+        subject.title = 'Hello u/test_user u/nobody'
+        subject.body = ' '.join('u/{}'.format(member.username) for member in self.members)
+        with self.assertNumQueries(5):
+            mentioned = mention_in_subject(subject, self.user)
+        self.assertEqual(len(mentioned), 31)
+        self.assertEqual(subject.mentioned.count(), 31)
+        self.assertEqual(Notification.objects.filter(notif_type='subject_mentioned').count(), 30)
+        self.assertFalse(Notification.objects.filter(Target=self.user).exists())
+
+    def test_mention_in_comment(self):
+        subject = Subject.objects.create(title='Hello', body='World', author=self.user, board=self.board)
+        comment = Comment.objects.create(body='Hi', subject=subject, commenter=self.user)
+        comment.body = 'u/member_1 u/member_1 u/member_2'
+        with self.assertNumQueries(3):
+            mention_in_comment(comment, self.user)
+        notifications = Notification.objects.filter(notif_type='comment_mentioned', Object=subject)
+        self.assertEqual(sorted(notification.Target.username for notification in notifications),
+                         ['member_1', 'member_2'])
+
+    def test_subject_api_mentions_the_mentioned_users(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('list_or_create_subjects'), {
+            'title': 'Hello u/member_3', 'body': 'World', 'board': self.board.pk})
+        self.assertEqual(response.status_code, 201)
+        subject = Subject.objects.get(title='Hello u/member_3')
+        self.assertEqual(list(subject.mentioned.all()), [self.members[3]])
@@ -7,11 +7,13 @@ from django.utils.decorators import method_decorator
 from django.views.generic import ListView
 
 from mysite.decorators import ajax_required
+from mysite.pagination import CursorPaginationMixin
+from users.counters import get_unread_counts
 
 from .models import Notification
 
 
-class ActivitiesPageView(LoginRequiredMixin, ListView):
+class ActivitiesPageView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """Basic ListView implementation to call the activities list per user."""
     model = Notification
     paginate_by = 20
@@ -20,16 +22,11 @@ class ActivitiesPageView(LoginRequiredMixin, ListView):
 
     def get_queryset(self, **kwargs):
         subject_events = Notification.objects.filter(Target=self.request.user).exclude(Actor=self.request.user)
-        # Do this with celery.
-        unread_subject_events = subject_events.filter(is_read=False)
-        for notification in unread_subject_events:
-            notification.is_read = True
-            notification.save()
+        Notification.mark_all_read(self.request.user)
         return subject_events
 
 
 @login_required
 @ajax_required
 def check_activities(request):
-    subject_events = Notification.objects.filter(Target=request.user, is_read=False).exclude(Actor=request.user)
-    return HttpResponse(len(subject_events))
+    return HttpResponse(get_unread_counts(request.user.pk)['unread_notifications'])
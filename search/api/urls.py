@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.conf.urls import url
+
+from .views import typeahead
+
+urlpatterns = [
+    url(r'^typeahead/$', typeahead, name='typeahead'),
+]
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from ..typeahead import TYPEAHEAD_LIMIT, board_typeahead, user_typeahead
+
+TYPEAHEADS = {'boards': board_typeahead, 'users': user_typeahead}
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def typeahead(request):
+    """
+    Return the boards & users starting with `q`, the most subscribed or
+    followed first. `type` restricts the results to `boards` or `users`.
+    """
+    prefix = request.query_params.get('q', '').strip()
+    try:
+        limit = min(max(int(request.query_params.get('limit', TYPEAHEAD_LIMIT)), 1), TYPEAHEAD_LIMIT)
+    except ValueError:
+        limit = TYPEAHEAD_LIMIT
+    kind = request.query_params.get('type')
+    names = [kind] if kind in TYPEAHEADS else list(TYPEAHEADS)
+    return Response({name: TYPEAHEADS[name].search(prefix, limit) for name in names})
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """Returns the search backend configured by `settings.SEARCH_BACKEND`."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(settings.SEARCH_BACKEND)()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_search_backend(setting, **kwargs):
+    global _backend
+    if setting in ('SEARCH_BACKEND', 'SEARCH_INDEX_DIR'):
+        with _backend_lock:
+            if _backend is not None:
+                _backend.close()
+            _backend = None
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+SEARCH_LIMIT = 1000
+
+
+class BaseSearchBackend:
+    """
+    Interface of the subject search backends.
+
+    Backends index the title & body of active subjects and return the ids of
+    the subjects matching every term of a query, best BM25 match first.
+    """
+    def index_subjects(self, subjects):
+        """Adds or replaces subjects in the index."""
+        raise NotImplementedError
+
+    def remove_subjects(self, subject_ids):
+        """Removes subjects from the index."""
+        raise NotImplementedError
+
+    def search(self, query, board_id=None, limit=SEARCH_LIMIT):
+        """Returns the ids of the subjects matching `query`, best match first."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Removes every subject from the index."""
+        raise NotImplementedError
+
+    def close(self):
+        """Releases the resources held by the backend."""
+
+    def rebuild(self, subjects):
+        """Replaces the whole index with `subjects`."""
+        self.clear()
+        self.index_subjects(subjects)
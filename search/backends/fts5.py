@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.db import connection
+
+from ..analysis import tokenize
+from .base import SEARCH_LIMIT, BaseSearchBackend
+
+FTS_TABLE = 'search_subject_fts'
+# bm25() weights of the title & body columns.
+TITLE_WEIGHT = 2.0
+BODY_WEIGHT = 1.0
+
+
+def match_expression(query):
+    """
+    Returns an FTS5 query matching every word of `query`. Words are quoted so
+    FTS5 operators typed by users are searched for literally.
+    """
+    return ' '.join('"{}"'.format(token) for token in tokenize(query))
+
+
+class FTS5SearchBackend(BaseSearchBackend):
+    """
+    Search backend using an SQLite FTS5 table (created by the search
+    migrations) with the porter tokenizer & its builtin bm25() ranking.
+    """
+    def index_subjects(self, subjects):
+        rows = [(subject.id, subject.title, subject.body or '', subject.board_id) for subject in subjects]
+        with connection.cursor() as cursor:
+            cursor.executemany('DELETE FROM {} WHERE rowid = %s'.format(FTS_TABLE), [row[:1] for row in rows])
+            cursor.executemany(
+                'INSERT INTO {} (rowid, title, body, board_id) VALUES (%s, %s, %s, %s)'.format(FTS_TABLE), rows)
+
+    def remove_subjects(self, subject_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany('DELETE FROM {} WHERE rowid = %s'.format(FTS_TABLE),
+                               [(subject_id, ) for subject_id in subject_ids])
+
+    def search(self, query, board_id=None, limit=SEARCH_LIMIT):
+        expression = match_expression(query)
+        if not expression:
+            return []
+        sql = 'SELECT rowid FROM {0} WHERE {0} MATCH %s'.format(FTS_TABLE)
+        params = [expression]
+        if board_id is not None:
+            sql += ' AND board_id = %s'
+            params.append(board_id)
+        sql += ' ORDER BY bm25({}, %s, %s) LIMIT %s'.format(FTS_TABLE)
+        params += [TITLE_WEIGHT, BODY_WEIGHT, limit]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {}'.format(FTS_TABLE))
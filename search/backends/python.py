@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from ..analysis import analyze
+from ..index import InvertedIndex, bm25, document_terms
+from ..segments import Segment, merge_segments, select_merge, write_segment
+from .base import SEARCH_LIMIT, BaseSearchBackend
+
+logger = logging.getLogger(__name__)
+
+MERGE_FACTOR = 10
+
+
+class SegmentMerger(threading.Thread):
+    """
+    Daemon thread merging the segments of a backend whenever it's notified
+    about new ones.
+    """
+    def __init__(self, backend):
+        super().__init__(name='search-segment-merger', daemon=True)
+        self.backend = backend
+        self._pending = threading.Event()
+        self._stopped = False
+
+    def notify(self):
+        self._pending.set()
+
+    def run(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            if self._stopped:
+                return
+            try:
+                self.backend.merge()
+            except Exception:
+                logger.exception('Search segment merge failed.')
+
+    def stop(self):
+        self._stopped = True
+        self._pending.set()
+
+
+class PythonSearchBackend(BaseSearchBackend):
+    """
+    Pure-Python search backend storing the index in `settings.SEARCH_INDEX_DIR`
+    as immutable, memory-mapped segments listed by a manifest.
+
+    Every write adds a small segment & atomically replaces the manifest, so
+    readers are never blocked & see either the old or the new index. A
+    background thread merges small segments into bigger ones. BM25 statistics
+    include shadowed documents until they are merged away, like Lucene does.
+    """
+    manifest_name = 'segments.json'
+
+    def __init__(self, path=None, merge_in_background=True):
+        self.path = path or settings.SEARCH_INDEX_DIR
+        os.makedirs(self.path, exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._manifest_stamp = None
+        self._segments = []
+        self._merger = None
+        if merge_in_background:
+            self._merger = SegmentMerger(self)
+            self._merger.start()
+
+    def close(self):
+        if self._merger is not None:
+            self._merger.stop()
+            self._merger.join()
+            self._merger = None
+
+    @property
+    def manifest_file(self):
+        return os.path.join(self.path, self.manifest_name)
+
+    def _segment_file(self, name):
+        return os.path.join(self.path, '{}.seg'.format(name))
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_file) as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return {'segments': [], 'next': 1}
+
+    def _write_manifest(self, manifest):
+        temporary_file = '{}.{}.tmp'.format(self.manifest_file, os.getpid())
+        with open(temporary_file, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(temporary_file, self.manifest_file)
+
+    @contextmanager
+    def _writing(self):
+        """Serializes writers of every thread & process using the index."""
+        with self._write_lock, open(os.path.join(self.path, 'write.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield self._read_manifest()
+
+    def _new_segment_name(self, manifest):
+        name = '{:08d}'.format(manifest['next'])
+        manifest['next'] += 1
+        return name
+
+    def get_segments(self):
+        """Returns the current segments, oldest first, reopening them if the manifest changed."""
+        with self._read_lock:
+            for attempt in range(3):
+                try:
+                    stat = os.stat(self.manifest_file)
+                except FileNotFoundError:
+                    self._manifest_stamp, self._segments = None, []
+                    return []
+                stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                if stamp == self._manifest_stamp:
+                    return self._segments
+                opened = {segment.path: segment for segment in self._segments}
+                try:
+                    self._segments = [
+                        opened.get(path) or Segment(path)
+                        for path in map(self._segment_file, self._read_manifest()['segments'])
+                    ]
+                except FileNotFoundError:
+                    # A merge removed a segment in the meantime, the manifest has changed too.
+                    continue
+                self._manifest_stamp = stamp
+                return self._segments
+            raise RuntimeError('The search index keeps changing while being opened.')
+
+    def _append_segment(self, documents, postings, tombstones=()):
+        with self._writing() as manifest:
+            name = self._new_segment_name(manifest)
+            write_segment(self._segment_file(name), documents, postings, tombstones)
+            manifest['segments'].append(name)
+            self._write_manifest(manifest)
+        if self._merger is not None:
+            self._merger.notify()
+
+    @staticmethod
+    def _invert(subjects):
+        """Returns the documents & postings of a segment holding `subjects`."""
+        buffer = InvertedIndex()
+        for subject in subjects:
+            buffer.add(subject.id, subject.board_id, document_terms(subject.title, subject.body))
+        return {doc_id: document[:2] for doc_id, document in buffer.documents.items()}, buffer.postings
+
+    def index_subjects(self, subjects):
+        documents, postings = self._invert(subjects)
+        if documents:
+            self._append_segment(documents, postings)
+
+    def remove_subjects(self, subject_ids):
+        if subject_ids:
+            self._append_segment({}, {}, set(subject_ids))
+
+    def merge(self):
+        """Merges segments until the merge policy is satisfied."""
+        while True:
+            with self._writing() as manifest:
+                segments = self.get_segments()
+                start = select_merge([segment.size for segment in segments], MERGE_FACTOR)
+                if start is None:
+                    return
+                run = manifest['segments'][start:]
+                segments = segments[start:]
+                name = self._new_segment_name(manifest)
+                self._write_manifest(manifest)
+
+            # Merging happens without the lock, other writers keep appending meanwhile.
+            merge_segments(self._segment_file(name), segments, keep_tombstones=start > 0)
+
+            with self._writing() as manifest:
+                current = manifest['segments']
+                if current[start:start + len(run)] != run:
+                    os.remove(self._segment_file(name))
+                    return
+                manifest['segments'] = current[:start] + [name] + current[start + len(run):]
+                self._write_manifest(manifest)
+            for segment_name in run:
+                os.remove(self._segment_file(segment_name))
+
+    def search(self, query, board_id=None, limit=SEARCH_LIMIT):
+        terms = set(analyze(query))
+        segments = self.get_segments()
+        if not terms or not segments:
+            return []
+        documents = sum(segment.doc_count for segment in segments)
+        average_length = sum(segment.total_length for segment in segments) / max(documents, 1)
+        document_frequencies = {
+            term: sum(segment.document_frequency(term) for segment in segments) for term in terms
+        }
+        if not all(document_frequencies.values()):
+            return []
+
+        scores = {}
+        for position, segment in enumerate(segments):
+            postings = sorted(((segment.postings(term), document_frequencies[term]) for term in terms),
+                              key=lambda item: len(item[0]))
+            for doc_id in postings[0][0]:
+                if not all(doc_id in term_postings for term_postings, _ in postings[1:]):
+                    continue
+                board, length = segment.document(doc_id)
+                if board_id is not None and board != board_id:
+                    continue
+                if any(newer.shadows(doc_id) for newer in segments[position + 1:]):
+                    continue
+                scores[doc_id] = sum(
+                    bm25(term_postings[doc_id], frequency, length, documents, average_length)
+                    for term_postings, frequency in postings)
+        return sorted(scores, key=lambda doc_id: (-scores[doc_id], -doc_id))[:limit]
+
+    def clear(self):
+        with self._writing() as manifest:
+            names = manifest['segments']
+            manifest['segments'] = []
+            self._write_manifest(manifest)
+        for name in names:
+            os.remove(self._segment_file(name))
+
+    def rebuild(self, subjects):
+        documents, postings = self._invert(subjects)
+        with self._writing() as manifest:
+            names = manifest['segments']
+            name = self._new_segment_name(manifest)
+            write_segment(self._segment_file(name), documents, postings)
+            manifest['segments'] = [name]
+            self._write_manifest(manifest)
+        for name in names:
+            os.remove(self._segment_file(name))
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from events.bus import subscribe
+from events.domain import SubjectCreated, SubjectEdited
+from subjects.models import Subject
+
+from .backends import get_search_backend
+
+
+@subscribe(SubjectCreated, batch=True)
+def index_created_subjects(events):
+    """Indexes the posted subjects together, e.g. as a single index segment."""
+    subjects = list(Subject.objects.filter(pk__in=[event.subject_id for event in events], active=True).only(
+        'id', 'title', 'body', 'board_id'))
+    if subjects:
+        get_search_backend().index_subjects(subjects)
+
+
+@subscribe(SubjectEdited, batch=True)
+def reindex_edited_subjects(events):
+    """Reindexes the edited subjects & drops the deactivated (or deleted) ones."""
+    subject_ids = {event.subject_id for event in events}
+    subjects = list(Subject.objects.filter(pk__in=subject_ids, active=True).only('id', 'title', 'body', 'board_id'))
+    if subjects:
+        get_search_backend().index_subjects(subjects)
+    removed_ids = subject_ids - {subject.pk for subject in subjects}
+    if removed_ids:
+        get_search_backend().remove_subjects(sorted(removed_ids))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Term extraction, BM25 scoring & the in-memory inverted index the pure-Python
+backend builds its segments from.
+"""
+import math
+from collections import Counter
+
+from .analysis import analyze
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+# Title terms count as this many occurrences of the term.
+TITLE_BOOST = 2
+
+
+def document_terms(title, body):
+    """Returns the `{term: frequency}` of a subject, with title terms boosted."""
+    terms = Counter()
+    for term in analyze(title):
+        terms[term] += TITLE_BOOST
+    for term in analyze(body):
+        terms[term] += 1
+    return terms
+
+
+def bm25(frequency, document_frequency, length, documents, average_length):
+    """Returns the BM25 score of a term in a document."""
+    idf = math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+    norm = K1 * (1 - B + B * length / average_length) if average_length else K1
+    return idf * frequency * (K1 + 1) / (frequency + norm)
+
+
+class InvertedIndex:
+    """
+    Maps terms to the documents (subjects) containing them.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Removes every document."""
+        self.postings = {}  # term -> {doc_id: frequency}
+        self.documents = {}  # doc_id -> (board_id, length, terms)
+        self.total_length = 0
+
+    def add(self, doc_id, board_id, terms):
+        """Adds or replaces a document."""
+        self.remove(doc_id)
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        length = sum(terms.values())
+        self.documents[doc_id] = (board_id, length, tuple(terms))
+        self.total_length += length
+
+    def remove(self, doc_id):
+        """Removes a document if it's indexed."""
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+        _, length, terms = document
+        self.total_length -= length
+        for term in terms:
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from search.backends import get_search_backend
+from subjects.models import Subject
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search index from all active subjects.'
+
+    def handle(self, *args, **options):
+        subjects = list(Subject.get_subjects().only('id', 'title', 'body', 'board_id').iterator())
+        get_search_backend().rebuild(subjects)
+        self.stdout.write(self.style.SUCCESS('Indexed {} subjects.'.format(len(subjects))))
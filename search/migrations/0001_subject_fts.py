@@ -0,0 +1,32 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:40
+
+from django.db import migrations
+
+
+def create_subject_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE search_subject_fts USING fts5("
+        "title, body, board_id UNINDEXED, tokenize = 'porter unicode61')")
+    schema_editor.execute(
+        "INSERT INTO search_subject_fts (rowid, title, body, board_id) "
+        "SELECT id, title, COALESCE(body, ''), board_id FROM subjects_subject WHERE active")
+
+
+def drop_subject_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS search_subject_fts')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('subjects', '0004_feed_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_subject_fts, drop_subject_fts),
+    ]
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cached search results & highlighted snippets.
+
+The ranked ids of the top `SEARCH_LIMIT` hits are cached per normalized
+(query, board), so paging through results slices the cached ids instead of
+searching again. Results aren't invalidated when subjects change: they are
+only kept for `SEARCH_RESULTS_CACHE_TIMEOUT` seconds & the page's subjects
+are loaded from the database, so deleted or deactivated ones are left out.
+"""
+import hashlib
+import re
+
+from django.core.cache import cache
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .analysis import analyze, stem
+from .backends import get_search_backend
+from .backends.base import SEARCH_LIMIT
+
+SEARCH_RESULTS_CACHE_TIMEOUT = 60
+SNIPPET_WORDS = 30
+SNIPPET_CONTEXT_WORDS = 5
+
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize_query(query):
+    """Returns the distinct terms of a query in a canonical order."""
+    return ' '.join(sorted(set(analyze(query))))
+
+
+def _results_cache_key(normalized_query, board_id):
+    digest = hashlib.md5(normalized_query.encode()).hexdigest()
+    return 'search:results:{}:{}'.format(board_id or 'all', digest)
+
+
+def search_subject_ids(query, board_id=None):
+    """Returns the cached ids of the subjects matching `query`, best match first."""
+    normalized_query = normalize_query(query)
+    if not normalized_query:
+        return []
+    key = _results_cache_key(normalized_query, board_id)
+    subject_ids = cache.get(key)
+    if subject_ids is None:
+        subject_ids = get_search_backend().search(query, board_id, SEARCH_LIMIT)
+        cache.set(key, subject_ids, SEARCH_RESULTS_CACHE_TIMEOUT)
+    return subject_ids
+
+
+def highlight(text, query, size=SNIPPET_WORDS):
+    """
+    Returns an escaped excerpt of `text` around its densest run of query
+    terms, with the matching words wrapped in `<mark>`.
+    """
+    terms = set(analyze(query))
+    words = list(WORD_RE.finditer(text or ''))
+    if not words:
+        return ''
+    hits = [index for index, word in enumerate(words) if stem(word.group().lower()) in terms]
+
+    start = 0
+    if hits:
+        best = max(hits, key=lambda hit: sum(1 for other in hits if hit <= other < hit + size))
+        start = max(best - SNIPPET_CONTEXT_WORDS, 0)
+    end = min(start + size, len(words))
+
+    hit_set = set(hits)
+    parts = ['&hellip; ' if start else '']
+    position = words[start].start()
+    for index in range(start, end):
+        word = words[index]
+        parts.append(escape(text[position:word.start()]))
+        if index in hit_set:
+            parts.append('<mark>{}</mark>'.format(escape(word.group())))
+        else:
+            parts.append(escape(word.group()))
+        position = word.end()
+    if end < len(words):
+        parts.append(' &hellip;')
+    return mark_safe(''.join(parts))
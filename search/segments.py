@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Immutable on-disk index segments.
+
+A segment holds the postings of the documents added in one batch & the ids
+of the documents deleted by it (tombstones). Documents or tombstones in a
+newer segment shadow older versions of the same document. Segments are never
+modified once written: they are memory-mapped read-only, so every process
+shares the same page-cached files, and merged into bigger segments in the
+background (see `select_merge` & `merge_segments`).
+
+File layout (little endian)::
+
+    header      MAGIC, then counts & section offsets (HEADER)
+    documents   sorted (doc_id, board_id, length) records (DOCUMENT)
+    tombstones  sorted doc ids (TOMBSTONE)
+    terms       (string offset, string length, postings offset, postings count)
+                records sorted by term (TERM)
+    strings     UTF-8 terms
+    postings    (doc_id, frequency) records sorted by doc id (POSTING)
+"""
+import math
+import mmap
+import os
+import struct
+
+MAGIC = b'ELMSEG01'
+HEADER = struct.Struct('<8s4Q5Q')
+DOCUMENT = struct.Struct('<qqi')
+TOMBSTONE = struct.Struct('<q')
+TERM = struct.Struct('<QIQI')
+POSTING = struct.Struct('<qi')
+
+
+class Segment:
+    """
+    Read-only view of a memory-mapped segment file.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as segment_file:
+            self._map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.doc_count, self.tombstone_count, self.term_count, self.total_length, self._documents,
+         self._tombstones, self._terms, self._strings, self._postings) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError('{} is not an index segment.'.format(path))
+
+    def __repr__(self):
+        return '<Segment {} of {} documents>'.format(os.path.basename(self.path), self.doc_count)
+
+    @property
+    def size(self):
+        return self.doc_count + self.tombstone_count
+
+    def _bisect(self, record, offset, count, key, value):
+        """Returns the index of the record whose `key` equals `value` or -1."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            current = key(record.unpack_from(self._map, offset + middle * record.size))
+            if current < value:
+                low = middle + 1
+            elif current > value:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def document(self, doc_id):
+        """Returns the `(board_id, length)` of a document or `None`."""
+        index = self._bisect(DOCUMENT, self._documents, self.doc_count, lambda record: record[0], doc_id)
+        if index < 0:
+            return None
+        return DOCUMENT.unpack_from(self._map, self._documents + index * DOCUMENT.size)[1:]
+
+    def shadows(self, doc_id):
+        """Checks if this segment adds or deletes a document."""
+        return (self.document(doc_id) is not None or self._bisect(
+            TOMBSTONE, self._tombstones, self.tombstone_count, lambda record: record[0], doc_id) >= 0)
+
+    def documents(self):
+        """Yields the `(doc_id, board_id, length)` of every document."""
+        end = self._documents + self.doc_count * DOCUMENT.size
+        return DOCUMENT.iter_unpack(self._map[self._documents:end])
+
+    def tombstones(self):
+        """Yields the ids of the deleted documents."""
+        end = self._tombstones + self.tombstone_count * TOMBSTONE.size
+        return (record[0] for record in TOMBSTONE.iter_unpack(self._map[self._tombstones:end]))
+
+    def _term(self, index):
+        string_offset, string_length, postings_offset, postings_count = TERM.unpack_from(
+            self._map, self._terms + index * TERM.size)
+        start = self._strings + string_offset
+        return self._map[start:start + string_length], postings_offset, postings_count
+
+    def _find_term(self, term):
+        encoded = term.encode()
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            current, postings_offset, postings_count = self._term(middle)
+            if current < encoded:
+                low = middle + 1
+            elif current > encoded:
+                high = middle
+            else:
+                return postings_offset, postings_count
+        return None
+
+    def document_frequency(self, term):
+        found = self._find_term(term)
+        return found[1] if found else 0
+
+    def postings(self, term):
+        """Returns `{doc_id: frequency}` for a term."""
+        found = self._find_term(term)
+        if not found:
+            return {}
+        start = self._postings + found[0]
+        return dict(POSTING.iter_unpack(self._map[start:start + found[1] * POSTING.size]))
+
+    def terms(self):
+        """Yields `(term, {doc_id: frequency})` for every term."""
+        for index in range(self.term_count):
+            term, postings_offset, postings_count = self._term(index)
+            start = self._postings + postings_offset
+            yield term.decode(), dict(POSTING.iter_unpack(self._map[start:start + postings_count * POSTING.size]))
+
+
+def write_segment(path, documents, postings, tombstones=()):
+    """
+    Writes a segment file.
+
+    `documents` maps doc ids to `(board_id, length)` & `postings` maps terms
+    to `{doc_id: frequency}`. The file is written under a temporary name &
+    renamed, so it appears complete or not at all.
+    """
+    terms = sorted((term.encode(), term) for term in postings)
+    tombstones = sorted(tombstones)
+    total_length = sum(length for _, length in documents.values())
+
+    strings, term_records, posting_blocks = [], [], []
+    string_offset = postings_offset = 0
+    for encoded, term in terms:
+        term_postings = sorted(postings[term].items())
+        term_records.append(TERM.pack(string_offset, len(encoded), postings_offset, len(term_postings)))
+        strings.append(encoded)
+        posting_blocks.append(b''.join(POSTING.pack(*posting) for posting in term_postings))
+        string_offset += len(encoded)
+        postings_offset += len(term_postings) * POSTING.size
+
+    sections = [
+        b''.join(DOCUMENT.pack(doc_id, board_id, length)
+                 for doc_id, (board_id, length) in sorted(documents.items())),
+        b''.join(TOMBSTONE.pack(doc_id) for doc_id in tombstones),
+        b''.join(term_records),
+        b''.join(strings),
+        b''.join(posting_blocks),
+    ]
+    offsets, offset = [], HEADER.size
+    for section in sections:
+        offsets.append(offset)
+        offset += len(section)
+
+    temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary_path, 'wb') as segment_file:
+        segment_file.write(HEADER.pack(MAGIC, len(documents), len(tombstones), len(terms), total_length, *offsets))
+        for section in sections:
+            segment_file.write(section)
+        segment_file.flush()
+        os.fsync(segment_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def select_merge(sizes, merge_factor):
+    """
+    Returns the position of the first of the newest segments to merge, or
+    `None`. Segments are merged once `merge_factor` consecutive newest ones
+    share the same size tier, which keeps the number of segments logarithmic.
+    """
+    tiers = [int(math.log(max(size, 1), merge_factor)) for size in sizes]
+    start = len(tiers)
+    while start > 0 and tiers[start - 1] == tiers[-1]:
+        start -= 1
+    if len(tiers) - start >= merge_factor:
+        return start
+    return None
+
+
+def merge_segments(path, segments, keep_tombstones=True):
+    """
+    Writes the live documents of consecutive `segments` (oldest first) into
+    one segment. Tombstones only need to be kept while older segments remain.
+    """
+    live, dead = {}, set()
+    for position in reversed(range(len(segments))):
+        segment = segments[position]
+        for doc_id, board_id, length in segment.documents():
+            if doc_id not in live and doc_id not in dead:
+                live[doc_id] = (position, board_id, length)
+        for doc_id in segment.tombstones():
+            if doc_id not in live:
+                dead.add(doc_id)
+
+    postings = {}
+    for position, segment in enumerate(segments):
+        for term, term_postings in segment.terms():
+            for doc_id, frequency in term_postings.items():
+                if live.get(doc_id, (None, ))[0] == position:
+                    postings.setdefault(term, {})[doc_id] = frequency
+    documents = {doc_id: (board_id, length) for doc_id, (_, board_id, length) in live.items()}
+    write_segment(path, documents, postings, dead if keep_tombstones else ())
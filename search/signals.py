@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from boards.models import Board
+from subjects.models import Subject
+from users.models import Profile
+
+from .backends import get_search_backend
+from .typeahead import board_typeahead, count_followers, count_subscribers, user_typeahead
+
+
+@receiver(post_delete, sender=Subject)
+def subject_deleted(sender, instance, **kwargs):
+    """
+    Signals the search index about subjects being deleted.
+    """
+    get_search_backend().remove_subjects([instance.pk])
+
+
+@receiver(post_save, sender=Board)
+def board_saved(sender, instance, raw, **kwargs):
+    """
+    Signals the board typeahead about boards being created or renamed.
+    """
+    if not raw:
+        board_typeahead.update(instance.pk, instance.title, {'title': instance.title, 'slug': instance.slug})
+
+
+@receiver(post_delete, sender=Board)
+def board_deleted(sender, instance, **kwargs):
+    board_typeahead.remove(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """
+    Remembers whom a user follows & subscribes to, as deleting the user
+    deletes these rows without any m2m signal.
+    """
+    if user_typeahead.loaded:
+        instance._typeahead_followed_ids = set(instance.following.values_list('user', flat=True))
+    if board_typeahead.loaded:
+        instance._typeahead_board_ids = set(instance.subscribed_boards.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """
+    Signals the typeaheads about users being deleted (see `users.models` for
+    the username index).
+    """
+    followed_ids = instance.__dict__.pop('_typeahead_followed_ids', None)
+    if followed_ids:
+        user_typeahead.set_scores(count_followers(followed_ids))
+    board_ids = instance.__dict__.pop('_typeahead_board_ids', None)
+    if board_ids:
+        board_typeahead.set_scores(count_subscribers(board_ids))
+
+
+# m2m relations ranking the typeahead matches, mapped to the through model
+# field of the side that is not the user, to the column holding the ranked
+# entry & to the typeahead & its counting function.
+TYPEAHEAD_RELATIONS = {
+    Board.subscribers.through: ('board', 'board', board_typeahead, count_subscribers),
+    Profile.followers.through: ('profile', 'profile__user', user_typeahead, count_followers),
+}
+
+
+def _ranked_ids(sender, instance, reverse, pk_set):
+    """Returns the ids of the entries whose score is affected by the rows of an m2m change."""
+    source, ranked, _, _ = TYPEAHEAD_RELATIONS[sender]
+    rows = sender.objects.all()
+    if reverse:
+        rows = rows.filter(user=instance)
+        if pk_set is not None:
+            rows = rows.filter(**{source + '__in': pk_set})
+    else:
+        rows = rows.filter(**{source: instance})
+    return set(rows.values_list(ranked, flat=True))
+
+
+def typeahead_relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signals the typeaheads about subscriptions & follows.
+    """
+    _, _, typeahead, count = TYPEAHEAD_RELATIONS[sender]
+    if not typeahead.loaded:
+        return
+    if action == 'post_add' and pk_set:
+        typeahead.set_scores(count(_ranked_ids(sender, instance, reverse, pk_set)))
+    elif action in ('pre_remove', 'pre_clear'):
+        instance._typeahead_ranked_ids = _ranked_ids(sender, instance, reverse, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        ranked_ids = instance.__dict__.pop('_typeahead_ranked_ids', None)
+        if ranked_ids:
+            typeahead.set_scores(count(ranked_ids))
+
+
+for relation in TYPEAHEAD_RELATIONS:  # noqa: E305
+    m2m_changed.connect(typeahead_relation_changed, sender=relation)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import random
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from boards.models import Board
+from subjects.models import Subject
+from tasks.queue import Worker
+from utils.prefix_index import RankedPrefixIndex
+from utils.testing import OnCommitTestCase
+
+from .analysis import analyze, stem
+from .backends import get_search_backend
+from .backends.python import PythonSearchBackend
+from .results import SEARCH_RESULTS_CACHE_TIMEOUT, highlight, search_subject_ids
+from .segments import select_merge
+from .typeahead import board_typeahead, user_typeahead
+
+
+class TestAnalysis(TestCase):
+    """
+    TestCase class to test the text analysis
+    """
+    def test_stem(self):
+        words = ['caresses', 'ponies', 'running', 'hopping', 'relational', 'generalization', 'adjustment']
+        self.assertEqual([stem(word) for word in words], ['caress', 'poni', 'run', 'hop', 'relat', 'gener', 'adjust'])
+
+    def test_analyze(self):
+        self.assertEqual(analyze('The Cats are running!'), ['cat', 'run'])
+
+    def test_select_merge(self):
+        self.assertIsNone(select_merge([100, 10, 1, 1], 3))
+        self.assertEqual(select_merge([100, 10, 1, 1, 1], 3), 2)
+        self.assertEqual(select_merge([100, 5, 3, 3, 4], 3), 1)
+
+
+class SearchBackendTests:
+    """
+    Tests shared by the search backends
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='test_user',
+                                                    email='test@gmail.com',
+                                                    password='top_secret')
+        self.board = Board.objects.create(title='test title', description='some random words')
+        self.other_board = Board.objects.create(title='other title', description='some random words')
+        self.cats = self.post('Cats', 'My cat keeps running around the house.')
+        self.dogs = self.post('Running with dogs', 'Dogs love a run in the park.')
+        self.cat_food = self.post('Food', 'Which food do cats like?', board=self.other_board)
+
+    def post(self, title, body, board=None):
+        return Subject.objects.create(title=title, body=body, author=self.user, board=board or self.board)
+
+    def test_search(self):
+        backend = get_search_backend()
+        self.assertEqual(backend.search('cat'), [self.cats.id, self.cat_food.id])
+        self.assertEqual(backend.search('runs'), [self.dogs.id, self.cats.id])
+        self.assertEqual(backend.search('running cats'), [self.cats.id])
+        self.assertEqual(backend.search('cats', board_id=self.other_board.id), [self.cat_food.id])
+        self.assertEqual(backend.search('the'), [])
+        self.assertEqual(backend.search('"cat" OR NOT'), [self.cats.id, self.cat_food.id])
+
+    def test_index_follows_subjects(self):
+        backend = get_search_backend()
+        self.cats.title = 'Birds'
+        self.cats.body = 'Birds fly.'
+        self.cats.save()
+        self.assertEqual(backend.search('cat'), [self.cat_food.id])
+        self.assertEqual(backend.search('bird'), [self.cats.id])
+
+        self.cat_food.active = False
+        self.cat_food.save()
+        self.assertEqual(backend.search('cat'), [])
+        self.dogs.delete()
+        self.assertEqual(backend.search('dogs'), [])
+
+        backend.rebuild(Subject.get_subjects())
+        self.assertEqual(backend.search('bird'), [self.cats.id])
+
+    @override_settings(TASKS_EAGER=False)
+    def test_edits_are_indexed_in_the_background(self):
+        backend = get_search_backend()
+        self.cats.title = 'Birds'
+        self.cats.save()
+        self.assertEqual(backend.search('bird'), [])
+        Worker().run_pending()
+        self.assertEqual(backend.search('bird'), [self.cats.id])
+
+    def test_search_view(self):
+        response = self.client.get(reverse('search'), {'query': 'cats'})
+        self.assertEqual(list(response.context['subjects']), [self.cats, self.cat_food])
+        response = self.client.get(reverse('board_search', args=[self.other_board.slug]), {'query': 'cats'})
+        self.assertEqual(list(response.context['subjects']), [self.cat_food])
+
+
+@override_settings(SEARCH_BACKEND='search.backends.fts5.FTS5SearchBackend')
+class TestFTS5SearchBackend(SearchBackendTests, OnCommitTestCase):
+    pass
+
+
+class TestPythonSearchBackend(SearchBackendTests, OnCommitTestCase):
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir)
+        settings_override = override_settings(SEARCH_BACKEND='search.backends.python.PythonSearchBackend',
+                                              SEARCH_INDEX_DIR=self.index_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
+
+    def test_segments_are_shared_and_merged(self):
+        get_search_backend().close()
+        # Another process using the same index.
+        backend = PythonSearchBackend(self.index_dir, merge_in_background=False)
+        self.assertEqual(backend.search('cat'), [self.cats.id, self.cat_food.id])
+
+        parrots = [self.post('Parrot {}'.format(i), 'Parrots talk.') for i in range(25)]
+        parrots[0].delete()
+        self.assertEqual(len(backend.get_segments()), 29)
+        backend.merge()
+        self.assertEqual([segment.size for segment in backend.get_segments()], [27])
+        self.assertEqual(backend.search('parrot'), [parrot.id for parrot in reversed(parrots[1:])])
+        self.assertEqual(get_search_backend().search('cat'), [self.cats.id, self.cat_food.id])
+
+        backend.rebuild(Subject.get_subjects())
+        self.assertEqual(len(backend.get_segments()), 1)
+        self.assertEqual(get_search_backend().search('parrot talk', limit=2), [parrots[-1].id, parrots[-2].id])
+
+
+class TestSearchResults(OnCommitTestCase):
+    """
+    TestCase class to test the cached search results & snippets
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='test_user',
+                                                    email='test@gmail.com',
+                                                    password='top_secret')
+        self.board = Board.objects.create(title='test title', description='some random words')
+        self.subjects = [
+            Subject.objects.create(title='Cats {}'.format(i), body='All about cats.', author=self.user,
+                                   board=self.board)
+            for i in range(20)
+        ]
+        cache.clear()
+
+    def test_results_are_cached(self):
+        self.assertEqual(sorted(search_subject_ids('Cats')), [subject.id for subject in self.subjects])
+        with self.assertNumQueries(0):
+            self.assertEqual(search_subject_ids('the CATS cat'), search_subject_ids('cats'))
+
+        deleted_id = self.subjects[0].id
+        self.subjects[0].delete()
+        self.assertEqual(search_subject_ids('the'), [])
+        # Still cached, but the deleted subject isn't shown.
+        self.assertEqual(len(search_subject_ids('cats')), 20)
+        pages = [self.client.get(reverse('search'), {'query': 'cats', 'page': page}) for page in (1, 2)]
+        shown = [subject.id for page in pages for subject in page.context['subjects']]
+        self.assertEqual(len(shown), 19)
+        self.assertNotIn(deleted_id, shown)
+        later = time.time() + SEARCH_RESULTS_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertEqual(len(search_subject_ids('cats')), 19)
+
+    def test_paging_slices_cached_results(self):
+        response = self.client.get(reverse('search'), {'query': 'cats'})
+        self.assertEqual(len(response.context['subjects']), 15)
+        with self.assertNumQueries(2):  # the 5 subjects of the page & the flatpages
+            response = self.client.get(reverse('search'), {'query': 'cats', 'page': 2})
+        self.assertEqual([subject.id for subject in response.context['subjects']], search_subject_ids('cats')[15:])
+        self.assertContains(response, '<mark>cats</mark>')
+
+    def test_highlight(self):
+        text = ' '.join(['filler'] * 40) + ' <b>Cats</b> & dogs are running cats.'
+        snippet = highlight(text, 'cat run', size=10)
+        self.assertEqual(
+            snippet, '&hellip; filler filler filler filler &lt;b&gt;<mark>Cats</mark>&lt;/b&gt; &amp; dogs '
+            'are <mark>running</mark> &hellip;')
+        self.assertEqual(highlight('No match here', 'cat'), 'No match here')
+
+
+class TestTypeahead(TransactionTestCase):
+    """
+    TestCase class to test the board & user typeahead, committing so the
+    username index is updated
+    """
+    def setUp(self):
+        board_typeahead.reset()
+        user_typeahead.reset()
+        self.users = [
+            get_user_model().objects.create(username=username, email='{}@gmail.com'.format(username))
+            for username in ['carol', 'Carl', 'dave']
+        ]
+        self.boards = [
+            Board.objects.create(title=title, description='some random words')
+            for title in ['Cars', 'cartoons', 'Cats', 'dogs']
+        ]
+        self.boards[1].subscribers.add(*self.users)
+        self.boards[2].subscribers.add(self.users[0])
+        self.users[1].profile.followers.add(self.users[0], self.users[2])
+
+    def test_ranking(self):
+        self.assertEqual([board['title'] for board in board_typeahead.search('ca')], ['cartoons', 'Cats', 'Cars'])
+        self.assertEqual(board_typeahead.search('CAR'), [
+            {'title': 'cartoons', 'slug': self.boards[1].slug, 'subscribers': 3},
+            {'title': 'Cars', 'slug': self.boards[0].slug, 'subscribers': 0},
+        ])
+        self.assertEqual(user_typeahead.search('ca', limit=1), [{'username': 'Carl', 'followers': 2}])
+
+    def test_typeahead_follows_changes(self):
+        board_typeahead.search('c')
+        user_typeahead.search('c')
+        self.users[2].subscribed_boards.add(self.boards[0], self.boards[2])
+        self.users[0].subscribed_boards.clear()
+        self.users[1].profile.followers.remove(self.users[0])
+        self.users[0].profile.followers.add(self.users[1], self.users[2])
+        self.boards[3].title = 'Capybaras'
+        self.boards[3].save()
+        self.users[1].delete()
+        self.users[2].is_active = False
+        self.users[2].save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual([(board['title'], board['subscribers']) for board in board_typeahead.search('c')],
+                             [('Cars', 1), ('cartoons', 1), ('Cats', 1), ('Capybaras', 0)])
+            self.assertEqual(user_typeahead.search('car'), [{'username': 'carol', 'followers': 1}])
+            self.assertEqual(user_typeahead.search('d'), [])
+
+    def test_ranked_prefix_index(self):
+        rng = random.Random(42)
+        index = RankedPrefixIndex(top_size=3, cached_length=2)
+        entries = {}
+        for _ in range(500):
+            item_id = rng.randrange(30)
+            if rng.random() < 0.2:
+                index.remove(item_id)
+                entries.pop(item_id, None)
+            else:
+                key = rng.choice(['ab', 'abc', 'Abd', 'b', 'bca', 'ac']) + str(item_id % 3)
+                score = rng.randrange(5)
+                index.add(item_id, key, score)
+                entries[item_id] = (key, score)
+            prefix = rng.choice(['', 'a', 'AB', 'abc', 'b', 'x'])
+            expected = sorted((-score, key.lower(), item_id) for item_id, (key, score) in entries.items()
+                              if key.lower().startswith(prefix.lower()))
+            self.assertEqual(index.top(prefix), [rank[2] for rank in expected[:3]])
+
+    def test_typeahead_api(self):
+        response = self.client.get(reverse('typeahead'), {'q': 'car', 'type': 'users'})
+        self.assertEqual(response.json(), {'users': [{'username': 'Carl', 'followers': 2},
+                                                     {'username': 'carol', 'followers': 0}]})
+        response = self.client.get(reverse('typeahead'), {'q': 'D', 'limit': 'x'})
+        self.assertEqual(response.json(), {
+            'boards': [{'title': 'dogs', 'slug': self.boards[3].slug, 'subscribers': 0}],
+            'users': [{'username': 'dave', 'followers': 0}]})
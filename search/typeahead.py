@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Typeahead over board titles & usernames.
+
+Boards are served from an in-process `RankedPrefixIndex` ranking them by
+subscribers. It is loaded on first use, updated in place by the signals in
+`search.signals` & reloaded every `TYPEAHEAD_REFRESH_INTERVAL` seconds to
+pick up changes made by other processes. Users are served from the
+username index of `users.usernames`, which ranks them by followers.
+"""
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db.models import Count
+
+from boards.models import Board
+from users.usernames import get_username_index, is_username_index_loaded, reset_username_index, set_follower_counts
+from utils.prefix_index import RankedPrefixIndex
+
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_REFRESH_INTERVAL = 5 * 60
+
+
+class Typeahead:
+    """
+    A lazily loaded ranked index along with the fields shown for each match.
+
+    `load` returns `(id, key, score, fields)` rows; matches are returned as
+    their fields plus the score under `score_name`.
+    """
+    def __init__(self, load, score_name):
+        self._load = load
+        self.score_name = score_name
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self.index = RankedPrefixIndex(top_size=TYPEAHEAD_LIMIT)
+        self.fields = {}
+
+    def reset(self):
+        """Reloads the index on its next use."""
+        self._loaded_at = None
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def get_index(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > TYPEAHEAD_REFRESH_INTERVAL:
+            with self._lock:
+                if self._loaded_at is loaded_at:
+                    rows = list(self._load())
+                    self.index.reset((item_id, key, score) for item_id, key, score, _ in rows)
+                    self.fields = {item_id: fields for item_id, _, _, fields in rows}
+                    self._loaded_at = time.monotonic()
+        return self.index
+
+    def update(self, item_id, key, fields):
+        """Adds or renames an entry, keeping its score."""
+        if self.loaded:
+            self.fields[item_id] = fields
+            self.index.add(item_id, key, self.index.score(item_id) or 0)
+
+    def set_scores(self, scores):
+        if self.loaded:
+            for item_id, score in scores.items():
+                self.index.set_score(item_id, score)
+
+    def remove(self, item_id):
+        if self.loaded:
+            self.index.remove(item_id)
+            self.fields.pop(item_id, None)
+
+    def search(self, prefix, limit=TYPEAHEAD_LIMIT):
+        """Returns the best scored matches of `prefix`."""
+        if not prefix:
+            return []
+        index = self.get_index()
+        matches = []
+        for item_id in index.top(prefix, limit):
+            fields = self.fields.get(item_id)
+            if fields is not None:
+                matches.append(dict(fields, **{self.score_name: index.score(item_id)}))
+        return matches
+
+
+def load_boards():
+    rows = Board.objects.annotate(subscribers_total=Count('subscribers')).values_list(
+        'id', 'title', 'slug', 'subscribers_total')
+    for board_id, title, slug, subscribers in rows:
+        yield board_id, title, subscribers, {'title': title, 'slug': slug}
+
+
+class UserTypeahead:
+    """
+    Typeahead over the shared username index, skipping inactive users.
+    """
+    score_name = 'followers'
+
+    def reset(self):
+        reset_username_index()
+
+    @property
+    def loaded(self):
+        return is_username_index_loaded()
+
+    def set_scores(self, scores):
+        set_follower_counts(scores)
+
+    def search(self, prefix, limit=TYPEAHEAD_LIMIT):
+        """Returns the most followed active users starting with `prefix`."""
+        if not prefix:
+            return []
+        index = get_username_index()
+        matches = []
+        # Inactive users rank last, so skipping them keeps every active match.
+        for user_id in index.top(prefix, limit):
+            followers = index.score(user_id)
+            if followers is not None and followers >= 0:
+                matches.append({'username': index.key(user_id), self.score_name: followers})
+        return matches
+
+
+board_typeahead = Typeahead(load_boards, 'subscribers')
+user_typeahead = UserTypeahead()
+
+
+def count_subscribers(board_ids):
+    """Returns the subscribers count of the given boards."""
+    counts = dict.fromkeys(board_ids, 0)
+    rows = Board.subscribers.through.objects.filter(board__in=board_ids).values_list('board').annotate(
+        total=Count('*'))
+    counts.update(rows)
+    return counts
+
+
+def count_followers(user_ids):
+    """Returns the followers count of the given users."""
+    return dict(
+        User.objects.filter(pk__in=user_ids).annotate(total=Count('profile__followers')).values_list('id', 'total'))
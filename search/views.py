@@ -6,6 +6,8 @@ from django.shortcuts import get_object_or_404, redirect, render
 from boards.models import Board
 from subjects.models import Subject
 
+from .results import highlight, search_subject_ids
+
 
 def search(request, board_slug=None):
     """
@@ -14,15 +16,16 @@ def search(request, board_slug=None):
     if 'query' in request.GET:
         q = request.GET.get('query', None)
         if not board_slug:
-            subjects_list = Subject.search_subjects(q)
+            subject_ids = search_subject_ids(q)
             bv = False
             board = False
         else:
             board = get_object_or_404(Board, slug=board_slug)
-            subjects_list = Subject.search_subjects(q, board)
+            subject_ids = search_subject_ids(q, board.id)
             bv = True
 
-        paginator = Paginator(subjects_list, 15)
+        # Paginate the cached ranked ids & only load the subjects of the current page.
+        paginator = Paginator(subject_ids, 15)
         page = request.GET.get('page')
         if paginator.num_pages > 1:
             p = True
@@ -34,6 +37,10 @@ def search(request, board_slug=None):
             subjects = paginator.page(1)
         except EmptyPage:
             subjects = paginator.page(paginator.num_pages)
+        page_subjects = Subject.get_subjects().for_feed(request.user).in_bulk(subjects.object_list)
+        subjects.object_list = [page_subjects[pk] for pk in subjects.object_list if pk in page_subjects]
+        for subject in subjects.object_list:
+            subject.snippet = highlight(subject.body, q)
 
         p_obj = subjects
 
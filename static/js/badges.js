@@ -0,0 +1,25 @@
+// Poll the unread messages, notifications & message requests counts
+$(document).ready(function() {
+  function show_count(selector, count) {
+    $(selector).text(count || '').toggle(count > 0);
+  }
+
+  function check_badges() {
+    $.ajax({
+      url: "/badges/",
+      ifModified: true, // answered with 304 while the counts don't change
+      success: function(data, status) {
+        if (status === 'notmodified') {
+          return;
+        }
+        show_count("span#messages_count", data.unread_messages);
+        show_count("span#activities_count", data.unread_notifications);
+        show_count("span#requests_count", data.pending_requests);
+      },
+      complete: function() {
+        window.setTimeout(check_badges, 60000);
+      }
+    });
+  }
+  check_badges();
+});
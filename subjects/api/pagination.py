@@ -5,6 +5,8 @@ from rest_framework.pagination import (
     PageNumberPagination,
 )
 
+from mysite.pagination import CursorAPIPagination
+
 
 class SubjectLimitOffsetPagination(LimitOffsetPagination):
     default_limit = 20
@@ -13,3 +15,14 @@ class SubjectLimitOffsetPagination(LimitOffsetPagination):
 
 class SubjectPageNumberPagination(PageNumberPagination):
     page_size = 20
+
+
+class SubjectCursorPagination(CursorAPIPagination):
+    page_size = 20
+
+    def get_ordering(self, request, queryset, view):
+        if request.GET.get('trending', '') == 'True':
+            return ('-rank_score', '-id')
+        if request.GET.get('recently_active', '') == 'True':
+            return ('-last_comment_at', '-id')
+        return ('-created', '-id')
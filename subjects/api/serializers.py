@@ -1,11 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from django.contrib.auth.models import User
 from django.contrib.humanize.templatetags.humanize import naturaltime
 
 from rest_framework import serializers
 
-from notifications.models import Notification
 from subjects.models import Subject
 from users.api.serializers import UserDetailSerializer
 
@@ -54,20 +52,19 @@ class SubjectSerializer(serializers.ModelSerializer):
 
     def get_stars_count(self, obj):
         """Counts stars on subject."""
-        return obj.points.all().count()
+        return obj.stars_count
 
     def get_comments_count(self, obj):
         """Counts comments on subject."""
-        return obj.comments.all().count()
+        return obj.comments_count
 
     def get_is_starred(self, obj):
         """Check if user has starred subject."""
-        user = None
+        if hasattr(obj, 'is_starred'):
+            return obj.is_starred
         request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            user = request.user
-        if user in obj.points.all():
-            return True
+        if request and hasattr(request, 'user') and request.user.is_authenticated:
+            return obj.points.filter(pk=request.user.pk).exists()
         return False
 
     def get_created_naturaltime(self, obj):
@@ -80,43 +77,13 @@ class SubjectSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
             user = request.user
-        if user == obj.author:
+        if user is not None and user.pk == obj.author_id:
             return True
         return False
 
     def create(self, validated_data):
         """Handles the creation of board."""
         instance = self.Meta.model(**validated_data)
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            user = request.user
+        # Mentions are handled by the `SubjectCreated` event handlers.
         instance.save()
-
-        # Use celery to create notifications in the background.
-        title = validated_data['title']
-        body = validated_data['body']
-
-        # Checks if someone is mentioned in the subject
-        words = title + ' ' + body
-        words_list = words.split(" ")
-        names_list = []
-        for word in words_list:
-
-            # if first two letter of the word is "u/" then the rest of the word
-            # will be treated as a username
-
-            if word[:2] == "u/":
-                username = word[2:]
-                try:
-                    mentioned_user = User.objects.get(username=username)
-                    if mentioned_user not in names_list:
-                        instance.mentioned.add(user)
-                        if user is not mentioned_user:
-                            Notification.objects.create(Actor=user,
-                                                        Object=instance,
-                                                        Target=mentioned_user,
-                                                        notif_type='subject_mentioned')
-                        names_list.append(user)
-                except:  # noqa: E722
-                    pass
         return instance
@@ -4,6 +4,7 @@ from django.conf.urls import url
 
 from .views import (
     ActiveThreadsList,
+    RankedSubjectListAPIView,
     StarSubjectView,
     SubjectListCreateAPIView,
     SubjectRetrieveUpdateDestroyAPIView,
@@ -11,6 +12,7 @@ from .views import (
 
 urlpatterns = [
     url(r'^subjects/$', SubjectListCreateAPIView.as_view(), name='list_or_create_subjects'),
+    url(r'^subjects/ranked/$', RankedSubjectListAPIView.as_view(), name='list_ranked_subjects'),
     url(r'^subjects/(?P<slug>[-\w]+)/$',
         SubjectRetrieveUpdateDestroyAPIView.as_view(),
         name='retrieve_or_update_or_destroy_subjects'),
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from rest_framework.filters import OrderingFilter, SearchFilter
+from django.db.models import Case, When
+
+from rest_framework.filters import SearchFilter
 from rest_framework.generics import (
+    ListAPIView,
     ListCreateAPIView,
     RetrieveUpdateDestroyAPIView,
 )
@@ -9,37 +12,42 @@ from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from boards.models import Board
 from subjects.models import Subject
+from subjects.ranking import get_ranked_subject_ids
 
-from .pagination import SubjectPageNumberPagination
+from .pagination import SubjectCursorPagination
 from .permissions import IsAuthorOrReadOnly
 from .serializers import SubjectSerializer
 
 
 class SubjectListCreateAPIView(ListCreateAPIView):
     """
-    View that returns subjects list based on rank_score, specific user or
-    board submissions etc & handles the creation of subjects & returns data back.
+    View that returns subjects list based on rank_score, recent comments,
+    specific user or board submissions etc & handles the creation of subjects & returns data back.
     """
     serializer_class = SubjectSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    pagination_class = SubjectPageNumberPagination
-    filter_backends = [SearchFilter, OrderingFilter]
+    pagination_class = SubjectCursorPagination
+    filter_backends = [SearchFilter]
     search_fields = ['title']
 
     def get_queryset(self, *args, **kwargs):
-        queryset_list = Subject.get_subjects()
+        queryset_list = Subject.get_subjects().for_feed(self.request.user)
 
         user_query = self.request.GET.get('user', '')
         board_query = self.request.GET.get('board', '')
         trending_subjects = self.request.GET.get('trending', '')
+        recently_active_subjects = self.request.GET.get('recently_active', '')
 
         if user_query:
             queryset_list = queryset_list.filter(author__username__icontains=user_query, )
         if board_query:
             queryset_list = queryset_list.filter(board__slug__icontains=board_query)
         if trending_subjects == "True":
-            queryset_list = queryset_list.order_by('-rank_score')
+            queryset_list = queryset_list.order_by('-rank_score', '-id')
+        elif recently_active_subjects == "True":
+            queryset_list = queryset_list.filter(last_comment_at__isnull=False).order_by('-last_comment_at', '-id')
 
         return queryset_list
 
@@ -47,16 +55,43 @@ class SubjectListCreateAPIView(ListCreateAPIView):
         serializer.save(author=self.request.user)
 
 
+class RankedSubjectListAPIView(ListAPIView):
+    """
+    View that returns the precomputed top subjects for a sort
+    (hot, top, rising or controversial), overall or within a board.
+    """
+    serializer_class = SubjectSerializer
+    pagination_class = None
+
+    def get_queryset(self, *args, **kwargs):
+        sort = self.request.GET.get('sort', 'hot')
+        board_query = self.request.GET.get('board', '')
+
+        board_id = None
+        if board_query:
+            board_id = Board.objects.filter(slug=board_query).values_list('id', flat=True).first()
+            if board_id is None:
+                return Subject.objects.none()
+
+        subject_ids = get_ranked_subject_ids(sort, board_id)
+        if not subject_ids:
+            return Subject.objects.none()
+        preserved_order = Case(*[When(id=pk, then=position) for position, pk in enumerate(subject_ids)])
+        return Subject.get_subjects().for_feed(self.request.user).filter(id__in=subject_ids).order_by(preserved_order)
+
+
 class SubjectRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
     """
     View that retrieve, update or delete (if user is the author of) the subject.
     """
-    queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     lookup_field = 'slug'
     lookup_url_kwarg = 'slug'
 
+    def get_queryset(self, *args, **kwargs):
+        return Subject.objects.for_feed(self.request.user)
+
     def perform_update(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -71,14 +106,14 @@ class StarSubjectView(APIView):
         subject_slug = request.GET.get('subject_slug')
         subject = Subject.objects.get(slug=subject_slug)
         user = request.user
-        if subject in user.liked_subjects.all():
+        if subject.points.filter(pk=user.pk).exists():
             subject.points.remove(user)
             data['is_starred'] = False
         else:
             subject.points.add(user)
             data['is_starred'] = True
 
-        data['total_points'] = subject.points.count()
+        data['total_points'] = subject.stars_count
         return Response(data)
 
 
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from comments.models import subject_comments_count, subject_last_comment_at
+from subjects.models import Subject
+
+REPAIR_CHUNK_SIZE = 500
+
+
+def actual_stars_count():
+    """Returns an expression counting the stars of the outer subject."""
+    stars = Subject.points.through.objects.filter(subject=OuterRef('pk')).order_by().values('subject').annotate(
+        total=Count('*')).values('total')
+    return Coalesce(Subquery(stars, output_field=IntegerField()), 0)
+
+
+def drifted(field):
+    """Returns a filter matching subjects whose `field` differs from the `actual` annotation."""
+    return (Q(**{field + '__lt': F('actual')}) | Q(**{field + '__gt': F('actual')})
+            | Q(**{field + '__isnull': True, 'actual__isnull': False})
+            | Q(**{field + '__isnull': False, 'actual__isnull': True}))
+
+
+class Command(BaseCommand):
+    help = 'Detects & fixes drift of the denormalized subject counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the drifted subjects.')
+
+    def handle(self, *args, **options):
+        counters = {
+            'stars_count': actual_stars_count,
+            'comments_count': subject_comments_count,
+            'last_comment_at': subject_last_comment_at,
+        }
+        for field, actual in counters.items():
+            subject_ids = list(
+                Subject.objects.annotate(actual=actual()).filter(drifted(field)).values_list('id', flat=True))
+            if not options['dry_run']:
+                for start in range(0, len(subject_ids), REPAIR_CHUNK_SIZE):
+                    Subject.objects.filter(pk__in=subject_ids[start:start + REPAIR_CHUNK_SIZE]).update(
+                        **{field: actual()})
+            self.stdout.write('{}: {} {} subjects.'.format(field, 'found' if options['dry_run'] else 'repaired',
+                                                            len(subject_ids)))
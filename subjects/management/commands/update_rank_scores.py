@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from subjects.ranking import RANK_CHUNK_SIZE, update_rank_scores
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the rank score of all active subjects.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size',
+                            type=int,
+                            default=RANK_CHUNK_SIZE,
+                            help='Number of subjects to recompute per query.')
+
+    def handle(self, *args, **options):
+        updated = update_rank_scores(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS('Updated rank score of {} subjects.'.format(updated)))
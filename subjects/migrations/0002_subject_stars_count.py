@@ -0,0 +1,28 @@
+# Generated by Django 2.1 on 2026-10-18 20:08
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_stars_count(apps, schema_editor):
+    Subject = apps.get_model('subjects', 'Subject')
+    stars = Subject.points.through.objects.filter(subject=OuterRef('pk')).order_by().values('subject').annotate(
+        total=Count('*')).values('total')
+    Subject.objects.update(stars_count=Coalesce(Subquery(stars, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subject',
+            name='stars_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_stars_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:10
+
+from django.db import migrations, models
+from django.db.models import Count, DateTimeField, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_stats(apps, schema_editor):
+    Subject = apps.get_model('subjects', 'Subject')
+    Comment = apps.get_model('comments', 'Comment')
+    comments = Comment.objects.filter(subject=OuterRef('pk'), active=True).order_by().values('subject')
+    Subject.objects.update(
+        comments_count=Coalesce(
+            Subquery(comments.annotate(total=Count('*')).values('total'), output_field=IntegerField()), 0),
+        last_comment_at=Subquery(comments.annotate(last=Max('created')).values('last'),
+                                 output_field=DateTimeField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0001_initial'),
+        ('subjects', '0002_subject_stars_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subject',
+            name='comments_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_comment_stats, migrations.RunPython.noop),
+    ]
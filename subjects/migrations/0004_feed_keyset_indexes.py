@@ -0,0 +1,29 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0003_subject_comment_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['created', 'id'], name='subjects_su_created_29c30a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['rank_score', 'id'], name='subjects_su_rank_sc_f16663_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['board', 'created', 'id'], name='subjects_su_board_i_076a6e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['author', 'created', 'id'], name='subjects_su_author__e4105d_idx'),
+        ),
+    ]
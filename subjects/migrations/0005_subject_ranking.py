@@ -0,0 +1,30 @@
+# Generated by Django 2.1.15 on 2026-10-18 21:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0002_boardactivity'),
+        ('subjects', '0004_feed_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectRanking',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sort', models.CharField(max_length=20)),
+                ('subject_ids', models.TextField(blank=True)),
+                ('updated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('board', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='boards.Board')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='subjectranking',
+            unique_together={('sort', 'board')},
+        ),
+    ]
@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+from collections import Counter
+from datetime import timedelta
+
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import BooleanField, Case, Exists, F, OuterRef, Value, When
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.html import escape
@@ -10,7 +16,24 @@ from django.utils.html import escape
 import bleach
 from slugify import UniqueSlugify
 
-from boards.models import Board
+from boards.models import Board, BoardActivity, invalidate_trending_boards
+from boards.trending import TRENDING_WINDOW
+from events.bus import publish
+from events.domain import SubjectCreated, SubjectEdited
+from search.results import search_subject_ids
+
+
+class SubjectQuerySet(models.QuerySet):
+    def for_feed(self, user=None):
+        """
+        Returns subjects with everything `SubjectSerializer` needs joined or
+        annotated, including whether `user` has starred each of them.
+        """
+        if user is not None and user.is_authenticated:
+            is_starred = Exists(Subject.points.through.objects.filter(subject=OuterRef('pk'), user=user))
+        else:
+            is_starred = Value(False, output_field=BooleanField())
+        return self.select_related('board', 'author__profile').annotate(is_starred=is_starred)
 
 
 class Subject(models.Model):
@@ -25,13 +48,29 @@ class Subject(models.Model):
     board = models.ForeignKey(Board, related_name='submitted_subjects', on_delete=models.CASCADE)
     points = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_subjects', blank=True)
     mentioned = models.ManyToManyField(User, related_name='m_in_subjects', blank=True)
+    stars_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    last_comment_at = models.DateTimeField(null=True, blank=True, db_index=True)
     rank_score = models.FloatField(default=0.0)
     active = models.BooleanField(default=True)
     created = models.DateTimeField(default=timezone.now)
     updated = models.DateTimeField(auto_now=True)
 
+    objects = SubjectQuerySet.as_manager()
+
+    RANK_GRAVITY = 1.2
+    # Denormalized counters, only ever written with atomic UPDATEs.
+    COUNTER_FIELDS = ('stars_count', 'comments_count', 'last_comment_at')
+
     class Meta:
         ordering = ('-created', )
+        # Keyset pagination indexes for the feeds.
+        indexes = [
+            models.Index(fields=['created', 'id']),
+            models.Index(fields=['rank_score', 'id']),
+            models.Index(fields=['board', 'created', 'id']),
+            models.Index(fields=['author', 'created', 'id']),
+        ]
 
     def __str__(self):
         """Unicode representation for a subject model."""
@@ -41,7 +80,16 @@ class Subject(models.Model):
         if not self.slug:
             self.slug = subject_slugify(f"{self.title}")
 
-        super().save(*args, **kwargs)
+        # Don't overwrite counters maintained elsewhere with stale in-memory values.
+        if not self._state.adding and not kwargs.get('update_fields') and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+
+        # The subject's event is published to the outbox by `subject_published` in the same transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         """Return absolute url for a subject."""
@@ -58,31 +106,162 @@ class Subject(models.Model):
 
     @staticmethod
     def search_subjects(query, board=None):
-        """Searches for subjects."""
-        if board:
-            search_results = Subject.objects.filter(active=True, title__icontains=query, board=board)
-        else:
-            search_results = Subject.objects.filter(active=True, title__icontains=query)
-        return search_results
+        """Searches for subjects, best match first."""
+        subject_ids = search_subject_ids(query, board.id if board else None)
+        if not subject_ids:
+            return Subject.objects.none()
+        preserved_order = Case(*[When(id=pk, then=position) for position, pk in enumerate(subject_ids)])
+        return Subject.objects.filter(active=True, id__in=subject_ids).order_by(preserved_order)
 
     def get_points(self):
         """Returns number of stars."""
-        return self.points.count()
+        return self.stars_count
 
     def linkfy_subject(self):
         """Linkifies the subject body."""
         return bleach.linkify(escape(self.body))
 
+    @staticmethod
+    def calculate_rank_score(points, created, now=None):
+        """Calculates the rank score for the given number of stars & creation time."""
+        time_delta = (now or timezone.now()) - created
+        subject_hour_age = time_delta.total_seconds()
+        subject_points = points - 1
+        return subject_points / pow((subject_hour_age + 2), Subject.RANK_GRAVITY)
+
     def set_rank(self):
         """Calculates the rank score of a subject."""
-        GRAVITY = 1.2
-        time_delta = timezone.now() - self.created
-        subject_hour_age = time_delta.total_seconds()
-        subject_points = self.points.count() - 1
-        self.rank_score = subject_points / pow((subject_hour_age + 2), GRAVITY)
+        self.rank_score = Subject.calculate_rank_score(self.stars_count, self.created)
         self.save()
 
 
+class SubjectRanking(models.Model):
+    """
+    Model that stores the precomputed top subjects of a sort, overall or
+    within a board, so every process serves the same rankings.
+    """
+    sort = models.CharField(max_length=20)
+    board = models.ForeignKey(Board, related_name='+', null=True, blank=True, on_delete=models.CASCADE)
+    subject_ids = models.TextField(blank=True)
+    updated = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('sort', 'board')
+
+    def __str__(self):
+        """Unicode representation for a subject ranking model."""
+        return '{} @ {}'.format(self.sort, self.board_id or 'all')
+
+    def get_subject_ids(self):
+        """Returns the ranked subject ids, best first."""
+        return [int(pk) for pk in self.subject_ids.split(',') if pk]
+
+
+def _starred_subject_ids(instance, reverse, pk_set):
+    """
+    Returns the subject ids (one per star) currently linked by a stars m2m change.
+    """
+    stars = Subject.points.through.objects.all()
+    if reverse:
+        stars = stars.filter(user=instance)
+        if pk_set is not None:
+            stars = stars.filter(subject__in=pk_set)
+        return list(stars.values_list('subject_id', flat=True))
+    stars = stars.filter(subject=instance)
+    if pk_set is not None:
+        stars = stars.filter(user__in=pk_set)
+    return [instance.pk] * stars.count()
+
+
+def _update_stars_count(instance, reverse, subject_ids, sign):
+    """
+    Applies `F()` increments to `stars_count` grouping subjects by delta.
+    """
+    subjects_by_delta = {}
+    for subject_id, stars in Counter(subject_ids).items():
+        subjects_by_delta.setdefault(stars * sign, []).append(subject_id)
+    for delta, pks in subjects_by_delta.items():
+        Subject.objects.filter(pk__in=pks).update(stars_count=F('stars_count') + delta)
+    if not reverse and subject_ids:
+        instance.stars_count += len(subject_ids) * sign
+
+
+def points_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signals the Subject to keep `stars_count` in sync with its stars.
+    """
+    if action == 'post_add' and pk_set:
+        subject_ids = list(pk_set) if reverse else [instance.pk] * len(pk_set)
+        _update_stars_count(instance, reverse, subject_ids, 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        instance._unstarred_subject_ids = _starred_subject_ids(instance, reverse, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        subject_ids = instance.__dict__.pop('_unstarred_subject_ids', [])
+        _update_stars_count(instance, reverse, subject_ids, -1)
+
+
+m2m_changed.connect(points_changed, sender=Subject.points.through)  # noqa: E305
+
+
+def _in_trending_window(created):
+    return created >= BoardActivity.get_hour(timezone.now() - TRENDING_WINDOW)
+
+
+def update_board_activity(board_id, created):
+    """
+    Recounts the active subjects of the board activity bucket holding `created`.
+    """
+    hour = BoardActivity.get_hour(created)
+    posts = Subject.objects.filter(board_id=board_id, active=True, created__gte=hour,
+                                   created__lt=hour + timedelta(hours=1)).count()
+    bucket = BoardActivity.objects.filter(board_id=board_id, hour=hour)
+    if bucket.exclude(posts=posts).update(posts=posts):
+        invalidate_trending_boards()
+    elif posts and not bucket.exists():
+        try:
+            with transaction.atomic():
+                BoardActivity.objects.create(board_id=board_id, hour=hour, posts=posts)
+        except IntegrityError:
+            bucket.update(posts=posts)
+        invalidate_trending_boards()
+
+
+@receiver(post_save, sender=Subject)
+def subject_saved(sender, instance, created, raw, **kwargs):
+    """
+    Signals the board activity about subjects being posted & (de)activated.
+    """
+    if raw or not _in_trending_window(instance.created):
+        return
+    if created:
+        if instance.active:
+            BoardActivity.record_posts(instance.board_id, instance.created)
+    else:
+        update_board_activity(instance.board_id, instance.created)
+
+
+@receiver(post_save, sender=Subject)
+def subject_published(sender, instance, created, raw, **kwargs):
+    """
+    Publishes the subjects being posted, edited & (de)activated.
+    """
+    if raw:
+        return
+    if created:
+        publish(SubjectCreated(subject_id=instance.pk, author_id=instance.author_id))
+    else:
+        publish(SubjectEdited(subject_id=instance.pk))
+
+
+@receiver(post_delete, sender=Subject)
+def subject_deleted(sender, instance, **kwargs):
+    """
+    Signals the board activity about subjects being deleted.
+    """
+    if instance.active and _in_trending_window(instance.created):
+        update_board_activity(instance.board_id, instance.created)
+
+
 def subject_unique_check(text, uids):
     if text in uids:
         return False
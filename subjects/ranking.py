@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ranking engine & batch maintenance of `Subject.rank_score`.
+
+Scores are computed for the whole corpus in a single vectorized pass over
+NumPy columns. The hot score is written back to `Subject.rank_score` and the
+top subjects per sort (overall & per board) are stored in `SubjectRanking`
+rows, which each process caches for `RANKING_CACHE_TIMEOUT` seconds. This
+runs outside of the request cycle, either from the `update_rank_scores`
+management command or as a background task queued by the in-process
+scheduler started by `mysite.wsgi` when `settings.RANK_UPDATE_INTERVAL` is
+set.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, FloatField, Value, When
+from django.utils import timezone
+
+import numpy as np
+
+from .models import Subject, SubjectRanking
+
+logger = logging.getLogger(__name__)
+
+RANK_CHUNK_SIZE = 500
+RANKING_TOP_K = 100
+RANKING_CACHE_TIMEOUT = 60
+RISING_WINDOW = 24 * 60 * 60  # Only subjects younger than a day are rising.
+
+
+def load_ranking_columns(queryset=None):
+    """
+    Loads the `id`, `board`, `created`, `stars` & `comments` columns of the
+    active subjects into NumPy arrays.
+    """
+    if queryset is None:
+        queryset = Subject.get_subjects()
+    rows = list(queryset.order_by().values_list('id', 'board_id', 'created', 'stars_count', 'comments_count'))
+    return {
+        'id': np.array([row[0] for row in rows], dtype=np.int64),
+        'board': np.array([row[1] for row in rows], dtype=np.int64),
+        'created': np.array([row[2].timestamp() for row in rows], dtype=np.float64),
+        'stars': np.array([row[3] for row in rows], dtype=np.float64),
+        'comments': np.array([row[4] for row in rows], dtype=np.float64),
+    }
+
+
+def hot_scores(columns, now):
+    """Vectorized `Subject.calculate_rank_score`."""
+    age = now - columns['created']
+    return (columns['stars'] - 1) / np.power(age + 2, Subject.RANK_GRAVITY)
+
+
+def top_scores(columns, now):
+    """All time most starred subjects."""
+    return columns['stars'].copy()
+
+
+def rising_scores(columns, now):
+    """
+    Stars & comments per hour of subjects younger than `RISING_WINDOW`.
+    Older subjects are excluded with a score of `-inf`.
+    """
+    age = now - columns['created']
+    scores = (columns['stars'] + columns['comments']) / (age / 3600 + 2)
+    return np.where(age < RISING_WINDOW, scores, -np.inf)
+
+
+def controversial_scores(columns, now):
+    """
+    Subjects where discussion & approval are both high and balanced.
+    Comments stand in for the opposing votes that subjects don't have.
+    """
+    stars, comments = columns['stars'], columns['comments']
+    high = np.maximum(stars, comments)
+    low = np.minimum(stars, comments)
+    balance = np.divide(low, high, out=np.zeros_like(high), where=high > 0)
+    return np.power(stars + comments, balance) * (high > 0)
+
+
+SCORERS = {
+    'hot': hot_scores,
+    'top': top_scores,
+    'rising': rising_scores,
+    'controversial': controversial_scores,
+}
+
+
+def top_k(scores, k):
+    """
+    Returns the indices of the `k` highest finite scores, best first.
+    """
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if k <= 0:
+        return candidates[:0]
+    if k < len(candidates):
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def top_k_per_board(board_ids, scores, k):
+    """
+    Returns a dict mapping every board id to the indices of its `k` highest
+    scores, best first.
+    """
+    order = np.argsort(board_ids, kind='stable')
+    boards, starts = np.unique(board_ids[order], return_index=True)
+    groups = np.split(order, starts[1:])
+    return {int(board): group[top_k(scores[group], k)] for board, group in zip(boards, groups)}
+
+
+def compute_rankings(columns, now, k=RANKING_TOP_K):
+    """
+    Returns `{sort: {board_id: [subject_id, ...]}}` where the `None` board
+    holds the overall ranking.
+    """
+    rankings = {}
+    for sort, scorer in SCORERS.items():
+        scores = scorer(columns, now)
+        ranking = {None: columns['id'][top_k(scores, k)].tolist()}
+        for board, indices in top_k_per_board(columns['board'], scores, k).items():
+            ranking[board] = columns['id'][indices].tolist()
+        rankings[sort] = ranking
+    return rankings
+
+
+def _ranking_cache_key(sort, board_id=None):
+    return 'subjects:ranking:{}:{}'.format(sort, board_id or 'all')
+
+
+def store_rankings(rankings):
+    """Replaces the stored rankings & refreshes this process' cache of them."""
+    now = timezone.now()
+    with transaction.atomic():
+        SubjectRanking.objects.all().delete()
+        SubjectRanking.objects.bulk_create([
+            SubjectRanking(sort=sort, board_id=board_id, subject_ids=','.join(map(str, ids)), updated=now)
+            for sort, ranking in rankings.items() for board_id, ids in ranking.items()
+        ])
+    cache.set_many(
+        {
+            _ranking_cache_key(sort, board_id): ids
+            for sort, ranking in rankings.items() for board_id, ids in ranking.items()
+        },
+        timeout=RANKING_CACHE_TIMEOUT)
+
+
+def get_ranked_subject_ids(sort, board_id=None):
+    """Returns the top subject ids for a sort, optionally within a board."""
+    if sort not in SCORERS:
+        return []
+    key = _ranking_cache_key(sort, board_id)
+    subject_ids = cache.get(key)
+    if subject_ids is None:
+        ranking = SubjectRanking.objects.filter(sort=sort, board=board_id).first()
+        subject_ids = ranking.get_subject_ids() if ranking is not None else []
+        cache.set(key, subject_ids, RANKING_CACHE_TIMEOUT)
+    return subject_ids
+
+
+def _write_rank_scores(ids, scores):
+    """
+    Writes back rank scores with one UPDATE per batch.
+    """
+    items = list(zip(ids, scores))
+    batch_size = max(connection.ops.bulk_batch_size(['id', 'id', 'rank_score'], items), 1)
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        whens = [When(id=pk, then=Value(score)) for pk, score in batch]
+        Subject.objects.filter(id__in=[pk for pk, _ in batch]).update(
+            rank_score=Case(*whens, output_field=FloatField()))
+
+
+def update_rank_scores(chunk_size=RANK_CHUNK_SIZE):
+    """
+    Recomputes the rank score of every active subject, refreshes the cached
+    rankings & returns the number of subjects updated.
+    """
+    now = timezone.now().timestamp()
+    columns = load_ranking_columns()
+    ids = columns['id'].tolist()
+    scores = hot_scores(columns, now).tolist()
+    for start in range(0, len(ids), chunk_size):
+        _write_rank_scores(ids[start:start + chunk_size], scores[start:start + chunk_size])
+    store_rankings(compute_rankings(columns, now))
+    return len(ids)
+
+
+class RankScheduler(threading.Thread):
+    """
+    Daemon thread that queues a rank scores refresh every `interval` seconds.
+    The refresh runs in a worker, which shares its results with the web
+    processes through the `SubjectRanking` rows rather than its cache.
+    """
+    def __init__(self, interval, chunk_size=RANK_CHUNK_SIZE):
+        super().__init__(name='rank-scheduler', daemon=True)
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self._stopped = threading.Event()
+
+    def run(self):
+        from .tasks import refresh_rank_scores  # subjects.tasks imports this module
+
+        while not self._stopped.wait(self.interval):
+            try:
+                refresh_rank_scores.delay(self.chunk_size)
+            except Exception:
+                logger.exception('Background rank update failed.')
+            finally:
+                connection.close()
+
+    def stop(self):
+        self._stopped.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_rank_scheduler(interval=None):
+    """
+    Starts the background rank scheduler once per process & returns it.
+    Returns `None` when no interval is configured.
+    """
+    global _scheduler
+    interval = interval or settings.RANK_UPDATE_INTERVAL
+    if not interval:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = RankScheduler(interval)
+            _scheduler.start()
+    return _scheduler
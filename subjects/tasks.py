@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from tasks.queue import task
+from utils import image_compression
+
+from .ranking import RANK_CHUNK_SIZE, update_rank_scores
+
+
+@task
+def compress_image(name):
+    """Compresses an uploaded image."""
+    image_compression(name)
+
+
+@task(unique=True, max_attempts=1)
+def refresh_rank_scores(chunk_size=RANK_CHUNK_SIZE):
+    """Recomputes the rank score of all active subjects."""
+    update_rank_scores(chunk_size)
@@ -1,11 +1,35 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import importlib
+import time
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+
+import numpy as np
 
 from boards.models import Board
+from comments.models import Comment
+from mysite.pagination import encode_cursor
+from tasks.queue import Worker
 
-from .models import Subject
+from . import views
+from .models import Subject, SubjectRanking
+from .ranking import (
+    compute_rankings,
+    get_ranked_subject_ids,
+    hot_scores,
+    top_k,
+    update_rank_scores,
+)
+from .tasks import refresh_rank_scores
 
 
 class TestSubjectModel(TestCase):
@@ -30,3 +54,325 @@ class TestSubjectModel(TestCase):
 
     def test_subject_return_value(self):
         self.assertEqual(str(self.subject), 'test title')
+
+
+class TestRankScores(TestCase):
+    """
+    TestCase class to test the batch rank score maintenance
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='test_user',
+                                                    email='test@gmail.com',
+                                                    password='top_secret')
+        self.other_user = get_user_model().objects.create(username='other_test_user',
+                                                          email='other_test@gmail.com',
+                                                          password='top_secret')
+        self.board = Board.objects.create(title='test title', description='some random words')
+        self.subject = Subject.objects.create(title='test title', author=self.user, board=self.board)
+        self.starred_subject = Subject.objects.create(title='starred title', author=self.user, board=self.board)
+        self.starred_subject.points.add(self.user, self.other_user)
+        self.inactive_subject = Subject.objects.create(title='inactive title',
+                                                       author=self.user,
+                                                       board=self.board,
+                                                       active=False)
+        cache.clear()
+
+    def test_update_rank_scores(self):
+        self.assertEqual(update_rank_scores(chunk_size=1), 2)
+        self.subject.refresh_from_db()
+        self.starred_subject.refresh_from_db()
+        self.inactive_subject.refresh_from_db()
+        self.assertLess(self.subject.rank_score, 0)
+        self.assertGreater(self.starred_subject.rank_score, 0)
+        self.assertEqual(self.inactive_subject.rank_score, 0.0)
+        trending = Subject.get_subjects().order_by('-rank_score')
+        self.assertEqual(list(trending), [self.starred_subject, self.subject])
+
+    def test_update_rank_scores_command(self):
+        out = StringIO()
+        call_command('update_rank_scores', stdout=out)
+        self.assertIn('Updated rank score of 2 subjects.', out.getvalue())
+        self.starred_subject.refresh_from_db()
+        self.assertGreater(self.starred_subject.rank_score, 0)
+
+    def test_hot_scores_match_calculate_rank_score(self):
+        now = timezone.now()
+        columns = {
+            'created': np.array([self.subject.created.timestamp(), self.starred_subject.created.timestamp()]),
+            'stars': np.array([1.0, 2.0]),
+        }
+        scores = hot_scores(columns, now.timestamp())
+        # Float timestamps lose sub-microsecond precision, hence the tolerance.
+        self.assertAlmostEqual(scores[0], Subject.calculate_rank_score(1, self.subject.created, now), places=5)
+        self.assertAlmostEqual(scores[1], Subject.calculate_rank_score(2, self.starred_subject.created, now), places=5)
+
+    def test_top_k(self):
+        scores = np.array([0.5, -np.inf, 3.0, 1.0, 2.0])
+        self.assertEqual(top_k(scores, 2).tolist(), [2, 4])
+        self.assertEqual(top_k(scores, 10).tolist(), [2, 4, 3, 0])
+        self.assertEqual(top_k(scores, 0).tolist(), [])
+
+    def test_compute_rankings_per_board(self):
+        other_board = Board.objects.create(title='other title', description='some random words')
+        other_subject = Subject.objects.create(title='other title', author=self.user, board=other_board)
+        columns = {
+            'id': np.array([self.subject.id, self.starred_subject.id, other_subject.id]),
+            'board': np.array([self.board.id, self.board.id, other_board.id]),
+            'created': np.array([timezone.now().timestamp()] * 3),
+            'stars': np.array([0.0, 2.0, 1.0]),
+            'comments': np.array([0.0, 0.0, 0.0]),
+        }
+        rankings = compute_rankings(columns, timezone.now().timestamp(), k=1)
+        self.assertEqual(rankings['top'][None], [self.starred_subject.id])
+        self.assertEqual(rankings['top'][self.board.id], [self.starred_subject.id])
+        self.assertEqual(rankings['top'][other_board.id], [other_subject.id])
+
+    def test_ranked_subjects_api(self):
+        update_rank_scores()
+        self.assertEqual(get_ranked_subject_ids('top'), [self.starred_subject.id, self.subject.id])
+        # Other processes read the stored rankings.
+        cache.clear()
+        self.assertEqual(get_ranked_subject_ids('top', self.board.id), [self.starred_subject.id, self.subject.id])
+        self.assertEqual(get_ranked_subject_ids('hot', 0), [])
+        response = self.client.get(reverse('list_ranked_subjects'), {'sort': 'top', 'board': self.board.slug})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([subject['id'] for subject in response.data], [self.starred_subject.id, self.subject.id])
+        response = self.client.get(reverse('list_ranked_subjects'), {'sort': 'unknown'})
+        self.assertEqual(response.data, [])
+
+    @override_settings(TASKS_EAGER=False)
+    def test_worker_refresh_is_shared(self):
+        self.assertEqual(get_ranked_subject_ids('top'), [])
+        refresh_rank_scores.delay()
+        Worker().run_pending()
+        self.assertEqual(SubjectRanking.objects.get(sort='top', board=None).get_subject_ids(),
+                         [self.starred_subject.id, self.subject.id])
+        # The worker's cache isn't the web process' one; stale entries expire.
+        cache.clear()
+        self.assertEqual(get_ranked_subject_ids('top'), [self.starred_subject.id, self.subject.id])
+
+
+class TestStarsCount(TestCase):
+    """
+    TestCase class to test the denormalized stars counter
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='test_user',
+                                                    email='test@gmail.com',
+                                                    password='top_secret')
+        self.other_user = get_user_model().objects.create(username='other_test_user',
+                                                          email='other_test@gmail.com',
+                                                          password='top_secret')
+        self.board = Board.objects.create(title='test title', description='some random words')
+        self.subject = Subject.objects.create(title='test title', author=self.user, board=self.board)
+        self.other_subject = Subject.objects.create(title='other title', author=self.user, board=self.board)
+
+    def assertStarsCount(self, subject, count):
+        subject.refresh_from_db()
+        self.assertEqual(subject.stars_count, count)
+        self.assertEqual(subject.points.count(), count)
+
+    def test_add_and_remove_stars(self):
+        self.subject.points.add(self.user, self.other_user)
+        self.assertEqual(self.subject.stars_count, 2)
+        self.subject.points.add(self.user)
+        self.assertStarsCount(self.subject, 2)
+        self.subject.points.remove(self.user, self.user)
+        self.assertStarsCount(self.subject, 1)
+        self.subject.points.remove(self.user)
+        self.assertStarsCount(self.subject, 1)
+        self.subject.points.clear()
+        self.assertStarsCount(self.subject, 0)
+
+    def test_reverse_stars(self):
+        self.user.liked_subjects.add(self.subject, self.other_subject)
+        self.assertStarsCount(self.subject, 1)
+        self.assertStarsCount(self.other_subject, 1)
+        self.user.liked_subjects.remove(self.subject)
+        self.assertStarsCount(self.subject, 0)
+        self.user.liked_subjects.clear()
+        self.assertStarsCount(self.other_subject, 0)
+
+    def test_save_keeps_stars_count(self):
+        stale_subject = Subject.objects.get(pk=self.subject.pk)
+        self.subject.points.add(self.user)
+        stale_subject.title = 'new title'
+        stale_subject.save()
+        self.assertStarsCount(self.subject, 1)
+        self.assertEqual(self.subject.title, 'new title')
+
+    def test_repair_subject_counters(self):
+        self.subject.points.add(self.user)
+        Subject.objects.filter(pk=self.subject.pk).update(stars_count=5)
+        out = StringIO()
+        call_command('repair_subject_counters', '--dry-run', stdout=out)
+        self.assertIn('stars_count: found 1 subjects.', out.getvalue())
+        self.assertEqual(Subject.objects.get(pk=self.subject.pk).stars_count, 5)
+        call_command('repair_subject_counters', stdout=out)
+        self.assertStarsCount(self.subject, 1)
+
+    def test_repair_comment_stats(self):
+        comment = Comment.objects.create(body='some random words', commenter=self.user, subject=self.subject)
+        Subject.objects.filter(pk=self.subject.pk).update(comments_count=0, last_comment_at=None)
+        Subject.objects.filter(pk=self.other_subject.pk).update(last_comment_at=comment.created)
+        out = StringIO()
+        call_command('repair_subject_counters', stdout=out)
+        self.assertIn('comments_count: repaired 1 subjects.', out.getvalue())
+        self.assertIn('last_comment_at: repaired 2 subjects.', out.getvalue())
+        self.subject.refresh_from_db()
+        self.other_subject.refresh_from_db()
+        self.assertEqual(self.subject.comments_count, 1)
+        self.assertEqual(self.subject.last_comment_at, comment.created)
+        self.assertIsNone(self.other_subject.last_comment_at)
+
+    def test_recently_active_subjects_api(self):
+        Comment.objects.create(body='some random words', commenter=self.user, subject=self.other_subject)
+        response = self.client.get(reverse('list_or_create_subjects'), {'recently_active': 'True'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([subject['id'] for subject in response.data['results']], [self.other_subject.id])
+        self.assertEqual(response.data['results'][0]['comments_count'], 1)
+
+
+class TestSubjectFeedQueries(TestCase):
+    """
+    TestCase class to test the queries issued by the subject feeds & API
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='test_user',
+                                                    email='test@gmail.com',
+                                                    password='top_secret')
+        self.board = Board.objects.create(title='test title', description='some random words')
+        self.client.force_login(self.user)
+
+    def create_subjects(self, number):
+        for i in range(number):
+            subject = Subject.objects.create(title='test title {}'.format(i), author=self.user, board=self.board)
+            if i % 2:
+                subject.points.add(self.user)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('list_or_create_subjects'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data['results']
+
+    def test_list_runs_constant_queries(self):
+        self.create_subjects(2)
+        queries, _ = self.count_list_queries()
+        self.create_subjects(18)
+        self.assertEqual(self.count_list_queries()[0], queries)
+
+    def test_home_page_runs_constant_queries(self):
+        self.create_subjects(2)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'fa-star fa-lg', count=1)
+        self.create_subjects(13)
+        with self.assertNumQueries(len(context.captured_queries)):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'fa-star fa-lg', count=7)
+
+    def test_is_starred(self):
+        self.create_subjects(2)
+        results = self.count_list_queries()[1]
+        self.assertEqual([subject['is_starred'] for subject in results], [True, False])
+        self.assertTrue(all(subject['is_author'] for subject in results))
+
+        self.client.logout()
+        response = self.client.get(reverse('list_or_create_subjects'))
+        self.assertFalse(any(subject['is_starred'] for subject in response.data['results']))
+
+
+class TestStartup(TestCase):
+    """
+    TestCase class to benchmark the import of the url configuration
+    """
+    def test_importing_urls_issues_no_queries(self):
+        import mysite.urls
+
+        started = time.perf_counter()
+        with self.assertNumQueries(0):
+            importlib.reload(views)
+            importlib.reload(mysite.urls)
+        clear_url_caches()
+        self.assertLess(time.perf_counter() - started, 5)
+
+    def test_feeds_are_evaluated_per_request(self):
+        user = get_user_model().objects.create(username='test_user', email='test@gmail.com', password='top_secret')
+        board = Board.objects.create(title='test title', description='some random words')
+        response = self.client.get(reverse('trending'))
+        self.assertEqual(len(response.context['subjects']), 0)
+        Subject.objects.create(title='test title', author=user, board=board)
+        for url in (reverse('home'), reverse('trending')):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['subjects']), 1)
+
+
+class TestCursorPagination(TestCase):
+    """
+    TestCase class to test the keyset pagination of the feeds
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='test_user',
+                                                    email='test@gmail.com',
+                                                    password='top_secret')
+        self.board = Board.objects.create(title='test title', description='some random words')
+        created = timezone.now()
+        # Subjects 10 & 11 share the same creation time to exercise the id tie breaker.
+        self.subjects = [
+            Subject.objects.create(title='test title {}'.format(i),
+                                   author=self.user,
+                                   board=self.board,
+                                   created=created - timezone.timedelta(minutes=min(i, 10)))
+            for i in range(20)
+        ]
+
+    def test_paging_through_home(self):
+        response = self.client.get(reverse('home'))
+        first_page = response.context['page_obj']
+        self.assertEqual(list(first_page), self.subjects[:10] + [self.subjects[19 - i] for i in range(5)])
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+
+        response = self.client.get(reverse('home'), {'cursor': first_page.next_cursor})
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 5)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        self.assertContains(response, 'cursor={}'.format(second_page.previous_cursor))
+
+        response = self.client.get(reverse('home'), {'cursor': second_page.previous_cursor})
+        self.assertEqual(list(response.context['page_obj']), list(first_page))
+        self.assertTrue(response.context['page_obj'].has_next())
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('home'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+        for position in (['x', 'y'], [None, 1], [{}, []]):
+            response = self.client.get(reverse('home'), {'cursor': encode_cursor(position)})
+            self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('list_or_create_subjects'), {'cursor': encode_cursor(['x', 'y'])})
+        self.assertEqual(response.status_code, 404)
+
+    def test_paging_through_api(self):
+        response = self.client.get(reverse('list_or_create_subjects'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(len(response.data['results']), 20)
+
+        self.client.force_login(self.user)
+        since = response.data['since']
+        response = self.client.get(reverse('list_or_create_subjects'), {'since': since})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['since'], since)
+
+        new_subject = Subject.objects.create(title='new title', author=self.user, board=self.board)
+        response = self.client.get(reverse('list_or_create_subjects'), {'since': since})
+        self.assertEqual([subject['id'] for subject in response.data['results']], [new_subject.id])
+        self.assertNotEqual(response.data['since'], since)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['results'][0]['id'], self.subjects[0].id)
@@ -2,8 +2,6 @@
 # -*- coding: utf-8 -*-
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
-from django.db import OperationalError
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
@@ -13,43 +11,26 @@ import requests
 
 from comments.forms import CommentForm
 from mysite.decorators import ajax_required
-from notifications.models import Notification
-from utils import image_compression
+from mysite.pagination import CursorPaginationMixin
 
 from .decorators import user_is_subject_author
 from .forms import SubjectForm
 from .models import Subject
+from .tasks import compress_image
 
 
-def get_trending_subjects():
-    try:
-        subjects = Subject.get_subjects()
-        for subject in subjects:
-            subject.set_rank()
-        trending_subjects = subjects.order_by('-rank_score')
-    except OperationalError:
-        trending_subjects = None
-    return trending_subjects
-
-
-def get_home_subjects():
-    try:
-        home_subjects = Subject.get_subjects()
-    except OperationalError:
-        home_subjects = None
-    return home_subjects
-
-
-class HomePageView(ListView):
+class HomePageView(CursorPaginationMixin, ListView):
     """
     Basic ListView implementation to call the latest subjects list.
     """
     model = Subject
-    queryset = get_home_subjects()
     paginate_by = 15
     template_name = 'subjects/home.html'
     context_object_name = 'subjects'
 
+    def get_queryset(self, **kwargs):
+        return Subject.get_subjects().for_feed(self.request.user)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Show Sign Up CTA if user is not logged in.
@@ -57,15 +38,19 @@ class HomePageView(ListView):
         return context
 
 
-class TrendingPageView(ListView):
+class TrendingPageView(CursorPaginationMixin, ListView):
     """
     Basic ListView implementation to call the trending subjects list.
     """
     model = Subject
-    queryset = get_trending_subjects()
     paginate_by = 15
     template_name = 'subjects/trending.html'
     context_object_name = 'subjects'
+    # Rank scores are maintained in batches by `subjects.ranking`.
+    cursor_ordering = ('-rank_score', '-id')
+
+    def get_queryset(self, **kwargs):
+        return Subject.get_subjects().for_feed(self.request.user)
 
 
 def _html_comments(comment_id, board, subject):
@@ -92,11 +77,10 @@ def subject_detail(request, board, subject):
     """
     Displays the subject details and handles comment action.
     """
-    subject = get_object_or_404(Subject, board__slug=board, slug=subject)
+    subject = get_object_or_404(Subject.objects.for_feed(request.user), board__slug=board, slug=subject)
     comments = subject.comments.filter(active=True)
     board = subject.board
     bv = True
-    user = request.user
     admins = board.admins.all()
 
     if request.is_ajax():
@@ -108,37 +92,9 @@ def subject_detail(request, board, subject):
                     new_comment = comment_form.save(commit=False)
                     new_comment.commenter = request.user
                     new_comment.subject = subject
+                    # Notifications are sent by the `CommentPosted` event handlers.
                     new_comment.save()
 
-                    if request.user is not subject.author:
-                        Notification.objects.create(Actor=new_comment.commenter,
-                                                    Object=new_comment.subject,
-                                                    Target=subject.author,
-                                                    notif_type='comment')
-
-                    # Checks if someone is mentioned in the comment
-                    words = new_comment.body
-                    words = words.split(" ")
-                    names_list = []
-                    for word in words:
-
-                        # if first two letters of the word is "u/" then the rest of the word
-                        # will be treated as a username
-
-                        if word[:2] == "u/":
-                            u = word[2:]
-                            try:
-                                user = User.objects.get(username=u)
-                                if user not in names_list:
-                                    if request.user is not user:
-                                        Notification.objects.create(Actor=new_comment.commenter,
-                                                                    Object=new_comment.subject,
-                                                                    Target=user,
-                                                                    notif_type='comment_mentioned')
-                                    names_list.append(user)
-                            except:  # noqa: E722
-                                pass
-
                     new_comment_id = new_comment.id
                     html = _html_comments(new_comment_id, board, subject)
                     return HttpResponse(html)
@@ -189,34 +145,9 @@ def new_subject(request):
             new_subject.author = author
             new_subject.save()
             new_subject.points.add(author)
-            new_subject.save()
-
-            # Checks if someone is mentioned in the subject
-            words = new_subject.title + ' ' + new_subject.body
-            words = words.split(" ")
-            names_list = []
-            for word in words:
-
-                # if first two letter of the word is "u/" then the rest of the word
-                # will be treated as a username
-
-                if word[:2] == "u/":
-                    u = word[2:]
-                    try:
-                        user = User.objects.get(username=u)
-                        if user not in names_list:
-                            new_subject.mentioned.add(user)
-                            if request.user is not user:
-                                Notification.objects.create(Actor=new_subject.author,
-                                                            Object=new_subject,
-                                                            Target=user,
-                                                            notif_type='subject_mentioned')
-                            names_list.append(user)
-                    except:  # noqa: E722
-                        pass
 
             if new_subject.photo:
-                image_compression(new_subject.photo.name)
+                compress_image.delay(new_subject.photo.name)
 
             return redirect(new_subject.get_absolute_url())
 
@@ -234,14 +165,14 @@ def like_subject(request, subject):
     data = dict()
     subject = get_object_or_404(Subject, slug=subject)
     user = request.user
-    if subject in user.liked_subjects.all():
+    if subject.points.filter(pk=user.pk).exists():
         subject.points.remove(user)
         data['is_starred'] = False
     else:
         subject.points.add(user)
         data['is_starred'] = True
 
-    data['total_points'] = subject.points.count()
+    data['total_points'] = subject.stars_count
     return JsonResponse(data)
 
 
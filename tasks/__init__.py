@@ -0,0 +1,3 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+default_app_config = 'tasks.apps.TasksConfig'
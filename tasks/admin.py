@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """
+    Admin settings for queued tasks.
+    """
+    list_display = ('name', 'status', 'attempts', 'run_at', 'locked_by', 'created')
+    list_filter = ('status', 'name')
+    date_hierarchy = 'created'
+
+
+admin.site.register(Task, TaskAdmin)  # noqa: E305
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from tasks.queue import Worker
+
+
+class Command(BaseCommand):
+    help = 'Runs the queued background tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency',
+                            type=int,
+                            default=4,
+                            help='Number of tasks to run at the same time, each on its own thread.')
+        parser.add_argument('--poll-interval',
+                            type=float,
+                            default=1.0,
+                            help='Seconds to wait before checking an empty queue again.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        worker = Worker(options['concurrency'], options['poll_interval'])
+        self.stdout.write('Worker {} is running tasks.'.format(worker.worker_id))
+        try:
+            worker.run(burst=options['burst'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.stop()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Durable, database-backed task queue.
+
+Functions decorated with `task` are registered by name; calling
+`.delay(*args, **kwargs)` stores a `Task` row (within the current
+transaction, so a rolled back request enqueues nothing) that the
+`run_tasks` worker command picks up. Each task runs in a transaction, so a
+failed task is rolled back, then retried with an exponential backoff until it
+runs out of attempts.
+
+With `settings.TASKS_EAGER`, `.delay()` runs the task right away instead,
+which is what tests & local development use.
+"""
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 30
+# Running tasks locked for longer than this are considered abandoned by a dead worker.
+TASK_LOCK_TIMEOUT = timedelta(minutes=10)
+
+registry = {}
+
+
+class TaskFunction:
+    """
+    A registered task; calling it runs the function inline.
+    """
+    def __init__(self, func, name, max_attempts, retry_delay, unique):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.unique = unique
+        self.__doc__ = func.__doc__
+
+    def __repr__(self):
+        return '<TaskFunction {}>'.format(self.name)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queues a call of the task, or runs it at once in eager mode."""
+        return enqueue(self, args, kwargs)
+
+
+def task(func=None, name=None, max_attempts=DEFAULT_MAX_ATTEMPTS, retry_delay=DEFAULT_RETRY_DELAY, unique=False):
+    """
+    Registers a function as a task. Arguments must be JSON serializable.
+    `unique` tasks aren't queued again while the same call is waiting to run
+    at the same time or earlier.
+    """
+    def register(func):
+        task_name = name or '{}.{}'.format(func.__module__, func.__name__)
+        task_function = TaskFunction(func, task_name, max_attempts, retry_delay, unique)
+        registry[task_name] = task_function
+        return task_function
+
+    return register(func) if func is not None else register
+
+
+def enqueue(task_function, args=(), kwargs=None, run_at=None):
+    """Returns the queued `Task`, or `None` if it ran eagerly or is already queued."""
+    kwargs = kwargs or {}
+    if settings.TASKS_EAGER:
+        task_function(*args, **kwargs)
+        return None
+    payload = json.dumps({'args': list(args), 'kwargs': kwargs}, sort_keys=True)
+    run_at = run_at or timezone.now()
+    # Only a call running no later than this one makes it redundant.
+    if task_function.unique and Task.objects.filter(
+            name=task_function.name, payload=payload, status=Task.QUEUED, run_at__lte=run_at).exists():
+        return None
+    return Task.objects.create(name=task_function.name,
+                               payload=payload,
+                               max_attempts=task_function.max_attempts,
+                               run_at=run_at)
+
+
+def _claimable(now):
+    return Q(status=Task.QUEUED, run_at__lte=now) | Q(status=Task.RUNNING, locked_at__lt=now - TASK_LOCK_TIMEOUT)
+
+
+def claim_tasks(worker_id, limit):
+    """
+    Locks up to `limit` due tasks for a worker & returns them.
+
+    Each task is claimed by a conditional UPDATE, so concurrent workers never
+    run the same task, on any database & without row locks.
+    """
+    now = timezone.now()
+    claimed = []
+    for pk in Task.objects.filter(_claimable(now)).values_list('pk', flat=True)[:limit]:
+        updated = Task.objects.filter(_claimable(now), pk=pk).update(
+            status=Task.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1)
+        if updated:
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def run_task(task_row):
+    """
+    Runs a claimed task: deletes it once done, otherwise schedules a retry or
+    marks it as failed. Returns whether it succeeded.
+    """
+    task_function = registry.get(task_row.name)
+    try:
+        if task_function is None:
+            raise LookupError('Unknown task {}.'.format(task_row.name))
+        payload = json.loads(task_row.payload)
+        # A failing task leaves no partial writes behind for its retry to repeat.
+        with transaction.atomic():
+            task_function(*payload['args'], **payload['kwargs'])
+    except Exception:
+        logger.exception('Task %s (%s) failed.', task_row.name, task_row.pk)
+        rows = Task.objects.filter(pk=task_row.pk, locked_by=task_row.locked_by)
+        changes = {'last_error': traceback.format_exc(), 'locked_by': '', 'locked_at': None}
+        if task_function is not None and task_row.attempts < task_row.max_attempts:
+            delay = task_function.retry_delay * 2 ** (task_row.attempts - 1)
+            rows.update(status=Task.QUEUED, run_at=timezone.now() + timedelta(seconds=delay), **changes)
+        else:
+            rows.update(status=Task.FAILED, **changes)
+        return False
+    Task.objects.filter(pk=task_row.pk, locked_by=task_row.locked_by).delete()
+    return True
+
+
+class Worker:
+    """
+    Runs queued tasks, `concurrency` at a time on a thread pool.
+    """
+    def __init__(self, concurrency=1, poll_interval=1.0):
+        self.concurrency = max(int(concurrency), 1)
+        self.poll_interval = poll_interval
+        self.worker_id = '{}:{}:{}'.format(socket.gethostname(), os.getpid(), uuid4().hex[:8])
+        self._pool = ThreadPoolExecutor(self.concurrency) if self.concurrency > 1 else None
+        self._stopped = False
+
+    def _run_in_thread(self, task_row):
+        try:
+            return run_task(task_row)
+        finally:
+            connection.close()
+
+    def run_pending(self):
+        """Runs one batch of due tasks & returns how many ran."""
+        tasks = claim_tasks(self.worker_id, self.concurrency)
+        if self._pool is None:
+            for task_row in tasks:
+                run_task(task_row)
+        else:
+            list(self._pool.map(self._run_in_thread, tasks))
+        return len(tasks)
+
+    def run(self, burst=False):
+        """Runs tasks until stopped, or until the queue is empty with `burst`."""
+        while not self._stopped:
+            close_old_connections()
+            if not self.run_pending():
+                if burst:
+                    break
+                time.sleep(self.poll_interval)
+
+    def stop(self):
+        self._stopped = True
+        if self._pool is not None:
+            self._pool.shutdown()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.utils import timezone
+
+from boards.models import Board
+from notifications.models import Notification
+from subjects.models import Subject
+from utils.testing import OnCommitTestCase
+
+from .models import Task
+from .queue import TASK_LOCK_TIMEOUT, Worker, enqueue, task
+
+calls = []
+
+
+@task(name='tests.record')
+def record(value, twice=False):
+    calls.append(value)
+    if twice:
+        calls.append(value)
+
+
+@task(name='tests.flaky', max_attempts=2, retry_delay=10)
+def flaky():
+    raise ValueError('Boom.')
+
+
+@task(name='tests.partial', max_attempts=2, retry_delay=10)
+def partial(title):
+    Board.objects.create(title=title, description='some random words')
+    raise ValueError('Boom.')
+
+
+@task(name='tests.unique', unique=True)
+def unique_task(value):
+    calls.append(value)
+
+
+@override_settings(TASKS_EAGER=False)
+class TestTaskQueue(OnCommitTestCase):
+    """
+    TestCase class to test the background task queue
+    """
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker()
+
+    def test_delay_queues_tasks(self):
+        queued = record.delay('a', twice=True)
+        self.assertEqual((queued.name, queued.status), ('tests.record', Task.QUEUED))
+        self.assertEqual(calls, [])
+
+        self.assertEqual(self.worker.run_pending(), 1)
+        self.assertEqual(calls, ['a', 'a'])
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(self.worker.run_pending(), 0)
+
+    def test_retries(self):
+        flaky.delay()
+        self.worker.run_pending()
+        queued = Task.objects.get()
+        self.assertEqual((queued.status, queued.attempts), (Task.QUEUED, 1))
+        self.assertIn('ValueError: Boom.', queued.last_error)
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=5))
+        self.assertEqual(self.worker.run_pending(), 0)
+
+        Task.objects.update(run_at=timezone.now())
+        self.worker.run_pending()
+        queued = Task.objects.get()
+        self.assertEqual((queued.status, queued.attempts), (Task.FAILED, 2))
+        self.assertEqual(self.worker.run_pending(), 0)
+
+    def test_failed_tasks_are_rolled_back(self):
+        partial.delay('half done')
+        self.worker.run_pending()
+        self.assertEqual(Task.objects.get().attempts, 1)
+        self.assertFalse(Board.objects.exists())
+
+    def test_unique_tasks(self):
+        unique_task.delay(1)
+        self.assertIsNone(unique_task.delay(1))
+        unique_task.delay(2)
+        self.assertEqual(Task.objects.count(), 2)
+        # A call scheduled later doesn't delay one due now.
+        Task.objects.update(run_at=timezone.now() + timedelta(minutes=1))
+        self.assertIsNotNone(unique_task.delay(1))
+        self.assertIsNone(enqueue(unique_task, [1], run_at=timezone.now() + timedelta(minutes=2)))
+
+    def test_abandoned_tasks_are_claimed_again(self):
+        record.delay('a')
+        Task.objects.update(status=Task.RUNNING, locked_by='dead-worker', locked_at=timezone.now())
+        self.assertEqual(self.worker.run_pending(), 0)
+        Task.objects.update(locked_at=timezone.now() - TASK_LOCK_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(self.worker.run_pending(), 1)
+        self.assertEqual(calls, ['a'])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode(self):
+        self.assertIsNone(record.delay('a'))
+        self.assertEqual(calls, ['a'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_comment_notifications_run_in_the_background(self):
+        user = get_user_model().objects.create(username='test_user', email='test@gmail.com')
+        author = get_user_model().objects.create(username='author', email='author@gmail.com')
+        board = Board.objects.create(title='test title', description='some random words')
+        subject = Subject.objects.create(title='test title', body='some random words', author=author, board=board)
+        self.client.force_login(user)
+        response = self.client.post(subject.get_absolute_url(), {'body': 'Hi u/test_user & u/author'},
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Notification.objects.exists())
+
+        self.worker.run_pending()
+        self.assertEqual(sorted(Notification.objects.values_list('notif_type', flat=True)),
+                         ['comment', 'comment_mentioned'])
@@ -6,6 +6,8 @@ from django.db.models import Q
 from rest_framework import serializers
 from rest_framework_jwt.settings import api_settings
 
+from users.summary import get_profile_summary
+
 jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
 jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
 jwt_response_payload_handler = api_settings.JWT_RESPONSE_PAYLOAD_HANDLER
@@ -177,6 +179,20 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
             'member_since',
         ]
 
+    def get_summary(self, obj):
+        """
+        Returns the cached profile summary of the user as seen by the requester.
+
+        :return: dict
+        """
+        if not hasattr(self, '_summaries'):
+            self._summaries = {}
+        if obj.pk not in self._summaries:
+            request = self.context.get('request')
+            viewer = getattr(request, 'user', None)
+            self._summaries[obj.pk] = get_profile_summary(obj.pk, viewer)
+        return self._summaries[obj.pk]
+
     def get_profile_picture_url(self, obj):
         """
         Returns user's profile picture url.
@@ -184,8 +200,7 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
         :return: string
         """
         request = self.context.get('request')
-        profile_picture_url = obj.profile.get_picture()
-        return request.build_absolute_uri(profile_picture_url)
+        return request.build_absolute_uri(self.get_summary(obj)['picture'])
 
     def get_screen_name(self, obj):
         """
@@ -193,7 +208,7 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
 
         :return: string
         """
-        return obj.profile.screen_name()
+        return self.get_summary(obj)['screen_name']
 
     def get_requester_in_contact_list(self, obj):
         """
@@ -201,13 +216,7 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
 
         :return: boolean
         """
-        user = None
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            user = request.user
-        if user in obj.profile.contact_list.all():
-            return True
-        return False
+        return self.get_summary(obj)['requester_in_contact_list']
 
     def get_requester_in_pending_list(self, obj):
         """
@@ -215,13 +224,7 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
 
         :return: boolean
         """
-        user = None
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            user = request.user
-        if user in obj.profile.pending_list.all():
-            return True
-        return False
+        return self.get_summary(obj)['requester_in_pending_list']
 
     def get_is_requesters_profile(self, obj):
         """
@@ -229,13 +232,7 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
 
         :return: boolean
         """
-        user = None
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            user = request.user
-        if user == obj:
-            return True
-        return False
+        return self.get_summary(obj)['is_requesters_profile']
 
     def get_has_followed(self, obj):
         """
@@ -243,13 +240,7 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
 
         :return: boolean
         """
-        user = None
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            user = request.user
-        if user in obj.profile.followers.all():
-            return True
-        return False
+        return self.get_summary(obj)['has_followed']
 
     def get_created_boards_count(self, obj):
         """
@@ -257,7 +248,7 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
 
         :return: integer
         """
-        return obj.inspected_boards.count()
+        return self.get_summary(obj)['created_boards_count']
 
     def get_posted_subjects_count(self, obj):
         """
@@ -265,7 +256,7 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
 
         :return: integer
         """
-        return obj.posted_subjects.count()
+        return self.get_summary(obj)['posted_subjects_count']
 
     def get_boards_subsribed_count(self, obj):
         """
@@ -273,7 +264,7 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
 
         :return: integer
         """
-        return obj.subscribed_boards.count()
+        return self.get_summary(obj)['boards_subscribed_count']
 
     def get_member_since(self, obj):
         """
@@ -281,4 +272,4 @@ class ProfileRetrieveSerializer(serializers.ModelSerializer):
 
         :return: string
         """
-        return obj.profile.member_since.date()
+        return self.get_summary(obj)['member_since'].date()
@@ -7,11 +7,13 @@ from .views import (
     UserLoginAPIView,
     UserSignUpAPIView,
     current_user,
+    username_autocomplete,
 )
 
 urlpatterns = [
     url(r'^login/', UserLoginAPIView.as_view(), name='users_login'),
     url(r'^signup/', UserSignUpAPIView.as_view(), name='users_signup'),
     url(r'^current_user/', current_user, name='current_user'),
+    url(r'^autocomplete/', username_autocomplete, name='users_autocomplete'),
     url(r'^profile/(?P<username>[-\w]+)/', ProfileRetrieveAPIView.as_view(), name='profile_info'),
 ]
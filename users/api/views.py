@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 from django.contrib.auth import get_user_model
 
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
 from rest_framework.generics import RetrieveAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
@@ -13,6 +13,7 @@ from rest_framework.status import (
 )
 from rest_framework.views import APIView
 
+from ..usernames import autocomplete_usernames
 from .serializers import (
     CurrentUserDetailSerializer,
     ProfileRetrieveSerializer,
@@ -32,6 +33,18 @@ def current_user(request):
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def username_autocomplete(request):
+    """
+    Return the usernames starting with `q` (e.g. while typing a `u/` mention).
+    """
+    prefix = request.query_params.get('q', '')
+    if prefix.startswith('u/'):
+        prefix = prefix[2:]
+    return Response({'results': autocomplete_usernames(prefix)})
+
+
 class UserSignUpAPIView(APIView):
     """
     View that handles user signup and returns username, email & JWT.
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unread counters shown in the header badges.
+
+`Profile.unread_messages`, `unread_notifications` & `pending_requests` are
+kept up to date with `F()` increments where messages, notifications &
+message requests are written, & cached per user so polling the badges is a
+single cache read. Every write site drops the cached counts, so deployments
+with several processes need a `CACHES` backend shared by the processes, as
+for `messenger.hub.CacheHub`. `manage.py repair_unread_counters` fixes any
+drift from the counts below.
+"""
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Profile
+
+UNREAD_COUNTS_TIMEOUT = 60 * 60
+
+
+def _count(queryset, user_field):
+    totals = queryset.order_by().values(user_field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+
+def profile_unread_messages():
+    """Returns an expression counting the unread messages of the outer profile's user."""
+    from messenger.models import Message
+
+    messages = Message.objects.filter(
+        conversation__participants__user=OuterRef('user'),
+        id__gt=F('conversation__participants__last_read_message_id'),
+    ).exclude(from_user=OuterRef('user'))
+    return _count(messages, 'conversation__participants__user')
+
+
+def profile_unread_notifications():
+    """Returns an expression counting the unread notifications of the outer profile's user."""
+    from notifications.models import Notification
+
+    notifications = Notification.objects.filter(Target=OuterRef('user'), is_read=False).exclude(Actor=OuterRef('user'))
+    return _count(notifications, 'Target')
+
+
+def profile_pending_requests():
+    """Returns an expression counting the message requests waiting for the outer profile's user."""
+    return _count(Profile.pending_list.through.objects.filter(profile=OuterRef('pk')), 'profile')
+
+
+def _unread_counts_key(user_id):
+    return 'users:unread_counts:{}'.format(user_id)
+
+
+def get_unread_counts(user_id):
+    """Returns the counters of a user as a dict, from the cache when possible."""
+    key = _unread_counts_key(user_id)
+    counts = cache.get(key)
+    if counts is None:
+        counts = Profile.objects.filter(user=user_id).values(*Profile.COUNTER_FIELDS).first()
+        counts = counts or dict.fromkeys(Profile.COUNTER_FIELDS, 0)
+        cache.set(key, counts, UNREAD_COUNTS_TIMEOUT)
+    return counts
+
+
+def _badges_state_key(user_id):
+    return 'users:badges_state:{}'.format(user_id)
+
+
+def get_badges_state(user_id):
+    """
+    Returns a dict holding the `version` of a user's counters, bumped whenever
+    they are written, along with the user's `is_active` & `session_hash`, so
+    the badges poll checks its session without loading the user; or None if
+    the user doesn't exist.
+    """
+    key = _badges_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is None:
+            return None
+        state = {'version': uuid4().hex, 'is_active': user.is_active, 'session_hash': user.get_session_auth_hash()}
+        cache.set(key, state, UNREAD_COUNTS_TIMEOUT)
+    return state
+
+
+def invalidate_unread_counts(user_ids):
+    """Drops the cached counters & badges state of the given users."""
+    user_ids = set(user_ids)
+    keys = [_unread_counts_key(user_id) for user_id in user_ids] + [_badges_state_key(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
+        # Again once committed, in case the old counts were cached meanwhile.
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def update_unread_counts(field, deltas):
+    """
+    Applies `F()` increments to a counter, `deltas` mapping user ids to the
+    change of their count, grouping the users by delta.
+    """
+    users_by_delta = {}
+    for user_id, delta in deltas.items():
+        if delta:
+            users_by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in users_by_delta.items():
+        Profile.objects.filter(user__in=user_ids).update(**{field: F(field) + delta})
+    invalidate_unread_counts(user_id for user_ids in users_by_delta.values() for user_id in user_ids)
+
+
+def recount_pending_requests(user_ids):
+    """Recounts the message requests waiting for the given users."""
+    user_ids = list(user_ids)
+    if user_ids:
+        Profile.objects.filter(user__in=user_ids).update(pending_requests=profile_pending_requests())
+        invalidate_unread_counts(user_ids)
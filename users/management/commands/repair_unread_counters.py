@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from users.counters import (
+    invalidate_unread_counts,
+    profile_pending_requests,
+    profile_unread_messages,
+    profile_unread_notifications,
+)
+from users.models import Profile
+
+REPAIR_CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Detects & fixes drift of the unread messages, notifications & message requests counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the drifted profiles.')
+
+    def handle(self, *args, **options):
+        counters = {
+            'unread_messages': profile_unread_messages,
+            'unread_notifications': profile_unread_notifications,
+            'pending_requests': profile_pending_requests,
+        }
+        for field, actual in counters.items():
+            drifted = Q(**{field + '__lt': F('actual')}) | Q(**{field + '__gt': F('actual')})
+            rows = list(Profile.objects.annotate(actual=actual()).filter(drifted).values_list('id', 'user'))
+            if not options['dry_run']:
+                for start in range(0, len(rows), REPAIR_CHUNK_SIZE):
+                    chunk = rows[start:start + REPAIR_CHUNK_SIZE]
+                    Profile.objects.filter(pk__in=[pk for pk, user_id in chunk]).update(**{field: actual()})
+                    invalidate_unread_counts(user_id for pk, user_id in chunk)
+            self.stdout.write('{}: {} {} profiles.'.format(field, 'found' if options['dry_run'] else 'repaired',
+                                                            len(rows)))
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, user_field):
+    totals = queryset.order_by().values(user_field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+
+def count_unread(apps, schema_editor):
+    Profile = apps.get_model('users', 'Profile')
+    Message = apps.get_model('messenger', 'Message')
+    Notification = apps.get_model('notifications', 'Notification')
+
+    messages = Message.objects.filter(
+        conversation__participants__user=OuterRef('user'),
+        id__gt=F('conversation__participants__last_read_message_id'),
+    ).exclude(from_user=OuterRef('user'))
+    notifications = Notification.objects.filter(Target=OuterRef('user'), is_read=False).exclude(Actor=OuterRef('user'))
+    pending = Profile.pending_list.through.objects.filter(profile=OuterRef('pk'))
+    Profile.objects.update(
+        unread_messages=_count(messages, 'conversation__participants__user'),
+        unread_notifications=_count(notifications, 'Target'),
+        pending_requests=_count(pending, 'profile'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('messenger', '0004_remove_message_copies'),
+        ('notifications', '0002_feed_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='pending_requests',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='unread_messages',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='unread_notifications',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+from uuid import uuid4
+
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
+from boards.models import Board
+from events.bus import publish
+from events.domain import UserFollowed
+from subjects.models import Subject
+
+from .usernames import username_changed, username_deleted
+
 
 class Profile(models.Model):
     """
@@ -19,6 +29,12 @@ class Profile(models.Model):
     contact_list = models.ManyToManyField(User, related_name='contacters', blank=True)
     pending_list = models.ManyToManyField(User, related_name='my_pending_requests', blank=True)
     member_since = models.DateTimeField(default=timezone.now)
+    unread_messages = models.IntegerField(default=0)
+    unread_notifications = models.IntegerField(default=0)
+    pending_requests = models.IntegerField(default=0)
+
+    # Denormalized counters, only ever written with atomic UPDATEs (see `users.counters`).
+    COUNTER_FIELDS = ('unread_messages', 'unread_notifications', 'pending_requests')
 
     class Meta:
         ordering = ('-member_since', )
@@ -27,6 +43,15 @@ class Profile(models.Model):
         """Unicode representation for a profile model."""
         return self.user.username
 
+    def save(self, *args, **kwargs):
+        # Don't overwrite counters maintained elsewhere with stale in-memory values.
+        if not self._state.adding and not kwargs.get('update_fields') and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def screen_name(self):
         """Returns screen name."""
         try:
@@ -53,4 +78,161 @@ def update_user_profile(sender, instance, created, **kwargs):
     """
     if created:
         Profile.objects.create(user=instance)
-    instance.profile.save()
+    else:
+        # The summary shows user fields; nothing on the profile itself needs saving.
+        invalidate_profile_summaries([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw, **kwargs):
+    """
+    Signals the username index about users joining or being renamed.
+    """
+    if not raw:
+        username_changed(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """
+    Signals the username index about users being deleted.
+    """
+    username_deleted(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_auth_changed(sender, instance, **kwargs):
+    """
+    Signals the badges poll about the User's password or active state changing.
+    """
+    from .counters import invalidate_unread_counts
+
+    invalidate_unread_counts([instance.pk])
+
+
+def _profile_summary_version_key(user_id):
+    return 'users:profile_summary_version:{}'.format(user_id)
+
+
+def get_profile_summary_version(user_id):
+    """Returns the current cache version of a user's profile summary."""
+    key = _profile_summary_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def invalidate_profile_summaries(user_ids):
+    """Invalidates the cached profile summaries of the given users for every viewer."""
+    cache.set_many({_profile_summary_version_key(user_id): uuid4().hex for user_id in set(user_ids)}, None)
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(sender, instance, **kwargs):
+    """
+    Signals the profile summary cache about Profile (and so User) changes.
+    """
+    invalidate_profile_summaries([instance.user_id])
+
+
+# m2m relations shown in profile summaries, mapped to the through model field
+# of the side that is not the user & to the column holding the profile owner.
+SUMMARY_RELATIONS = {
+    Profile.followers.through: ('profile', 'profile__user'),
+    Profile.contact_list.through: ('profile', 'profile__user'),
+    Profile.pending_list.through: ('profile', 'profile__user'),
+    Board.admins.through: ('board', 'user'),
+    Board.subscribers.through: ('board', 'user'),
+}
+
+
+def _summary_owner_ids(sender, instance, reverse, pk_set):
+    """
+    Returns the ids of the users whose profile summary is affected by the
+    rows of an m2m change.
+    """
+    source, owner = SUMMARY_RELATIONS[sender]
+    rows = sender.objects.all()
+    if reverse:
+        rows = rows.filter(user=instance)
+        if pk_set is not None:
+            rows = rows.filter(**{source + '__in': pk_set})
+    else:
+        rows = rows.filter(**{source: instance})
+        if pk_set is not None:
+            rows = rows.filter(user__in=pk_set)
+    return list(rows.values_list(owner, flat=True))
+
+
+def summary_relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signals the profile summary cache about follows, contacts, message
+    requests, board admins & subscriptions.
+    """
+    if action == 'post_add' and pk_set:
+        invalidate_profile_summaries(_summary_owner_ids(sender, instance, reverse, pk_set))
+    elif action in ('pre_remove', 'pre_clear'):
+        instance._summary_owner_ids = _summary_owner_ids(sender, instance, reverse, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        invalidate_profile_summaries(instance.__dict__.pop('_summary_owner_ids', []))
+
+
+for relation in SUMMARY_RELATIONS:  # noqa: E305
+    m2m_changed.connect(summary_relation_changed, sender=relation)
+
+
+def followers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Publishes the follows.
+    """
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        follows = [(instance.pk, user_id)
+                   for user_id in Profile.objects.filter(pk__in=pk_set).values_list('user', flat=True)]
+    else:
+        follows = [(follower_id, instance.user_id) for follower_id in pk_set]
+    for follower_id, followed_id in follows:
+        publish(UserFollowed(follower_id=follower_id, followed_id=followed_id))
+
+
+m2m_changed.connect(followers_changed, sender=Profile.followers.through)  # noqa: E305
+
+
+def pending_requests_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signals the Profile to keep `pending_requests` in sync with its message requests.
+    """
+    from .counters import recount_pending_requests
+
+    if action == 'post_add' and pk_set:
+        recount_pending_requests(_summary_owner_ids(sender, instance, reverse, pk_set))
+    elif action in ('pre_remove', 'pre_clear'):
+        instance._pending_owner_ids = _summary_owner_ids(sender, instance, reverse, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        recount_pending_requests(instance.__dict__.pop('_pending_owner_ids', []))
+
+
+m2m_changed.connect(pending_requests_changed, sender=Profile.pending_list.through)  # noqa: E305
+
+
+@receiver(post_save, sender=Subject)
+def subject_saved(sender, instance, created, raw, **kwargs):
+    """
+    Signals the profile summary cache about subjects being posted, in the
+    request's process so its cache is the one invalidated.
+    """
+    if created and not raw:
+        invalidate_profile_summaries([instance.author_id])
+
+
+@receiver(post_delete, sender=Subject)
+def subject_deleted(sender, instance, **kwargs):
+    """
+    Signals the profile summary cache about subjects being deleted.
+    """
+    invalidate_profile_summaries([instance.author_id])
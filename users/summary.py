@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Profile summaries.
+
+Everything `ProfileRetrieveSerializer` shows about a user, the counts & the
+viewer's relationship flags, is fetched with one annotated query & cached per
+profile, with the viewer's flags cached apart per (profile, viewer). Cache
+keys embed a per-profile version that the signals in `users.models` replace
+whenever the profile changes, which invalidates the summary for every viewer
+at once. The version only changes in the cache of the process handling the
+change, so the flags, which follow & contact requests toggle, are only kept
+for `VIEWER_FLAGS_CACHE_TIMEOUT` seconds.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
+
+from boards.models import Board
+from subjects.models import Subject
+
+from .models import Profile, get_profile_summary_version
+
+PROFILE_SUMMARY_CACHE_TIMEOUT = 10 * 60
+VIEWER_FLAGS_CACHE_TIMEOUT = 30
+VIEWER_FLAGS = ('requester_in_contact_list', 'requester_in_pending_list', 'has_followed')
+
+
+def _count(queryset, column):
+    """Returns an expression counting the rows of `queryset` grouped by `column`."""
+    rows = queryset.order_by().values(column).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def _viewer_flag(through, viewer):
+    """Returns an expression checking if `viewer` is in the outer user's `through` relation."""
+    if viewer is None or not viewer.is_authenticated:
+        return Value(False, output_field=BooleanField())
+    return Exists(through.objects.filter(profile__user=OuterRef('pk'), user=viewer))
+
+
+def fetch_profile_summary(user_id, viewer=None):
+    """
+    Returns the summary of a user's profile as seen by `viewer` with a single query.
+    """
+    user = User.objects.filter(pk=user_id).select_related('profile').annotate(
+        created_boards_count=_count(Board.admins.through.objects.filter(user=OuterRef('pk')), 'user'),
+        posted_subjects_count=_count(Subject.objects.filter(author=OuterRef('pk')), 'author'),
+        boards_subscribed_count=_count(Board.subscribers.through.objects.filter(user=OuterRef('pk')), 'user'),
+        requester_in_contact_list=_viewer_flag(Profile.contact_list.through, viewer),
+        requester_in_pending_list=_viewer_flag(Profile.pending_list.through, viewer),
+        has_followed=_viewer_flag(Profile.followers.through, viewer),
+    ).first()
+    if user is None:
+        return None
+    return {
+        'screen_name': user.profile.screen_name(),
+        'picture': user.profile.get_picture(),
+        'member_since': user.profile.member_since,
+        'created_boards_count': user.created_boards_count,
+        'posted_subjects_count': user.posted_subjects_count,
+        'boards_subscribed_count': user.boards_subscribed_count,
+        'requester_in_contact_list': user.requester_in_contact_list,
+        'requester_in_pending_list': user.requester_in_pending_list,
+        'has_followed': user.has_followed,
+        'is_requesters_profile': viewer is not None and viewer.pk == user.pk,
+    }
+
+
+def get_profile_summary(user_id, viewer=None):
+    """
+    Returns the cached summary of a user's profile as seen by `viewer`.
+    """
+    viewer_id = viewer.pk if viewer is not None and viewer.is_authenticated else 0
+    key = 'users:profile_summary:{}:{}'.format(user_id, get_profile_summary_version(user_id))
+    flags_key = '{}:{}'.format(key, viewer_id)
+    cached = cache.get_many([key, flags_key])
+    if key in cached and flags_key in cached:
+        return dict(cached[key], **cached[flags_key])
+
+    summary = fetch_profile_summary(user_id, viewer)
+    if summary is None:
+        return None
+    flags = {flag: summary[flag] for flag in VIEWER_FLAGS}
+    flags['is_requesters_profile'] = summary['is_requesters_profile']
+    cache.set(key, {field: value for field, value in summary.items() if field not in flags},
+              PROFILE_SUMMARY_CACHE_TIMEOUT)
+    cache.set(flags_key, flags, VIEWER_FLAGS_CACHE_TIMEOUT)
+    return summary
@@ -1,11 +1,31 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import time
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
 from django.urls import reverse
 
+from boards.models import Board
+from messenger.models import Conversation, Message
+from notifications.models import Notification
+from subjects.models import Subject
+
+from .counters import get_unread_counts
 from .models import Profile
+from .summary import VIEWER_FLAGS_CACHE_TIMEOUT
+from .usernames import (
+    USERNAME_INDEX_VERSION_KEY,
+    autocomplete_usernames,
+    get_username_index,
+    is_username_taken,
+)
 
 
 class TestProfileModel(TestCase):
@@ -60,3 +80,235 @@ class TestRegisterViews(TestCase):
     def test_alternate_empty_response(self):
         response = self.client.get(reverse('signup'))
         self.assertEqual(response.status_code, 200)
+
+
+class TestProfileSummary(TestCase):
+    """
+    TestCase class to test the cached profile summary of the profile API
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='test_user', password='top_secret')
+        self.other_user = get_user_model().objects.create_user(username='other_test_user', password='top_secret')
+        self.client.login(username='other_test_user', password='top_secret')
+        self.url = reverse('profile_info', args=[self.user.username])
+
+    def test_summary_is_cached(self):
+        with self.assertNumQueries(4):  # session, requester, user & summary
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['screen_name'], 'test_user')
+        self.assertFalse(response.data['has_followed'])
+        self.assertFalse(response.data['is_requesters_profile'])
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+    def test_summary_is_invalidated(self):
+        self.client.get(self.url)
+        self.user.profile.followers.add(self.other_user)
+        self.other_user.my_pending_requests.add(self.user.profile)
+        board = Board.objects.create(title='test title', description='some random words')
+        board.admins.add(self.user)
+        self.user.subscribed_boards.add(board)
+        subject = Subject.objects.create(title='test title', author=self.user, board=board)
+
+        response = self.client.get(self.url)
+        self.assertTrue(response.data['has_followed'])
+        self.assertTrue(response.data['requester_in_pending_list'])
+        self.assertFalse(response.data['requester_in_contact_list'])
+        self.assertEqual(response.data['created_boards_count'], 1)
+        self.assertEqual(response.data['boards_subsribed_count'], 1)
+        self.assertEqual(response.data['posted_subjects_count'], 1)
+
+        self.other_user.following.clear()
+        board.subscribers.remove(self.user)
+        subject.delete()
+        response = self.client.get(self.url)
+        self.assertFalse(response.data['has_followed'])
+        self.assertEqual(response.data['boards_subsribed_count'], 0)
+        self.assertEqual(response.data['posted_subjects_count'], 0)
+
+    def test_viewer_flags_expire_quickly(self):
+        self.client.get(self.url)
+        # A follow made through another process, which can't invalidate this process' cache.
+        Profile.followers.through.objects.create(profile=self.user.profile, user=self.other_user)
+        self.assertFalse(self.client.get(self.url).data['has_followed'])
+        later = time.time() + VIEWER_FLAGS_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertTrue(self.client.get(self.url).data['has_followed'])
+
+
+class TestUsernameIndex(TransactionTestCase):
+    """
+    TestCase class to test the username prefix index, committing so the
+    index is updated
+    """
+    def setUp(self):
+        cache.clear()
+        for username in ['alice', 'Alfred', 'albert', 'bob']:
+            get_user_model().objects.create(username=username, email='{}@gmail.com'.format(username))
+
+    def test_lookups_skip_the_database(self):
+        get_username_index()
+        with self.assertNumQueries(0):
+            self.assertTrue(is_username_taken('ALICE'))
+            self.assertEqual(autocomplete_usernames('al'), ['albert', 'Alfred', 'alice'])
+            self.assertEqual(autocomplete_usernames('al', limit=1), ['albert'])
+            self.assertEqual(autocomplete_usernames(''), [])
+            self.assertFalse(is_username_taken('ali'))
+
+    def test_index_follows_users(self):
+        user = User.objects.get(username='bob')
+        user.username = 'alan'
+        user.save()
+        User.objects.get(username='alice').delete()
+        self.assertEqual(autocomplete_usernames('al'), ['alan', 'albert', 'Alfred'])
+        self.assertFalse(is_username_taken('bob'))
+
+    def test_other_processes_reload(self):
+        index = get_username_index()
+        index.remove(User.objects.get(username='bob').pk)  # a stale copy
+        cache.delete(USERNAME_INDEX_VERSION_KEY)
+        self.assertTrue(is_username_taken('bob'))
+        index.remove(User.objects.get(username='bob').pk)
+        cache.incr(USERNAME_INDEX_VERSION_KEY)
+        with self.assertNumQueries(1):  # reloading the index
+            self.assertTrue(is_username_taken('BOB'))
+
+    def test_concurrent_changes_reload(self):
+        index = get_username_index()
+        index.remove(User.objects.get(username='bob').pk)  # misses a change by another process
+        cache.incr(USERNAME_INDEX_VERSION_KEY)
+        get_user_model().objects.create(username='alma', email='alma@gmail.com')
+        self.assertEqual(autocomplete_usernames('alm'), ['alma'])
+        self.assertEqual(autocomplete_usernames('b'), ['bob'])
+
+    def test_rolled_back_users_are_skipped(self):
+        get_username_index()
+        with self.assertRaises(ValueError), transaction.atomic():
+            get_user_model().objects.create(username='alma', email='alma@gmail.com')
+            raise ValueError
+        self.assertEqual(autocomplete_usernames('alm'), [])
+        self.assertFalse(is_username_taken('alma'))
+
+    def test_autocomplete_api(self):
+        response = self.client.get(reverse('users_autocomplete'), {'q': 'u/Al'})
+        self.assertEqual(response.json(), {'results': ['albert', 'Alfred', 'alice']})
+
+    def test_check_username(self):
+        response = self.client.get(reverse('check_username'), {'username': 'Bob'},
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'is_taken': True})
+
+
+class TestUnreadCounters(TestCase):
+    """
+    TestCase class to test the maintained unread counters
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='test_user', password='top_secret')
+        self.other_user = get_user_model().objects.create_user(username='other_test_user', password='top_secret')
+
+    def assertCounts(self, user, **counts):
+        expected = dict.fromkeys(Profile.COUNTER_FIELDS, 0)
+        expected.update(counts)
+        self.assertEqual(get_unread_counts(user.pk), expected)
+        self.assertEqual(Profile.objects.filter(user=user).values(*Profile.COUNTER_FIELDS).get(), expected)
+
+    def test_messages(self):
+        first = Message.send_message(self.other_user, self.user, 'Hello')
+        Message.send_message(self.other_user, self.user, 'Again')
+        Message.send_message(self.user, self.other_user, 'Hi')
+        self.assertCounts(self.user, unread_messages=2)
+        self.assertCounts(self.other_user, unread_messages=1)
+
+        conversation = Conversation.get_between(self.user, self.other_user)
+        conversation.mark_read(self.user, first.pk)
+        self.assertCounts(self.user, unread_messages=1)
+        conversation.mark_read(self.user)
+        conversation.mark_read(self.user, first.pk)
+        self.assertCounts(self.user)
+
+    def test_notifications_and_requests(self):
+        Notification.objects.create(Actor=self.other_user, Target=self.user, notif_type='follow')
+        Notification.bulk_notify([
+            Notification(Actor=self.other_user, Target=self.user, notif_type='follow'),
+            Notification(Actor=self.user, Target=self.user, notif_type='follow'),
+        ])
+        self.user.profile.pending_list.add(self.other_user)
+        self.assertCounts(self.user, unread_notifications=2, pending_requests=1)
+        with self.assertNumQueries(0):
+            get_unread_counts(self.user.pk)
+
+        self.assertEqual(Notification.mark_all_read(self.user), 2)
+        self.other_user.my_pending_requests.clear()
+        self.assertCounts(self.user)
+
+        # Saving a profile doesn't overwrite its counters.
+        profile = Profile.objects.get(user=self.user)
+        Notification.objects.create(Actor=self.other_user, Target=self.user, notif_type='follow')
+        profile.save()
+        self.assertCounts(self.user, unread_notifications=1)
+
+    def test_repair_unread_counters(self):
+        Message.send_message(self.other_user, self.user, 'Hello')
+        Notification.objects.create(Actor=self.other_user, Target=self.user, notif_type='follow')
+        Profile.objects.update(unread_messages=5, unread_notifications=0, pending_requests=-1)
+
+        out = StringIO()
+        call_command('repair_unread_counters', '--dry-run', stdout=out)
+        self.assertIn('unread_messages: found 2 profiles.', out.getvalue())
+        self.assertIn('pending_requests: found 2 profiles.', out.getvalue())
+
+        call_command('repair_unread_counters', stdout=StringIO())
+        self.assertCounts(self.user, unread_messages=1, unread_notifications=1)
+        self.assertCounts(self.other_user)
+
+
+class TestBadges(TestCase):
+    """
+    TestCase class to test the badges poll
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='test_user', password='top_secret')
+        self.other_user = get_user_model().objects.create_user(username='other_test_user', password='top_secret')
+        self.url = reverse('badges')
+
+    def test_badges(self):
+        self.assertEqual(self.client.get(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest').status_code, 403)
+
+        self.client.login(username='test_user', password='top_secret')
+        Message.send_message(self.other_user, self.user, 'Hello')
+        response = self.client.get(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'unread_messages': 1, 'unread_notifications': 0, 'pending_requests': 0})
+
+        # Unchanged counts are answered from the cache, without loading the user.
+        with self.assertNumQueries(1):  # session
+            not_modified = self.client.get(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                           HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.user.profile.pending_list.add(self.other_user)
+        response = self.client.get(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pending_requests'], 1)
+
+        # Neither is a deactivated user or a session older than the password.
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                         HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.set_password('new_secret')
+        user.save()
+        response = self.client.get(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+
+        self.client.login(username='test_user', password='new_secret')
+        etag = self.client.get(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')['ETag']
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        response = self.client.get(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
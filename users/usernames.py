@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Process-wide prefix index over usernames, used by availability checks,
+autocompletion & the user typeahead (see `search.typeahead`) without
+querying the database.
+
+Keys are case-folded, so lookups are case-insensitive. Users are scored by
+their followers, inactive ones by -1. The index is loaded once per process
+& updated in place by the `User` signals (see `users.models`) once their
+transaction commits. Every change increments a version counter in the
+(shared) cache; a process whose copy isn't the previous version of the
+counter reloads it from the database before answering, so other processes'
+changes are picked up. Follower counts aren't versioned, so the index is
+also reloaded every `USERNAME_INDEX_REFRESH_INTERVAL` seconds.
+"""
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from utils.prefix_index import RankedPrefixIndex
+
+USERNAME_INDEX_VERSION_KEY = 'users:username_index_version'
+USERNAME_INDEX_REFRESH_INTERVAL = 5 * 60
+AUTOCOMPLETE_LIMIT = 10
+INACTIVE_SCORE = -1
+
+_index = RankedPrefixIndex(top_size=AUTOCOMPLETE_LIMIT)
+_index_version = None
+_loaded_at = None
+_load_lock = threading.Lock()
+
+
+def _current_version():
+    cache.add(USERNAME_INDEX_VERSION_KEY, 0, None)
+    return cache.get(USERNAME_INDEX_VERSION_KEY, 0)
+
+
+def _next_version():
+    try:
+        return cache.incr(USERNAME_INDEX_VERSION_KEY)
+    except ValueError:
+        # Evicted meanwhile; the new counter never matches a loaded copy.
+        cache.add(USERNAME_INDEX_VERSION_KEY, 0, None)
+        return None
+
+
+def _load_users():
+    rows = User.objects.annotate(followers_total=Count('profile__followers')).values_list(
+        'id', 'username', 'is_active', 'followers_total')
+    for user_id, username, is_active, followers in rows:
+        yield user_id, username, followers if is_active else INACTIVE_SCORE
+
+
+def _is_stale(version):
+    return version != _index_version or time.monotonic() - _loaded_at > USERNAME_INDEX_REFRESH_INTERVAL
+
+
+def get_username_index():
+    """Returns the username index, reloading it if another process changed it or it's due a refresh."""
+    global _index_version, _loaded_at
+    version = _current_version()
+    if _is_stale(version):
+        with _load_lock:
+            if _is_stale(version):
+                _index.reset(_load_users())
+                _index_version, _loaded_at = version, time.monotonic()
+    return _index
+
+
+def reset_username_index():
+    """Reloads the index on its next use."""
+    global _index_version
+    with _load_lock:
+        _index_version = None
+
+
+def is_username_index_loaded():
+    return _index_version is not None
+
+
+def _changed(update):
+    """
+    Applies `update` to the local index & bumps the version once the
+    current transaction commits, so rolled back changes never show up.
+    """
+    def apply():
+        global _index_version
+        with _load_lock:
+            previous, version = _index_version, _next_version()
+            if previous is not None and version == previous + 1:
+                update(_index)
+                _index_version = version
+            else:
+                # Another process changed the index meanwhile; reload it on next use.
+                _index_version = None
+    transaction.on_commit(apply)
+
+
+def username_changed(user):
+    index = get_username_index()
+    score = index.score(user.pk)
+    if not user.is_active:
+        new_score = INACTIVE_SCORE
+    elif score is None:
+        new_score = 0
+    elif score == INACTIVE_SCORE:
+        new_score = User.objects.filter(pk=user.pk).aggregate(total=Count('profile__followers'))['total']
+    else:
+        new_score = score
+    # Most saves (e.g. `last_login` updates) keep the username & activity.
+    if index.key(user.pk) != user.username or new_score != score:
+        _changed(lambda index: index.add(user.pk, user.username, new_score))
+
+
+def username_deleted(user_id):
+    _changed(lambda index: index.remove(user_id))
+
+
+def set_follower_counts(counts):
+    """Rescores active users, `counts` mapping user ids to their followers."""
+    if is_username_index_loaded():
+        for user_id, followers in counts.items():
+            if (_index.score(user_id) or 0) >= 0:
+                _index.set_score(user_id, followers)
+
+
+def is_username_taken(username):
+    """
+    Checks case-insensitively if a username is taken, from the index alone
+    unless it has to be (re)loaded.
+    """
+    return username in get_username_index()
+
+
+def autocomplete_usernames(prefix, limit=AUTOCOMPLETE_LIMIT):
+    """Returns up to `limit` usernames starting with `prefix`, alphabetically."""
+    if not prefix:
+        return []
+    index = get_username_index()
+    usernames = (index.key(user_id) for user_id in index.prefixed(prefix, limit))
+    return [username for username in usernames if username is not None]
@@ -3,8 +3,12 @@
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
     REDIRECT_FIELD_NAME,
+    SESSION_KEY,
     authenticate,
+    get_user_model,
     login as auth_login,
     logout as auth_logout,
 )
@@ -12,23 +16,32 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render, resolve_url
 from django.template.response import TemplateResponse
+from django.utils.crypto import constant_time_compare
 from django.utils.decorators import method_decorator
 from django.utils.http import is_safe_url
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
 from django.views.generic import ListView
 
 import requests
 
+from events.bus import publish
+from events.domain import MessageRequestAccepted, MessageRequestSent
 from mysite.decorators import ajax_required
-from notifications.models import Notification
+from mysite.pagination import CursorPaginationMixin
 from subjects.models import Subject
 from utils import check_image_extension
 
+from .counters import get_badges_state, get_unread_counts
 from .forms import ProfileEditForm, SignupForm, UserEditForm
 from .models import Profile
+from .usernames import is_username_taken
 
 
 def register_user(request):
@@ -91,10 +104,43 @@ def check_username(request):
     Ajax call to check username availability.
     """
     username = request.GET.get('username', None)
-    data = {'is_taken': User.objects.filter(username__iexact=username).exists()}
+    data = {'is_taken': is_username_taken(username)}
     return JsonResponse(data)
 
 
+def badges_etag(request):
+    """
+    Returns the ETag of the badge counts of the session's user from the cache,
+    without loading the user. Like `django.contrib.auth.get_user`, the session
+    must match the user's password & backend, so a logged out, deactivated or
+    re-passworded user is never answered a 304.
+    """
+    try:
+        user_id = get_user_model()._meta.pk.to_python(request.session[SESSION_KEY])
+        backend = request.session[BACKEND_SESSION_KEY]
+        session_hash = request.session[HASH_SESSION_KEY]
+    except (KeyError, ValidationError):
+        return None
+    state = get_badges_state(user_id)
+    if (state is None or not state['is_active'] or backend not in settings.AUTHENTICATION_BACKENDS or
+            not constant_time_compare(session_hash, state['session_hash'])):
+        return None
+    return '{}:{}'.format(user_id, state['version'])
+
+
+@ajax_required
+@cache_control(private=True, no_cache=True)
+@etag(badges_etag)
+def badges(request):
+    """
+    Ajax call returning the unread messages, unread notifications & pending
+    message requests counts of the user, or 304 if they didn't change.
+    """
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden()
+    return JsonResponse(get_unread_counts(request.user.pk))
+
+
 @login_required
 def user_logout(request):
     """
@@ -154,8 +200,9 @@ def follow_user(request, user_id):
         user.profile.followers.remove(request.user)
         text = 'Follow'
     else:
-        user.profile.followers.add(request.user)
-        Notification.objects.create(Actor=request.user, Target=user, notif_type='follow')
+        # `UserFollowed` is published by `users.models.followers_changed` in the same transaction.
+        with transaction.atomic():
+            user.profile.followers.add(request.user)
         text = 'Unfollow'
     return HttpResponse(text)
 
@@ -222,7 +269,7 @@ def change_picture(request):
         return render(request, 'users/change_picture.html', {'profile_form': profile_form})
 
 
-class UserProfilePageView(LoginRequiredMixin, ListView):
+class UserProfilePageView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """
     Basic ListView implementation to call the subjects list & profile per user.
     """
@@ -233,7 +280,7 @@ class UserProfilePageView(LoginRequiredMixin, ListView):
 
     def get_queryset(self, **kwargs):
         self.user = get_object_or_404(User, username=self.kwargs['username'])
-        return Subject.get_subjects(self.user)
+        return Subject.get_subjects(self.user).for_feed(self.request.user)
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
@@ -254,8 +301,9 @@ def send_message_request(request, user_id):
         receiver.profile.pending_list.remove(contacter)
         text = 'Send Request'
     else:
-        receiver.profile.pending_list.add(contacter)
-        Notification.objects.create(Actor=contacter, Target=receiver, notif_type='sent_msg_request')
+        with transaction.atomic():
+            receiver.profile.pending_list.add(contacter)
+            publish(MessageRequestSent(sender_id=contacter.pk, receiver_id=receiver.pk))
         text = 'Request Sent'
     return HttpResponse(text)
 
@@ -270,10 +318,11 @@ def accept_message_request(request, user_id):
     acceptor = request.user
 
     if sender in acceptor.profile.pending_list.all():
-        acceptor.profile.pending_list.remove(sender)
-        acceptor.profile.contact_list.add(sender)
-        sender.profile.contact_list.add(acceptor)
-        Notification.objects.create(Actor=acceptor, Target=sender, notif_type='confirmed_msg_request')
+        with transaction.atomic():
+            acceptor.profile.pending_list.remove(sender)
+            acceptor.profile.contact_list.add(sender)
+            sender.profile.contact_list.add(acceptor)
+            publish(MessageRequestAccepted(acceptor_id=acceptor.pk, sender_id=sender.pk))
         text = 'Added to contact list'
     else:
         text = 'Unexpected error!'
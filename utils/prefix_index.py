@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-memory, case-insensitive prefix index.
+
+Keys are case-folded & kept in a sorted list, so exact lookups & prefix
+scans are a binary search (`bisect`) away, without any database query.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+
+def fold(key):
+    """Returns the case-insensitive form of a key."""
+    return (key or '').casefold()
+
+
+class PrefixIndex:
+    """
+    Maps string keys to ids, e.g. usernames to user ids.
+
+    Entries are `(folded key, id)` tuples in a sorted list; the original keys
+    are kept by id to update or remove them. Several ids may share a folded
+    key. The index is safe to use from several threads.
+    """
+    def __init__(self, items=()):
+        self._lock = threading.RLock()
+        self._keys = {}
+        self._entries = []
+        self.reset(items)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def reset(self, items):
+        """Replaces the entries with `(id, key)` pairs."""
+        keys = {item_id: key for item_id, key in items}
+        entries = sorted((fold(key), item_id) for item_id, key in keys.items())
+        with self._lock:
+            self._keys, self._entries = keys, entries
+
+    def add(self, item_id, key):
+        """Adds or renames an entry."""
+        with self._lock:
+            if self._keys.get(item_id) == key:
+                return
+            self.remove(item_id)
+            self._keys[item_id] = key
+            insort(self._entries, (fold(key), item_id))
+
+    def remove(self, item_id):
+        with self._lock:
+            key = self._keys.pop(item_id, None)
+            if key is None:
+                return
+            entry = (fold(key), item_id)
+            index = bisect_left(self._entries, entry)
+            if index < len(self._entries) and self._entries[index] == entry:
+                del self._entries[index]
+
+    def get(self, key):
+        """Returns the id of an entry matching `key` case-insensitively, or `None`."""
+        folded = fold(key)
+        entries = self._entries
+        index = bisect_left(entries, (folded, ))
+        if index < len(entries) and entries[index][0] == folded:
+            return entries[index][1]
+        return None
+
+    def key(self, item_id):
+        """Returns the original key of an entry."""
+        return self._keys.get(item_id)
+
+    def prefixed(self, prefix, limit=None):
+        """Returns the ids of the entries starting with `prefix`, in key order."""
+        folded = fold(prefix)
+        entries = self._entries
+        index = bisect_left(entries, (folded, ))
+        ids = []
+        while index < len(entries) and entries[index][0].startswith(folded):
+            if limit is not None and len(ids) >= limit:
+                break
+            ids.append(entries[index][1])
+            index += 1
+        return ids
+
+
+class RankedPrefixIndex(PrefixIndex):
+    """
+    Prefix index whose entries have a score, e.g. the followers of a user,
+    returning the best scored matches of a prefix first.
+
+    The best `top_size` matches of every prefix up to `cached_length`
+    characters are memoized & patched in place as entries change, so short
+    prefixes, which match the most entries, don't scan their whole range.
+    """
+    def __init__(self, items=(), top_size=10, cached_length=3):
+        self.top_size = top_size
+        self.cached_length = cached_length
+        self._scores = {}
+        self._top = {}
+        super().__init__(items)
+
+    def reset(self, items):
+        """Replaces the entries with `(id, key, score)` triples."""
+        items = list(items)
+        with self._lock:
+            super().reset((item_id, key) for item_id, key, _ in items)
+            self._scores = {item_id: score for item_id, _, score in items}
+            self._top = {}
+
+    def _rank(self, item_id):
+        return (-self._scores.get(item_id, 0), fold(self._keys[item_id]), item_id)
+
+    def _cached_prefixes(self, item_id):
+        folded = fold(self._keys[item_id])
+        return [folded[:length] for length in range(min(len(folded), self.cached_length) + 1)]
+
+    def _forget(self, item_id, improved=False):
+        """
+        Drops an entry from the memoized matches. Unless the entry is only
+        moving up (`improved`), a full list loses track of its next match &
+        is dropped too.
+        """
+        for prefix in self._cached_prefixes(item_id):
+            top = self._top.get(prefix)
+            if top is None or item_id not in [rank[2] for rank in top]:
+                continue
+            if improved or len(top) < self.top_size:
+                # Lists shorter than `top_size` hold every match of their prefix.
+                self._top[prefix] = [rank for rank in top if rank[2] != item_id]
+            else:
+                del self._top[prefix]
+
+    def _remember(self, item_id):
+        """Adds an entry to the memoized matches it belongs to."""
+        rank = self._rank(item_id)
+        for prefix in self._cached_prefixes(item_id):
+            top = self._top.get(prefix)
+            if top is None or (len(top) >= self.top_size and rank > top[-1]):
+                continue
+            top.append(rank)
+            top.sort()
+            del top[self.top_size:]
+
+    def add(self, item_id, key, score=0):
+        """Adds, renames or rescores an entry."""
+        with self._lock:
+            if self._keys.get(item_id) == key and self._scores.get(item_id) == score:
+                return
+            if item_id in self._keys:
+                self._forget(item_id, improved=self._keys[item_id] == key and score > self._scores[item_id])
+            super().add(item_id, key)
+            self._scores[item_id] = score
+            self._remember(item_id)
+
+    def set_score(self, item_id, score):
+        with self._lock:
+            if item_id in self._keys:
+                self.add(item_id, self._keys[item_id], score)
+
+    def remove(self, item_id):
+        with self._lock:
+            if item_id in self._keys:
+                self._forget(item_id)
+                self._scores.pop(item_id, None)
+            super().remove(item_id)
+
+    def score(self, item_id):
+        return self._scores.get(item_id)
+
+    def _scan(self, folded, limit):
+        return heapq.nsmallest(limit, (self._rank(item_id) for item_id in self.prefixed(folded)))
+
+    def top(self, prefix, limit=None):
+        """Returns the ids of the best scored entries starting with `prefix`."""
+        limit = self.top_size if limit is None else limit
+        folded = fold(prefix)
+        with self._lock:
+            if limit > self.top_size or len(folded) > self.cached_length:
+                ranks = self._scan(folded, limit)
+            else:
+                ranks = self._top.get(folded)
+                if ranks is None:
+                    ranks = self._top[folded] = self._scan(folded, self.top_size)
+        return [rank[2] for rank in ranks[:limit]]
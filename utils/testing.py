@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test helpers shared by the apps.
+"""
+from unittest import mock
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.test import TestCase
+
+
+class OnCommitTestCase(TestCase):
+    """
+    TestCase running `transaction.on_commit()` callbacks at once, as the
+    transaction wrapping each test never commits.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls._on_commit_patcher = mock.patch.object(BaseDatabaseWrapper, 'on_commit', lambda connection, func: func())
+        cls._on_commit_patcher.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._on_commit_patcher.stop()
+        super().tearDownClass()